@@ -1,4 +1,5 @@
 import asyncio
+import base64
 from contextlib import AsyncExitStack
 import json
 import sys
@@ -7,6 +8,7 @@ from PyQt5.QtCore import QObject, pyqtSignal
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from mcp.types import CallToolResult, ListToolsResult
+import numpy as np
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletion
 
@@ -34,8 +36,26 @@ class Bridge(QObject):
             self.error_signal.emit(error)
 
 
+def same_screen(old: dict, new: dict, threshold: float) -> bool:
+    """两个截图指纹是否视为同一画面: 指针位置相同且每个tile的平均灰度差都不超过threshold"""
+    if old["pointer"] != new["pointer"] or old["shape"] != new["shape"]:
+        return False
+    a = np.frombuffer(base64.b64decode(old["means"]), dtype=np.uint8)
+    b = np.frombuffer(base64.b64decode(new["means"]), dtype=np.uint8)
+    return int(np.abs(a.astype(np.int16) - b).max(initial=0)) <= threshold
+
+
 class Host:
-    def __init__(self, api_key: str, base_url: str, model_name: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model_name: str,
+        screenshot_tier: str = "medium",
+        verify_tier: str = "glance",
+        unchanged_threshold: float = 2.0,
+        delta_screenshots: bool = True,
+    ):
         # UI信号槽
         self.bridge = Bridge()
 
@@ -51,6 +71,19 @@ class Host:
         self._model_name = model_name
         self._openai_tools = []
 
+        # 截图精度档位: 新需求开始时使用screenshot_tier, 操作后确认结果时使用verify_tier;
+        # 开启差分截图时操作后不再按verify_tier截图, 变化区域为原始精度,
+        # 变化过大时的整屏截图使用服务端的默认档位(WINCONTROL_SCREENSHOT_TIER)
+        self._screenshot_tier = screenshot_tier
+        self._verify_tier = verify_tier
+        # 操作后画面与上一张截图的指纹相同时只发送文字说明, 不再上传截图
+        self._unchanged_threshold = unchanged_threshold
+        self._last_fingerprint = None
+        # 操作后只发送变化区域的截图和整屏缩略图, 而不是整张截图
+        self._delta_screenshots = delta_screenshots
+        # 最近一条含整屏截图的消息, 差分截图以它为基准, 压缩历史消息时保留
+        self._full_screenshot_msg = None
+
         # 对话上下文
         self._system_prompt = None
         self._messages = []
@@ -99,32 +132,32 @@ class Host:
                 "content": self._system_prompt,
             }
         )
+        self._last_fingerprint = None
+        self._full_screenshot_msg = None
         self.bridge.clear_chat()
 
     async def start_chat(self, user_input: str):
         """MCP循环"""
-        screen_shot = (
-            (await self._session.read_resource("screen://screenshot")).contents[0].blob
-        )
-        self._messages.append(
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "这是最新的屏幕状态, 分析用户新的需求",
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{screen_shot}"},
-                    },
-                    {
-                        "type": "text",
-                        "text": "如果要移动鼠标, 必须先调用screen_region_parser工具, 如果要操纵键盘, 必须先使用鼠标左键点击获取键盘焦点",
-                    },
-                ],
-            }
-        )
+        self._last_fingerprint = await self._read_fingerprint()
+        screen_shot = await self._read_screenshot(self._screenshot_tier)
+        self._full_screenshot_msg = {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "这是最新的屏幕状态, 分析用户新的需求",
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": screen_shot},
+                },
+                {
+                    "type": "text",
+                    "text": "如果要移动鼠标, 必须先调用screen_region_parser工具, 如果要操纵键盘, 必须先使用鼠标左键点击获取键盘焦点",
+                },
+            ],
+        }
+        self._messages.append(self._full_screenshot_msg)
         self._messages.append(
             {
                 "role": "user",
@@ -188,24 +221,47 @@ class Host:
 
             if tool_call.get("function").get("name") != "screen_region_parser":
                 # 除screen_region_parser工具外, 均需更新屏幕截图
-                new_screen_shot = (
-                    (await self._session.read_resource("screen://screenshot"))
-                    .contents[0]
-                    .blob
-                )
-                new_screen_shot_messages = {
-                    "role": "user",
-                    "content": [
+                fingerprint = await self._read_fingerprint()
+                if self._last_fingerprint is not None and same_screen(
+                    self._last_fingerprint, fingerprint, self._unchanged_threshold
+                ):
+                    self._messages.append(
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": "屏幕画面和鼠标位置与上一张截图相比没有变化, 上一步操作可能没有生效, 分析原因并继续完成任务",
+                                },
+                                {
+                                    "type": "text",
+                                    "text": "如果要移动鼠标, 必须先调用screen_region_parser工具, 如果要操纵键盘, 必须先使用鼠标左键点击获取键盘焦点",
+                                },
+                            ],
+                        }
+                    )
+                    continue
+
+                self._last_fingerprint = fingerprint
+                if self._delta_screenshots:
+                    screen_content, full = await self._read_delta()
+                else:
+                    full = True
+                    new_screen_shot = await self._read_screenshot(self._verify_tier)
+                    screen_content = [
                         {
                             "type": "text",
                             "text": "这是最新的屏幕状态, 指示了鼠标位置，先确认鼠标是否在正确位置，再确认上一步操作是否生效, 并继续完成任务",
                         },
                         {
                             "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{new_screen_shot}"
-                            },
+                            "image_url": {"url": new_screen_shot},
                         },
+                    ]
+                new_screen_shot_messages = {
+                    "role": "user",
+                    "content": [
+                        *screen_content,
                         {
                             "type": "text",
                             "text": "如果要移动鼠标, 必须先调用screen_region_parser工具, 如果要操纵键盘, 必须先使用鼠标左键点击获取键盘焦点",
@@ -213,6 +269,61 @@ class Host:
                     ],
                 }
                 self._messages.append(new_screen_shot_messages)
+                if full:
+                    self._full_screenshot_msg = new_screen_shot_messages
+
+    async def _read_screenshot(self, tier: str) -> str:
+        """按精度档位读取截图, 返回data URL"""
+        content = (
+            await self._session.read_resource(f"screen://screenshot/{tier}")
+        ).contents[0]
+        return f"data:{content.mimeType};base64,{content.blob}"
+
+    async def _read_delta(self) -> tuple[list, bool]:
+        """读取与上次发送的整屏截图相比的变化区域截图和整屏缩略图, 转换为OpenAI格式的消息内容,
+        同时返回是否为整屏截图"""
+        content = (await self._session.read_resource("screen://delta")).contents[0]
+        delta = json.loads(content.text)
+
+        def image(item: dict) -> dict:
+            url = f"data:{item['mime_type']};base64,{item['data']}"
+            return {"type": "image_url", "image_url": {"url": url}}
+
+        if delta["full"]:
+            return [
+                {
+                    "type": "text",
+                    "text": "这是最新的屏幕状态, 指示了鼠标位置，先确认鼠标是否在正确位置，再确认上一步操作是否生效, 并继续完成任务",
+                },
+                image(delta["image"]),
+            ], True
+
+        u, v = delta["pointer"]
+        items = []
+        if delta["changed"]:
+            u0, v0, u1, v1 = delta["bbox"]
+            items += [
+                {
+                    "type": "text",
+                    "text": f"与最近一张整屏截图相比, 屏幕发生变化的区域为归一化坐标({u0},{v0})到({u1},{v1}), 这是该区域的原始精度截图: ",
+                },
+                image(delta["crop"]),
+            ]
+        else:
+            items.append({"type": "text", "text": "屏幕内容与最近一张整屏截图相比没有变化"})
+        items += [
+            {
+                "type": "text",
+                "text": f"这是整屏缩略图, 红框为变化区域, 鼠标位于归一化坐标({u},{v})，先确认鼠标是否在正确位置，再确认上一步操作是否生效, 并继续完成任务",
+            },
+            image(delta["thumbnail"]),
+        ]
+        return items, False
+
+    async def _read_fingerprint(self) -> dict:
+        """读取当前屏幕的感知指纹"""
+        content = (await self._session.read_resource("screen://fingerprint")).contents[0]
+        return json.loads(content.text)
 
     def _mcp_tools_to_openai(self, mcp_tools: ListToolsResult) -> list:
         """将 MCP tool list 转换为 OpenAI 格式"""
@@ -262,7 +373,7 @@ class Host:
         return completion
 
     def _compress_messages(self):
-        """压缩消息，保留最新的 User 图片和 Tool 图片"""
+        """压缩消息，保留最新的 User 图片和 Tool 图片, 以及差分截图所基于的最新整屏截图"""
         last_user_idx = -1
         last_tool_idx = -1
 
@@ -289,6 +400,9 @@ class Host:
             if msg_index == last_user_idx or msg_index == last_tool_idx:
                 # 是最新的 User/Tool 图片，跳过不压缩
                 continue
+            if msg is self._full_screenshot_msg:
+                # 之后的差分截图只有变化区域和缩略图, 需要保留完整画面作为参照
+                continue
             if any(item.get("type") == "image_url" for item in msg["content"]):
                 if msg["role"] == "user":
                     msg["content"] = [
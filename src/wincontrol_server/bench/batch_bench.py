@@ -0,0 +1,64 @@
+"""九宫格区域解析基准: 逐区域batch=1推理 vs 一次batch推理全部区域, 并校验两种方式结果一致"""
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+
+from wincontrol_server.bench.common import half_screen_regions
+from wincontrol_server.bench.stubs import install_mss_stub
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    install_mss_stub(args.width, args.height)
+    from wincontrol_server.parser.omini import Omini
+
+    omini = Omini(args.model)
+    if not omini.supports_batch:
+        print("model has a fixed batch size of 1, parse_batch falls back to parse")
+
+    rng = np.random.default_rng(0)
+    screen = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    # 加入大块纯色区域, 让假模型/真实模型都能产生检测框
+    screen[100:400, 200:900] = 255
+    screen[600:900, 1000:1700] = 0
+
+    def regions() -> list[tuple[int, int, np.ndarray]]:
+        # parse会在区域图像上绘制, 每次使用前重新复制
+        return [(x, y, img.copy()) for x, y, img in half_screen_regions(screen)]
+
+    single = [omini.parse(*r) for r in regions()]
+    batched = omini.parse_batch(regions())
+    for i, (a, b) in enumerate(zip(single, batched)):
+        if a.boxes != b.boxes or not np.array_equal(a.parsed_img, b.parsed_img):
+            print(f"MISMATCH in region {i}")
+            sys.exit(1)
+    print("parity: ok")
+
+    def timed(fn) -> float:
+        best = float("inf")
+        for _ in range(args.runs):
+            batch = regions()
+            start = time.perf_counter()
+            fn(batch)
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return best
+
+    sequential_ms = timed(lambda regions: [omini.parse(*r) for r in regions])
+    batch_ms = timed(omini.parse_batch)
+    print(f"9 x parse: {sequential_ms:8.1f} ms | parse_batch: {batch_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
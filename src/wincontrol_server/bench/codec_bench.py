@@ -0,0 +1,82 @@
+"""图像编码基准: 在桌面帧(录制的PNG或合成界面)上比较各编码格式/参数的耗时、体积和失真, 以及auto策略的选择"""
+
+import argparse
+import base64
+from pathlib import Path
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.synthetic import synthetic_ui
+from wincontrol_server.runtime.codec import EncoderConfig, ImageEncoder
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float("inf") if mse == 0 else float(10 * np.log10(255**2 / mse))
+
+
+def _frames(args):
+    """逐个产出(名称, 截图资源实际编码的半分辨率BGR图像)"""
+    if args.frames:
+        for path in sorted(Path(args.frames).glob("*.png")):
+            img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img is not None:
+                yield path.name, img
+        return
+    for resolution in args.resolution:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        img, _ = synthetic_ui(width, height, max(50, width * height // 20000), 0)
+        half = cv2.resize(img, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+        yield resolution, half
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", help="PNG帧目录, 不指定时使用合成界面帧")
+    parser.add_argument(
+        "--resolution", nargs="+", default=["1920x1080", "2560x1440", "3840x2160"]
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-kb", type=int, nargs="+", default=[64, 256], help="auto的字节预算"
+    )
+    args = parser.parse_args()
+
+    configs = {
+        "png c1": EncoderConfig(format="png", png_compression=1),
+        "png c3": EncoderConfig(format="png", png_compression=3),
+        "png c6": EncoderConfig(format="png", png_compression=6),
+        "jpeg q90": EncoderConfig(format="jpeg", jpeg_quality=90),
+        "jpeg q75": EncoderConfig(format="jpeg", jpeg_quality=75),
+        "webp q90": EncoderConfig(format="webp", webp_quality=90),
+        "webp q75": EncoderConfig(format="webp", webp_quality=75),
+    }
+    for kb in args.budget_kb:
+        configs[f"auto {kb}KB"] = EncoderConfig(format="auto", max_bytes=kb * 1024)
+
+    for name, img in _frames(args):
+        print(f"{name} ({img.shape[1]}x{img.shape[0]} encoded):")
+        for label, config in configs.items():
+            encoder = ImageEncoder(config)
+            latencies = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                encoded = encoder.encode(img)
+                latencies.append((time.perf_counter() - start) * 1000)
+            decoded = cv2.imdecode(
+                np.frombuffer(encoded.data, np.uint8), cv2.IMREAD_COLOR
+            )
+            b64 = len(base64.b64encode(encoded.data))
+            print(
+                f"  {label:>12}: {np.median(latencies):7.1f} ms "
+                f"(first {latencies[0]:7.1f} ms)  "
+                f"{len(encoded.data) / 1024:8.1f} KB  base64 {b64 / 1024:8.1f} KB  "
+                f"PSNR {psnr(img, decoded):6.1f} dB  "
+                f"-> {encoded.format} q{encoded.quality}, {encoded.attempts} attempts"
+            )
+
+
+if __name__ == "__main__":
+    main()
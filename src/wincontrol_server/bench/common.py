@@ -0,0 +1,95 @@
+"""各基准脚本共用的计时、内存测量和区域划分工具"""
+
+import asyncio
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def mean_us(fn, iterations: int) -> float:
+    """返回单次调用平均耗时(微秒)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def median_us(fn, iterations: int) -> float:
+    """返回单次调用的中位耗时(微秒)"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(samples))
+
+
+def median_ms(fn, runs: int) -> float:
+    """预热一次后返回单次调用的中位耗时(ms)"""
+    fn()
+    elapsed = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return float(np.median(elapsed))
+
+
+def best_ms(fn, repeat: int):
+    """返回(最短耗时ms, 最后一次调用的结果)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+async def loop_lag_during(call, interval: float = 0.001) -> tuple[float, float]:
+    """执行call期间测量事件循环的最大卡顿, 返回(call耗时, 最大卡顿), 单位ms"""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            worst = max(worst, (now - last - interval) * 1000)
+            last = now
+
+    task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await call()
+    elapsed = (time.perf_counter() - start) * 1000
+    done.set()
+    await task
+    return elapsed, worst
+
+
+def measure_memory(fn, iterations: int) -> tuple[float, float]:
+    """返回(平均耗时ms, 单次调用峰值新增内存MB)"""
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations * 1000
+    return elapsed, peak / 1024 / 1024
+
+
+def half_screen_regions(screen: np.ndarray) -> list[tuple[int, int, np.ndarray]]:
+    """与screen_region_parser相同的九个半屏区域(left, top, 视图), 视图不复制像素"""
+    h, w = screen.shape[:2]
+    return [
+        (x, y, screen[y : y + h // 2, x : x + w // 2])
+        for x in (0, w // 4, w // 2)
+        for y in (0, h // 4, h // 2)
+    ]
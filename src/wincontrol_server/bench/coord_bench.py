@@ -0,0 +1,133 @@
+"""坐标换算基准: 逐点换算(每次新建Screen) vs CoordinateSpace整组换算, 并校验结果与旧实现逐点一致"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from wincontrol_server.bench.stubs import install_mss_stub
+
+# (left, top, width, height), 包含非零原点和非16:9的显示器
+GEOMETRIES = [
+    (0, 0, 1920, 1080),
+    (0, 0, 2560, 1440),
+    (0, 0, 3840, 2160),
+    (0, 0, 1366, 768),
+    (0, 0, 1280, 1024),
+    (-1920, 0, 1920, 1200),
+    (100, 50, 2560, 1080),
+]
+
+
+def legacy_coord_to_screen(geometry: tuple, u: int, v: int) -> tuple[int, int]:
+    """旧实现"""
+    screen_left, screen_top, screen_w, screen_h = geometry
+
+    U_MAX = 1000
+    V_MAX = int(1000 / screen_w * screen_h)
+
+    u = max(1, min(u, U_MAX))
+    v = max(1, min(v, V_MAX))
+
+    x = int(u / U_MAX * screen_w)
+    y = int(v / V_MAX * screen_h)
+
+    x_real = max(screen_left, min(screen_left + x, screen_left + screen_w - 1))
+    y_real = max(screen_top, min(screen_top + y, screen_top + screen_h - 1))
+
+    return (x_real, y_real)
+
+
+def legacy_screen_to_coord(geometry: tuple, x: int, y: int) -> tuple[int, int]:
+    """旧实现"""
+    screen_left, screen_top, screen_w, screen_h = geometry
+
+    U_MAX = 1000
+    V_MAX = int(1000 / screen_w * screen_h)
+
+    x = x - screen_left
+    y = y - screen_top
+
+    x = max(0, min(x, screen_w - 1))
+    y = max(0, min(y, screen_h - 1))
+
+    u = int(x / (screen_w - 1) * U_MAX)
+    v = int(y / (screen_h - 1) * V_MAX)
+
+    return (max(1, u), max(1, v))
+
+
+def check_parity(points: int, seed: int) -> bool:
+    """在各种显示器几何下比较两个方向的换算, 包括越界点"""
+    from wincontrol_server.runtime.runtime import CoordinateSpace
+
+    rng = np.random.default_rng(seed)
+    ok = True
+    for geometry in GEOMETRIES:
+        space = CoordinateSpace(*geometry)
+        left, top, width, height = geometry
+
+        u = rng.integers(-50, 1100, points)
+        v = rng.integers(-50, space.v_max + 100, points)
+        x, y = space.to_screen(u, v)
+        expected = [
+            legacy_coord_to_screen(geometry, int(a), int(b)) for a, b in zip(u, v)
+        ]
+        if [tuple(p) for p in zip(x.tolist(), y.tolist())] != expected:
+            print(f"MISMATCH to_screen {geometry}")
+            ok = False
+
+        x = rng.integers(left - 100, left + width + 100, points)
+        y = rng.integers(top - 100, top + height + 100, points)
+        u, v = space.to_coord(x, y)
+        expected = [
+            legacy_screen_to_coord(geometry, int(a), int(b)) for a, b in zip(x, y)
+        ]
+        if [tuple(p) for p in zip(u.tolist(), v.tolist())] != expected:
+            print(f"MISMATCH to_coord {geometry}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    install_mss_stub(3840, 2160)
+    from wincontrol_server.devices.screen import Screen
+    from wincontrol_server.runtime.runtime import get_coordinate_space
+
+    if not check_parity(args.points, args.seed):
+        sys.exit(1)
+    print("parity: ok")
+
+    rng = np.random.default_rng(args.seed)
+    for n in (10, 100, 1000):
+        centers = rng.integers(0, 1920, (n, 2))
+
+        start = time.perf_counter()
+        with Screen() as screen:
+            geometry = (screen.left, screen.top, screen.width, screen.height)
+            legacy = {
+                i: legacy_screen_to_coord(geometry, x, y)
+                for i, (x, y) in enumerate(centers)
+            }
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        u, v = get_coordinate_space().to_coord(centers[:, 0], centers[:, 1])
+        batched = {i: (int(a), int(b)) for i, (a, b) in enumerate(zip(u, v))}
+        batched_ms = (time.perf_counter() - start) * 1000
+
+        assert legacy == batched
+        print(
+            f"{n:>5} boxes: per-point {legacy_ms:7.3f} ms | "
+            f"vectorized {batched_ms:7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""差分截图基准: 模拟一次操作只改变一小块区域(菜单、复选框、输入框), 比较整屏截图与差分截图的耗时、字节数和图像token"""
+
+import argparse
+import base64
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.stubs import install_input_stubs, install_mss_stub
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+
+def _images(result: dict) -> list[dict]:
+    return [result[k] for k in ("image", "crop", "thumbnail") if k in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolution", nargs="+", default=["1920x1080", "3840x2160"])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = install_mss_stub()
+    install_input_stubs()
+    from wincontrol_server.devices.screen import get_screen_service
+    from wincontrol_server.resources import screen_resources
+    from wincontrol_server.runtime.executors import CancelToken
+
+    pixels_per_token = screen_resources._PIXELS_PER_TOKEN
+    tier = screen_resources.resolve_tier(screen_resources._DEFAULT_TIER)
+    rng = np.random.default_rng(args.seed)
+
+    for resolution in args.resolution:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        img, _ = synthetic_ui(width, height, max(50, width * height // 20000), 0)
+        frame = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+
+        def show(bgra: np.ndarray):
+            stats.set_frame(bgra)
+            get_screen_service().invalidate()
+
+        # 每一步在随机位置画一个菜单/复选框大小的色块
+        steps = []
+        for _ in range(args.steps):
+            w, h = int(rng.integers(16, 240)), int(rng.integers(16, 200))
+            x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+            frame = frame.copy()
+            color = [int(c) for c in rng.integers(0, 256, 3)] + [255]
+            cv2.rectangle(frame, (x, y), (x + w - 1, y + h - 1), color, -1)
+            steps.append(frame)
+
+        totals = {}
+        for mode in ("full", "delta"):
+            show(cv2.cvtColor(img, cv2.COLOR_BGR2BGRA))
+            screen_resources._LAST_SHOTS.clear()
+            screen_resources._screen_shot(CancelToken(), tier)
+            elapsed, size, tokens = [], 0, 0
+            for bgra in steps:
+                show(bgra)
+                start = time.perf_counter()
+                if mode == "full":
+                    data = screen_resources._screen_shot(CancelToken(), tier)
+                    elapsed.append((time.perf_counter() - start) * 1000)
+                    size += len(base64.b64encode(data))
+                    scale = tier.scale(width, height, pixels_per_token)
+                    tokens += round(width * scale) * round(height * scale)
+                else:
+                    result = screen_resources._delta_shot(CancelToken())
+                    elapsed.append((time.perf_counter() - start) * 1000)
+                    for item in _images(result):
+                        size += len(item["data"])
+                        tokens += item["width"] * item["height"]
+            totals[mode] = (np.median(elapsed), size / len(steps), tokens / len(steps))
+
+        print(f"{resolution} ({args.steps} steps):")
+        for mode, (ms, size, pixels) in totals.items():
+            print(
+                f"  {mode:>5}: {ms:7.1f} ms/step  {size / 1024:8.1f} KB base64/step  "
+                f"~{pixels / pixels_per_token:7.0f} image tokens/step"
+            )
+
+
+if __name__ == "__main__":
+    main()
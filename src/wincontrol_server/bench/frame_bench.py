@@ -0,0 +1,57 @@
+"""截图帧转换内存/耗时基准: 旧的拷贝路径 vs BGRA零拷贝视图+预分配缓冲区"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.common import measure_memory
+from wincontrol_server.devices.screen import bgra_to_bgr
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+def _legacy(raw: bytearray, width: int, height: int) -> np.ndarray:
+    """旧实现: bytes拷贝 + 切片拷贝, 再缩放"""
+    img = np.frombuffer(bytes(raw), dtype=np.uint8)
+    img = img.reshape(height, width, 4)
+    img = img[:, :, :3].copy()
+    return cv2.resize(img, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+
+
+def _zero_copy(raw: bytearray, width: int, height: int, out: np.ndarray) -> np.ndarray:
+    """新实现: BGRA视图直接写入预分配BGR缓冲区, 再缩放"""
+    bgra = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+    img = bgra_to_bgr(bgra, out)
+    return cv2.resize(img, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for name, (width, height) in RESOLUTIONS.items():
+        raw = bytearray(rng.integers(0, 256, width * height * 4, dtype=np.uint8))
+        out = np.empty((height, width, 3), dtype=np.uint8)
+
+        legacy = measure_memory(lambda: _legacy(raw, width, height), args.iterations)
+        zero_copy = measure_memory(
+            lambda: _zero_copy(raw, width, height, out), args.iterations
+        )
+        assert np.array_equal(
+            _legacy(raw, width, height), _zero_copy(raw, width, height, out)
+        )
+        print(
+            f"{name:>6}: legacy {legacy[0]:7.2f} ms {legacy[1]:7.2f} MB | "
+            f"zero-copy {zero_copy[0]:7.2f} ms {zero_copy[1]:7.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""融合模型一致性检查与基准: 在合成界面截图上比较classic流水线与融合了预处理和NMS的模型的解析结果和耗时"""
+
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+
+import numpy as np
+
+from wincontrol_server.bench.common import median_ms
+from wincontrol_server.bench.stubs import install_mss_stub
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def _same(expected, actual) -> bool:
+    """两次解析的框索引、归一化坐标和标注图完全一致"""
+    return expected.boxes == actual.boxes and np.array_equal(
+        expected.parsed_img, actual.parsed_img
+    )
+
+
+def _tied(omini, img: np.ndarray) -> bool:
+    """classic流水线中通过置信度过滤的候选框是否有相同的置信度, 此时两条流水线的NMS可能保留不同的框"""
+    proc_img, _, _ = omini._preprocess(img)
+    scores = omini._run(proc_img)[0][0][4]
+    scores = scores[scores > omini.settings[0]]
+    return len(np.unique(scores)) < len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--resolution", nargs="+", default=["960x540", "1920x1080"])
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    install_mss_stub()
+    from wincontrol_server.parser.fused import build_fused_model
+    from wincontrol_server.parser.omini import Omini
+
+    classic = Omini(args.model)
+    with tempfile.TemporaryDirectory() as tmp:
+        conf, iou, _ = classic.settings
+        fused_path = build_fused_model(
+            args.model, str(Path(tmp) / "fused.onnx"), conf, iou
+        )
+        fused = Omini(str(fused_path))
+    print(f"pipelines: {classic.pipeline} vs {fused.pipeline}")
+
+    failures = 0
+    for resolution in args.resolution:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        images = [
+            synthetic_ui(width, height, max(20, width * height // 20000), seed)[0]
+            for seed in range(args.seeds)
+        ]
+
+        # 单区域、批量和切片解析的结果都应与classic流水线一致;
+        # 候选框置信度相同的图像上NMS的保留顺序不同, 只报告不计为失败
+        mismatched, tie_order = [], []
+        tied = [_tied(classic, img) for img in images]
+        for seed, img in enumerate(images):
+            cases = {
+                "parse": lambda o: [o.parse(10, 20, img.copy())],
+                "parse_tiled": lambda o: [o.parse_tiled(0, 0, img.copy(), 0.5)],
+            }
+            for name, call in cases.items():
+                if not all(map(_same, call(classic), call(fused))):
+                    (tie_order if tied[seed] else mismatched).append(
+                        f"{name}[seed={seed}]"
+                    )
+        batch = [(0, 0, img) for img in images]
+        if not all(
+            map(
+                _same,
+                classic.parse_batch([(x, y, i.copy()) for x, y, i in batch]),
+                fused.parse_batch([(x, y, i.copy()) for x, y, i in batch]),
+            )
+        ):
+            (tie_order if any(tied) else mismatched).append("parse_batch")
+        failures += len(mismatched)
+
+        img = images[0]
+        boxes = len(classic.parse(0, 0, img.copy()).boxes)
+        classic_ms = median_ms(lambda: classic.parse(0, 0, img.copy()), args.runs)
+        fused_ms = median_ms(lambda: fused.parse(0, 0, img.copy()), args.runs)
+        print(
+            f"{resolution}: {boxes} boxes, classic {classic_ms:7.1f} ms, "
+            f"fused {fused_ms:7.1f} ms, "
+            f"parity {'ok' if not mismatched else 'FAILED: ' + ', '.join(mismatched)}"
+        )
+        if tie_order:
+            print(f"  differs only on tied scores: {', '.join(tie_order)}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
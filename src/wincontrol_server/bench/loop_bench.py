@@ -0,0 +1,121 @@
+"""事件循环响应基准: 工具执行期间测量事件循环卡顿(在事件循环中直接执行 vs 交给工作线程), 并验证取消请求能中止拖拽"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from wincontrol_server.bench.common import loop_lag_during
+from wincontrol_server.bench.stubs import (
+    FakeSession,
+    install_input_stubs,
+    install_mss_stub,
+)
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+async def main_async(args):
+    from mcp.server.fastmcp import FastMCP
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from mcp.types import CancelledNotification, CancelledNotificationParams
+
+    from wincontrol_server.devices.mouse import Mouse
+    from wincontrol_server.parser.omini import Omini
+    from wincontrol_server.runtime.executors import CancelToken
+    from wincontrol_server.runtime.loader import BackgroundLoader
+    from wincontrol_server.tools import mouse_tools, screen_tools
+
+    # 记录拖拽移动次数和左键松开
+    moves, releases = [0], [0]
+    move_to, release = Mouse.move_to, Mouse.release
+
+    def counting_move_to(self, x, y):
+        moves[0] += 1
+        move_to(self, x, y)
+
+    def counting_release(self, btn):
+        releases[0] += 1
+        release(self, btn)
+
+    Mouse.move_to = counting_move_to
+    Mouse.release = counting_release
+
+    if args.fake_model or not Path(args.model).is_file():
+        omini = Omini("", session=FakeSession())
+    else:
+        omini = Omini(args.model)
+    screen_tools._OMINI = BackgroundLoader(lambda: omini)
+
+    mcp = FastMCP("wincontrol-bench")
+    mouse_tools.register(mcp)
+    screen_tools.register(mcp)
+
+    # 对照组: 旧的同步工具, 在事件循环中直接执行
+    @mcp.tool()
+    def inline_drag(u: int, v: int) -> str:
+        mouse_tools._drag(CancelToken(), u, v)
+        return "ok"
+
+    @mcp.tool()
+    def inline_parse(region: str) -> list:
+        screen_tools._PARSE_CACHE._entries.clear()
+        return screen_tools._parse_region(CancelToken(), omini, region)
+
+    async def offloaded_parse(session):
+        screen_tools._PARSE_CACHE._entries.clear()
+        await session.call_tool("screen_region_parser", {"region": "mid_mid"})
+
+    async with create_connected_server_and_client_session(mcp._mcp_server) as session:
+        cases = {
+            "drag inline": lambda: session.call_tool(
+                "inline_drag", {"u": 900, "v": 500}
+            ),
+            "drag offloaded": lambda: session.call_tool(
+                "left_drag", {"u": 900, "v": 500}
+            ),
+            "parse inline": lambda: session.call_tool(
+                "inline_parse", {"region": "mid_mid"}
+            ),
+            "parse offloaded": lambda: offloaded_parse(session),
+        }
+        # 客户端和服务端在同一个事件循环中, 卡顿即为ping等请求被推迟处理的时间
+        for name, call in cases.items():
+            elapsed, worst = await loop_lag_during(call)
+            print(
+                f"{name:>16}: call {elapsed:7.1f} ms, "
+                f"max loop stall {worst:7.1f} ms"
+            )
+
+        # 拖拽开始后取消请求
+        moves[0] = releases[0] = 0
+        request_id = session._request_id
+        task = asyncio.create_task(
+            session.call_tool("left_drag", {"u": 900, "v": 500})
+        )
+        await asyncio.sleep(0.05)
+        await session.send_notification(
+            CancelledNotification(
+                params=CancelledNotificationParams(requestId=request_id)
+            )
+        )
+        await asyncio.sleep(0.2)
+        task.cancel()
+        print(
+            f"cancelled drag: {moves[0]} of 61 moves, left button released "
+            f"{releases[0]} time(s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--fake-model", action="store_true")
+    args = parser.parse_args()
+
+    install_mss_stub()
+    install_input_stubs()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
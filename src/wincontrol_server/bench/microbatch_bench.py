@@ -0,0 +1,101 @@
+"""微批调度基准: 多个客户端并发发出单区域解析请求, 比较直接逐个推理与不同收集窗口下的吞吐、延迟和平均批大小"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import time
+
+import numpy as np
+
+from wincontrol_server.bench.stubs import FakeSession, install_mss_stub
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def _load(parser, images, clients: int) -> dict:
+    """clients个客户端各自连续发请求直到发完全部图像, 返回吞吐和延迟分位数"""
+    latencies = []
+    pending = list(images)
+
+    def client():
+        while True:
+            try:
+                img = pending.pop()
+            except IndexError:
+                return
+            start = time.perf_counter()
+            parser.parse(0, 0, img.copy())
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client) for _ in range(clients)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--fake-model", action="store_true")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5, 10])
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=48)
+    args = parser.parse_args()
+
+    install_mss_stub()
+    from wincontrol_server.parser.batcher import MicroBatcher
+    from wincontrol_server.parser.omini import Omini
+
+    if args.fake_model or not Path(args.model).is_file():
+        omini = Omini("", session=FakeSession())
+    else:
+        omini = Omini(args.model)
+    if not omini.supports_batch:
+        print("model has a fixed batch size of 1, requests are not batched")
+
+    img, _ = synthetic_ui(960, 540, 60, 0)
+    images = [img] * args.requests
+
+    # 批量推理结果与逐个推理一致
+    batcher = MicroBatcher(omini, args.max_batch, 5.0)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        batched = list(
+            executor.map(lambda _: batcher.parse(0, 0, img.copy()), range(4))
+        )
+    single = omini.parse(0, 0, img.copy())
+    same = all(
+        result.boxes == single.boxes
+        and np.array_equal(result.parsed_img, single.parsed_img)
+        for result in batched
+    )
+    print(f"batched results match single parse: {same}")
+
+    for clients in args.clients:
+        print(f"{clients} client(s):")
+        result = _load(omini, images, clients)
+        print(
+            f"  {'direct':>12}: {result['throughput']:6.1f} parses/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms"
+        )
+        for window in args.windows:
+            batcher = MicroBatcher(omini, args.max_batch, window)
+            result = _load(batcher, images, clients)
+            stats = batcher.stats()
+            label = f"window {window:g}ms"
+            print(
+                f"  {label:>12}: {result['throughput']:6.1f} parses/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                f"mean batch {stats['mean_batch']:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""NMS后处理基准与一致性校验: 逐框循环实现 vs 分块矩阵实现, 含量化后置信度相同的样本"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from wincontrol_server.bench.common import best_ms
+from wincontrol_server.parser.postprocess import nms, overlap_nms
+
+
+def legacy_nms(boxes_raw: np.ndarray, scores: np.ndarray, iou_thr: float) -> np.ndarray:
+    """原Omini._nms实现, 作为一致性基准"""
+    x1 = boxes_raw[:, 0] - (boxes_raw[:, 2] / 2)
+    y1 = boxes_raw[:, 1] - (boxes_raw[:, 3] / 2)
+    x2 = boxes_raw[:, 0] + (boxes_raw[:, 2] / 2)
+    y2 = boxes_raw[:, 1] + (boxes_raw[:, 3] / 2)
+
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+
+        inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-6)
+        order = order[np.where(iou <= iou_thr)[0] + 1]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def legacy_overlap_nms(boxes_raw: np.ndarray, overlap: float) -> np.ndarray:
+    """原Omini._overlap_nms实现, 作为一致性基准"""
+    if len(boxes_raw) == 0:
+        return np.array([], dtype=np.int64)
+
+    x1 = boxes_raw[:, 0] - boxes_raw[:, 2] / 2
+    y1 = boxes_raw[:, 1] - boxes_raw[:, 3] / 2
+    x2 = boxes_raw[:, 0] + boxes_raw[:, 2] / 2
+    y2 = boxes_raw[:, 1] + boxes_raw[:, 3] / 2
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = areas.argsort()
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+
+        if order.size == 1:
+            break
+
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+
+        w = np.maximum(0, xx2 - xx1)
+        h = np.maximum(0, yy2 - yy1)
+        inter = w * h
+
+        iom = inter / (areas[i] + 1e-6)
+        order = order[np.where(iom <= overlap)[0] + 1]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def synthetic_candidates(
+    n: int, seed: int = 0, size: int = 640, per_object: int = 16
+) -> tuple[np.ndarray, np.ndarray]:
+    """生成类似YOLO输出的候选框: 每个目标周围抖动聚集per_object个框, 返回([cx, cy, w, h], scores)"""
+    rng = np.random.default_rng(seed)
+    n_objects = max(1, n // per_object)
+    centers = rng.uniform(0, size, (n_objects, 2))
+    sizes = rng.uniform(8, 120 if per_object > 1 else 24, (n_objects, 2))
+
+    owner = rng.integers(0, n_objects, n)
+    cxcy = centers[owner] + rng.normal(0, 4, (n, 2))
+    wh = sizes[owner] * rng.uniform(0.8, 1.2, (n, 2))
+    boxes = np.concatenate([cxcy, wh], axis=1).astype(np.float32)
+    scores = rng.uniform(0.05, 1.0, n).astype(np.float32)
+    return boxes, scores
+
+
+def quantized(scores: np.ndarray, levels: int = 16) -> np.ndarray:
+    """把置信度量化到少数几档, 模拟INT8模型输出中大量相同的置信度"""
+    return (np.round(scores * levels) / levels).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 8000])
+    parser.add_argument("--seeds", type=int, default=5, help="一致性校验的随机样本数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--iou", type=float, default=0.1)
+    parser.add_argument("--overlap", type=float, default=0.3)
+    args = parser.parse_args()
+
+    mismatches = 0
+    # clustered: 每个目标16个候选框(大部分被抑制); sparse: 候选框互不相干(大部分保留)
+    for layout, per_object in (("clustered", 16), ("sparse", 1)):
+        for n in args.sizes:
+            for seed in range(args.seeds):
+                boxes, scores = synthetic_candidates(n, seed, per_object=per_object)
+                for tied in (False, True):
+                    s = quantized(scores) if tied else scores
+                    if not np.array_equal(
+                        nms(boxes, s, args.iou), legacy_nms(boxes, s, args.iou)
+                    ):
+                        mismatches += 1
+                        print(f"nms mismatch: {layout} n={n} seed={seed} tied={tied}")
+                if not np.array_equal(
+                    overlap_nms(boxes, args.overlap),
+                    legacy_overlap_nms(boxes, args.overlap),
+                ):
+                    mismatches += 1
+                    print(f"overlap_nms mismatch: {layout} n={n} seed={seed}")
+
+            boxes, scores = synthetic_candidates(n, per_object=per_object)
+            old_nms, kept = best_ms(
+                lambda: legacy_nms(boxes, scores, args.iou), args.repeat
+            )
+            new_nms, _ = best_ms(lambda: nms(boxes, scores, args.iou), args.repeat)
+            old_ovl, _ = best_ms(
+                lambda: legacy_overlap_nms(boxes, args.overlap), args.repeat
+            )
+            new_ovl, _ = best_ms(lambda: overlap_nms(boxes, args.overlap), args.repeat)
+            print(
+                f"{layout:>9} n={n:>5} kept={kept.size:>5}"
+                f" | nms {old_nms:8.2f} -> {new_nms:7.2f} ms"
+                f" | overlap_nms {old_ovl:8.2f} -> {new_ovl:7.2f} ms"
+            )
+
+    if mismatches:
+        print(f"{mismatches} mismatches")
+        sys.exit(1)
+    print("keep sets identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""截图指针叠加基准: 旧的逐通道float64混合 vs 预乘指针整数混合(原分辨率/缩小后叠加), 默认4K"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.common import median_us
+from wincontrol_server.bench.stubs import install_input_stubs, install_mss_stub
+
+
+def legacy_overlay(img_bgr: np.ndarray, pointer_img: np.ndarray, px: int, py: int):
+    """旧实现: 原分辨率逐通道float64混合, 不处理左/上边界外的指针"""
+    height, width = img_bgr.shape[:2]
+    ph, pw = pointer_img.shape[:2]
+    if px + pw > width:
+        pw = width - px
+    if py + ph > height:
+        ph = height - py
+    if pw <= 0 or ph <= 0:
+        return
+    pointer = pointer_img[:ph, :pw]
+    alpha = pointer[:, :, 3] / 255.0
+    for c in range(3):
+        img_bgr[py : py + ph, px : px + pw, c] = (
+            alpha * pointer[:, :, c]
+            + (1 - alpha) * img_bgr[py : py + ph, px : px + pw, c]
+        ).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    install_mss_stub(args.width, args.height)
+    install_input_stubs()
+    from wincontrol_server.resources.screen_resources import (
+        _POINTER_IMG,
+        overlay_pointer,
+    )
+
+    rng = np.random.default_rng(0)
+    screen = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    px, py = args.width // 3, args.height // 3
+    size = (args.width // 2, args.height // 2)
+
+    # 原分辨率叠加与旧实现的差异(预乘整数运算四舍五入, 旧实现截断)
+    legacy, fused = screen.copy(), screen.copy()
+    legacy_overlay(legacy, _POINTER_IMG, px, py)
+    overlay_pointer(fused, px, py)
+    diff = np.abs(legacy.astype(np.int16) - fused).max()
+    print(f"full-resolution max abs diff vs legacy: {diff}")
+
+    # 左/上边界外的指针只叠加可见部分
+    ph, pw = _POINTER_IMG.shape[:2]
+    for x, y in ((-pw // 2, 10), (10, -ph // 2), (-pw // 2, -ph // 2), (-pw, -ph)):
+        img = screen.copy()
+        overlay_pointer(img, x, y)
+        changed = np.argwhere((img != screen).any(axis=2))
+        if len(changed):
+            (y0, x0), (y1, x1) = changed.min(axis=0), changed.max(axis=0)
+            extent = f"x {x0}..{x1}, y {y0}..{y1}"
+        else:
+            extent = "nothing"
+        print(f"pointer at ({x:>4}, {y:>4}): changed {extent}")
+
+    work = screen.copy()
+    small = cv2.resize(screen, size, interpolation=cv2.INTER_AREA)
+    cases = {
+        "legacy overlay (full res)": lambda: legacy_overlay(
+            work, _POINTER_IMG, px, py
+        ),
+        "premultiplied (full res)": lambda: overlay_pointer(work, px, py),
+        "premultiplied (after resize)": lambda: overlay_pointer(
+            small, px // 2, py // 2, scale=0.5
+        ),
+    }
+    for name, fn in cases.items():
+        print(f"{name:>30}: {median_us(fn, args.iterations):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""解析后端基准: 并发解析请求下比较线程后端与工作进程后端的吞吐、延迟和事件循环卡顿, 并验证工作进程崩溃、启动缓慢和重启失败时的恢复"""
+
+import argparse
+import asyncio
+from functools import partial
+import os
+from pathlib import Path
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from wincontrol_server.bench.common import loop_lag_during
+from wincontrol_server.bench.stubs import FakeSession, install_mss_stub
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def fake_omini():
+    """工作进程中构造使用模拟会话的Omini(需为模块级函数才能传给spawn进程)"""
+    from wincontrol_server.parser.omini import Omini
+
+    return Omini("", session=FakeSession())
+
+
+def flaky_omini(factory, marker: str):
+    """标记文件存在时构造失败, 用于模拟工作进程重启失败"""
+    if os.path.exists(marker):
+        raise RuntimeError(f"refusing to start while {marker} exists")
+    return factory()
+
+
+def slow_omini(factory, marker: str, delay: float):
+    """标记文件存在时延迟构造, 用于模拟启动很慢的工作进程"""
+    if os.path.exists(marker):
+        time.sleep(delay)
+    return factory()
+
+
+def _wait(condition, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def _check_failed_restart(factory, img: np.ndarray) -> list[str]:
+    """工作进程崩溃后重启失败: 健康检查线程不能退出, 请求得到WorkerError,
+    之后能够启动时由健康检查重启并恢复解析, 返回未满足的检查项"""
+    from wincontrol_server.parser.worker_pool import OminiPool, WorkerError
+
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        marker = os.path.join(tmp, "fail")
+        pool = OminiPool(
+            partial(flaky_omini, factory, marker), workers=1, health_interval=0.2
+        )
+        try:
+            open(marker, "w").close()
+            os.kill(
+                pool._workers[0].process.pid, getattr(signal, "SIGKILL", signal.SIGTERM)
+            )
+            if not _wait(lambda: pool.stats()["restarts"] >= 2):
+                problems.append("health check stopped retrying the failed worker")
+            if not any(
+                thread.name == "omini-pool-health" for thread in threading.enumerate()
+            ):
+                problems.append("health check thread died")
+            try:
+                pool.parse(0, 0, img.copy())
+                problems.append("parse succeeded on a worker that cannot start")
+            except WorkerError:
+                pass
+            except Exception as e:
+                problems.append(f"parse raised {type(e).__name__}: {e}")
+            stats = pool.stats()
+            if stats["busy"] != 0 or stats["alive"] != 0:
+                problems.append(f"unexpected stats with a dead worker: {stats}")
+
+            os.remove(marker)
+            if not _wait(lambda: pool.stats()["alive"] == 1):
+                problems.append("worker was not restarted after it could start again")
+            else:
+                pool.parse(0, 0, img.copy())
+            print(f"after a failed restart: {pool.stats()}")
+        finally:
+            pool.close()
+    return problems
+
+
+def _check_slow_restart(factory, img: np.ndarray, delay: float = 10.0) -> list[str]:
+    """健康检查重启一个启动很慢的工作进程时, 其余工作进程照常处理请求, 返回未满足的检查项"""
+    from wincontrol_server.parser.worker_pool import OminiPool
+
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        marker = os.path.join(tmp, "slow")
+        pool = OminiPool(
+            partial(slow_omini, factory, marker, delay), workers=2, health_interval=0.2
+        )
+        try:
+            open(marker, "w").close()
+            os.kill(
+                pool._workers[0].process.pid, getattr(signal, "SIGKILL", signal.SIGTERM)
+            )
+            if not _wait(lambda: pool.stats()["restarts"] >= 1):
+                problems.append("health check did not restart the killed worker")
+            start = time.perf_counter()
+            pool.parse(0, 0, img.copy())
+            elapsed = time.perf_counter() - start
+            print(f"parse during a {delay:g}s restart: {elapsed * 1000:.0f} ms")
+            if elapsed > delay / 2:
+                problems.append(f"parse waited {elapsed:.1f}s for the restart")
+        finally:
+            pool.close()
+    return problems
+
+
+async def _run_load(parse, images, concurrency: int) -> dict:
+    """以固定并发数发出全部解析请求, 同时测量事件循环的最大卡顿"""
+    from wincontrol_server.runtime.executors import run_cpu
+
+    latencies = []
+    pending = list(images)
+
+    async def client():
+        while pending:
+            img = pending.pop()
+            start = time.perf_counter()
+            await run_cpu(lambda token, img: parse(0, 0, img.copy()), img)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def load():
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    elapsed, worst = await loop_lag_during(load)
+    return {
+        "throughput": len(latencies) / elapsed * 1000,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "stall_ms": worst,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--fake-model", action="store_true")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=24)
+    args = parser.parse_args()
+
+    install_mss_stub()
+    from wincontrol_server.parser.omini import Omini
+    from wincontrol_server.parser.worker_pool import OminiPool
+
+    if args.fake_model or not Path(args.model).is_file():
+        factory = fake_omini
+    else:
+        factory = partial(Omini, args.model)
+
+    img, _ = synthetic_ui(960, 540, 60, 0)
+    images = [img] * args.requests
+
+    start = time.perf_counter()
+    pool = OminiPool(factory, workers=args.workers, health_interval=0.5)
+    print(f"pool startup ({args.workers} workers): {time.perf_counter() - start:.2f} s")
+
+    backends = {"thread": factory().parse, "process": pool.parse}
+    for name, parse in backends.items():
+        result = asyncio.run(_run_load(parse, images, args.concurrency))
+        print(
+            f"{name:>8}: {result['throughput']:6.1f} parses/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+            f"max loop stall {result['stall_ms']:7.1f} ms"
+        )
+
+    # 结束一个空闲的工作进程, 健康检查应将其重启
+    victim = pool._workers[0].process
+    os.kill(victim.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    deadline = time.monotonic() + 60
+    while pool.stats()["restarts"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    while pool.stats()["alive"] < args.workers and time.monotonic() < deadline:
+        time.sleep(0.1)
+    pool.parse(0, 0, img.copy())
+    print(f"after killing worker 0: {pool.stats()}")
+    pool.close()
+
+    failed = 0
+    for name, check in (
+        ("slow restart", _check_slow_restart),
+        ("failed restart", _check_failed_restart),
+    ):
+        problems = check(factory, img)
+        failed += bool(problems)
+        verdict = "ok" if not problems else "FAILED: " + "; ".join(problems)
+        print(f"{name}: {verdict}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""letterbox预处理基准: 旧的逐步分配实现 vs 写入复用缓冲区的融合实现, 含逐像素一致性校验和分阶段耗时"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.common import measure_memory
+from wincontrol_server.parser.preprocess import letterbox, letterbox_geometry
+
+# 区域尺寸: 九宫格区域(半屏)、横/竖/方形、需要放大的小图和奇数尺寸
+SIZES = [
+    (960, 540),
+    (1280, 720),
+    (1920, 1080),
+    (540, 960),
+    (640, 640),
+    (300, 200),
+    (1001, 333),
+    (333, 1001),
+]
+
+
+def legacy_preprocess(
+    image: np.ndarray, input_l: int, stages: dict | None = None
+) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """旧实现: resize -> copyMakeBorder -> cvtColor -> astype -> 除法 -> transpose -> 连续化"""
+    clock = time.perf_counter()
+
+    def mark(name: str):
+        nonlocal clock
+        now = time.perf_counter()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + (now - clock) * 1000
+        clock = now
+
+    img_h = image.shape[0]
+    img_w = image.shape[1]
+
+    ratio = input_l / max(img_w, img_h)
+    if img_w > img_h:
+        new_w = input_l
+        new_h = round(img_h * ratio)
+    else:
+        new_w = round(img_w * ratio)
+        new_h = input_l
+    resized = cv2.resize(image, (new_w, new_h))
+    mark("resize")
+
+    pad_w = (input_l - new_w) / 2
+    pad_h = (input_l - new_h) / 2
+
+    top = int(np.floor(pad_h))
+    bottom = int(np.ceil(pad_h))
+    left = int(np.floor(pad_w))
+    right = int(np.ceil(pad_w))
+
+    padded = cv2.copyMakeBorder(
+        resized,
+        top,
+        bottom,
+        left,
+        right,
+        cv2.BORDER_CONSTANT,
+        value=(114, 114, 114),
+    )
+    mark("pad")
+
+    rgb = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+    mark("cvtColor")
+    proc_img = rgb.astype(np.float32)
+    mark("astype")
+    proc_img = proc_img / 255.0
+    mark("divide")
+    proc_img = np.ascontiguousarray(proc_img.transpose(2, 0, 1)[np.newaxis])
+    mark("transpose")
+    return proc_img, ratio, (left, top)
+
+
+def fused_stages(image: np.ndarray, input_l: int, stages: dict) -> np.ndarray:
+    """按letterbox的步骤分阶段计时, 结果与letterbox一致"""
+    clock = time.perf_counter()
+
+    def mark(name: str):
+        nonlocal clock
+        now = time.perf_counter()
+        stages[name] = stages.get(name, 0.0) + (now - clock) * 1000
+        clock = now
+
+    _, new_w, new_h, left, top = letterbox_geometry(
+        image.shape[1], image.shape[0], input_l
+    )
+    canvas = np.full((input_l, input_l, 3), 114, dtype=np.uint8)
+    planes = np.empty((3, input_l, input_l), dtype=np.uint8)
+    out = np.empty((3, input_l, input_l), dtype=np.float32)
+    clock = time.perf_counter()
+
+    cv2.resize(
+        image, (new_w, new_h), dst=canvas[top : top + new_h, left : left + new_w]
+    )
+    mark("resize into canvas")
+    for c in range(3):
+        cv2.extractChannel(canvas, 2 - c, dst=planes[c])
+    mark("split channels")
+    np.divide(planes, np.float32(255.0), out=out, dtype=np.float32)
+    mark("normalize into tensor")
+    return out
+
+
+def check_parity(input_l: int) -> bool:
+    """逐像素比较新旧实现(包括填充比例和偏移), 返回是否全部一致"""
+    rng = np.random.default_rng(0)
+    ok = True
+    for width, height in SIZES:
+        # 连续调用不同尺寸, 检查复用画布时填充区域是否被正确重置
+        for _ in range(2):
+            image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            expected, ratio, pad = legacy_preprocess(image, input_l)
+            actual, new_ratio, new_pad = letterbox(image, input_l)
+            same = (
+                np.array_equal(expected[0], actual)
+                and ratio == new_ratio
+                and pad == new_pad
+            )
+            if not same:
+                diff = np.abs(expected[0] - actual).max()
+                print(f"MISMATCH {width}x{height}: max diff {diff}, {pad} vs {new_pad}")
+                ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--input-size", type=int, default=640)
+    args = parser.parse_args()
+
+    if not check_parity(args.input_size):
+        sys.exit(1)
+    print("parity: ok")
+
+    rng = np.random.default_rng(1)
+    for width, height in SIZES[:3]:
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        legacy = measure_memory(
+            lambda: legacy_preprocess(image, args.input_size), args.iterations
+        )
+        fused = measure_memory(
+            lambda: letterbox(image, args.input_size), args.iterations
+        )
+        print(
+            f"{width}x{height}: legacy {legacy[0]:6.2f} ms {legacy[1]:6.2f} MB | "
+            f"fused {fused[0]:6.2f} ms {fused[1]:6.2f} MB"
+        )
+
+        legacy_stages = {}
+        fused_stage_times = {}
+        for _ in range(args.iterations):
+            legacy_preprocess(image, args.input_size, legacy_stages)
+            fused_stages(image, args.input_size, fused_stage_times)
+        for label, stages in (("legacy", legacy_stages), ("fused", fused_stage_times)):
+            summary = "  ".join(
+                f"{name} {total / args.iterations:.2f}" for name, total in stages.items()
+            )
+            print(f"    {label:>6} stages (ms): {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""量化模型回归检查: 以FP32模型的检测框为基准, 在帧集上比较INT8/FP16变体的召回率、精确率和解析耗时, 只有检测质量达标且更快的变体才被接受"""
+
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.common import half_screen_regions
+from wincontrol_server.bench.stubs import install_mss_stub
+from wincontrol_server.bench.suite import load_frames
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def detections(omini, img: np.ndarray) -> np.ndarray:
+    """经置信度过滤、NMS和重叠框过滤后的检测框, 区域像素坐标(x1, y1, x2, y2)"""
+    ((boxes_raw, _, ratio, (pad_x, pad_y)),) = omini._detect([img])
+    boxes_raw = boxes_raw[omini._overlap_nms(boxes_raw)].astype(np.float64)
+    cx, cy, w, h = boxes_raw.T
+    return np.stack(
+        [
+            (cx - w / 2 - pad_x) / ratio,
+            (cy - h / 2 - pad_y) / ratio,
+            (cx + w / 2 - pad_x) / ratio,
+            (cy + h / 2 - pad_y) / ratio,
+        ],
+        axis=1,
+    )
+
+
+def matches(expected: np.ndarray, actual: np.ndarray, iou: float) -> int:
+    """按IOU从高到低一对一匹配两组框, 返回IOU不低于阈值的匹配数"""
+    if len(expected) == 0 or len(actual) == 0:
+        return 0
+    xx1 = np.maximum(expected[:, None, 0], actual[:, 0])
+    yy1 = np.maximum(expected[:, None, 1], actual[:, 1])
+    xx2 = np.minimum(expected[:, None, 2], actual[:, 2])
+    yy2 = np.minimum(expected[:, None, 3], actual[:, 3])
+    inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
+
+    def area(boxes):
+        return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    iou_mat = inter / (area(expected)[:, None] + area(actual) - inter + 1e-9)
+    matched = 0
+    while True:
+        i, j = np.unravel_index(iou_mat.argmax(), iou_mat.shape)
+        if iou_mat[i, j] < iou:
+            return matched
+        matched += 1
+        iou_mat[i, :] = -1
+        iou_mat[:, j] = -1
+
+
+def evaluate(omini, baseline: list[np.ndarray], regions, iou: float) -> dict:
+    """变体相对基准检测框的召回率和精确率, 以及逐区域解析耗时的中位数"""
+    expected_total = actual_total = matched = 0
+    elapsed = []
+    for expected, region in zip(baseline, regions):
+        start = time.perf_counter()
+        omini.parse(0, 0, region.copy())
+        elapsed.append((time.perf_counter() - start) * 1000)
+        actual = detections(omini, region)
+        expected_total += len(expected)
+        actual_total += len(actual)
+        matched += matches(expected, actual, iou)
+    return {
+        "recall": matched / expected_total if expected_total else 1.0,
+        "precision": matched / actual_total if actual_total else 1.0,
+        "parse_ms": float(np.median(elapsed)),
+    }
+
+
+def verdict(
+    result: dict, baseline: dict, min_recall: float, min_precision: float
+) -> str:
+    """变体是否被接受: 检测质量不达标或不比FP32快时拒绝"""
+    if result["recall"] < min_recall or result["precision"] < min_precision:
+        return "REJECT (quality)"
+    if result["parse_ms"] >= baseline["parse_ms"]:
+        return "REJECT (not faster)"
+    return "ACCEPT"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        help="待检查的模型文件, 默认在临时目录中生成动态INT8、静态INT8和FP16变体",
+    )
+    parser.add_argument("--frames", help="PNG整屏帧目录, 默认使用合成界面")
+    parser.add_argument("--resolution", nargs="+", default=["1920x1080"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--min-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    install_mss_stub()
+    from wincontrol_server.parser.omini import Omini
+    from wincontrol_server.parser.quantize import build_variant
+
+    regions = [
+        np.ascontiguousarray(region)
+        for _, screen in load_frames(args.frames, args.resolution, args.seed)
+        for _, _, region in half_screen_regions(screen)
+    ]
+    baseline_model = Omini(args.model)
+    baseline = [detections(baseline_model, region) for region in regions]
+    results = {"fp32": evaluate(baseline_model, baseline, regions, args.iou)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = {Path(path).name: path for path in args.variants or []}
+        if not variants:
+            # 静态量化的校准帧与评估帧分开: 合成界面换一个种子
+            calib_dir = Path(tmp) / "calibration"
+            calib_dir.mkdir()
+            for name, screen in load_frames(
+                args.frames, args.resolution, args.seed + 1
+            ):
+                cv2.imwrite(str(calib_dir / f"{Path(name).stem}.png"), screen)
+            variants = {
+                "int8-dynamic": build_variant(
+                    args.model, "int8", str(Path(tmp) / "dynamic.onnx")
+                ),
+                "int8-static": build_variant(
+                    args.model, "int8", str(Path(tmp) / "static.onnx"), str(calib_dir)
+                ),
+                "fp16": build_variant(args.model, "fp16", str(Path(tmp) / "fp16.onnx")),
+            }
+        for name, path in variants.items():
+            results[name] = evaluate(Omini(str(path)), baseline, regions, args.iou)
+
+    print(f"{len(regions)} regions, IOU >= {args.iou}")
+    rejected = 0
+    for name, result in results.items():
+        outcome = ""
+        if name != "fp32":
+            outcome = verdict(
+                result, results["fp32"], args.min_recall, args.min_precision
+            )
+            rejected += outcome == "REJECT (quality)"
+        print(
+            f"{name:>14}: recall {result['recall']:.3f}  "
+            f"precision {result['precision']:.3f}  "
+            f"parse {result['parse_ms']:7.1f} ms  {outcome}"
+        )
+
+    # 只有检测质量退化才视为失败, 速度取决于运行的机器
+    sys.exit(1 if rejected else 0)
+
+
+if __name__ == "__main__":
+    main()
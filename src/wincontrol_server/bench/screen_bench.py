@@ -0,0 +1,55 @@
+"""截图会话建立开销微基准: 每次调用新建mss会话 vs 长期存活的截图服务"""
+
+import argparse
+
+from wincontrol_server.bench.common import mean_us
+from wincontrol_server.bench.stubs import install_mss_stub
+
+
+def _legacy_setup(mss_module) -> dict:
+    """旧实现: 每次调用新建mss会话并重新枚举显示器"""
+    sct = mss_module.mss()
+    monitor = None
+    for m in sct.monitors[1:]:
+        if m["left"] == 0 and m["top"] == 0:
+            monitor = m
+            break
+    if monitor is None:
+        monitor = sct.monitors[1]
+    sct.close()
+    return monitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--setup-cost-ms", type=float, default=0.0, help="模拟的mss句柄构造耗时"
+    )
+    parser.add_argument(
+        "--enum-cost-ms", type=float, default=0.0, help="模拟的显示器枚举耗时"
+    )
+    args = parser.parse_args()
+
+    stats = install_mss_stub(
+        setup_cost=args.setup_cost_ms / 1000, enum_cost=args.enum_cost_ms / 1000
+    )
+    import mss
+
+    from wincontrol_server.devices.screen import Screen
+
+    def service_setup():
+        with Screen() as screen:
+            return screen.width
+
+    for name, fn in (("legacy", lambda: _legacy_setup(mss)), ("service", service_setup)):
+        stats.reset()
+        per_call = mean_us(fn, args.iterations)
+        print(
+            f"{name:>8}: {per_call:8.2f} us/call, "
+            f"mss instances={stats.instances}, enumerations={stats.enumerations}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""ONNX Runtime会话参数扫描: 比较不同线程/执行模式/优化级别/自旋设置下session.run的p50/p95延迟"""
+
+import argparse
+from dataclasses import asdict
+import json
+import os
+from pathlib import Path
+import time
+
+import numpy as np
+
+from wincontrol_server.parser.session import PRESETS, SessionConfig, create_session
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def sweep_configs(threads: list[int]) -> dict[str, SessionConfig]:
+    """生成待扫描的会话参数: 全部预设 + 各线程数下自旋开/关 + 并行执行模式 + 优化级别"""
+    configs = {name: make() for name, make in PRESETS.items()}
+    for n in threads:
+        for spinning in (True, False):
+            name = f"threads={n},spin={'on' if spinning else 'off'}"
+            configs[name] = SessionConfig(
+                intra_op_num_threads=n, inter_op_num_threads=1, allow_spinning=spinning
+            )
+    configs["parallel"] = SessionConfig(execution_mode="parallel")
+    configs["opt=extended"] = SessionConfig(graph_optimization_level="extended")
+    configs["arena=off"] = SessionConfig(enable_cpu_mem_arena=False)
+    return configs
+
+
+def _input_feed(session) -> dict[str, np.ndarray]:
+    """按模型输入形状生成随机输入, 动态维度取1"""
+    feed = {}
+    rng = np.random.default_rng(0)
+    for node in session.get_inputs():
+        shape = [d if isinstance(d, int) and d > 0 else 1 for d in node.shape]
+        feed[node.name] = rng.random(shape, dtype=np.float32)
+    return feed
+
+
+def measure(model_path: str, config: SessionConfig, runs: int, warmup: int) -> dict:
+    """测量session.run延迟, 返回p50/p95(ms)"""
+    session = create_session(model_path, config)
+    feed = _input_feed(session)
+    for _ in range(warmup):
+        session.run(None, feed)
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, feed)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="扫描的intra-op线程数",
+    )
+    parser.add_argument("--json", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    for name, config in sweep_configs(args.threads).items():
+        stats = measure(args.model, config, args.runs, args.warmup)
+        results.append({"name": name, "config": asdict(config), **stats})
+        print(f"{name:>24}: p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
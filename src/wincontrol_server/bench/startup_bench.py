@@ -0,0 +1,82 @@
+"""服务启动耗时分解: 导入/会话创建(优化模型缓存未命中与命中)/首次与第二次推理, 每次在新进程中测量"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def _child(model_path: str) -> dict:
+    """在子进程中执行: 依次计时导入、会话创建和前两次推理"""
+    start = time.perf_counter()
+    import numpy as np
+
+    from wincontrol_server.parser.omini import Omini
+
+    import_ms = (time.perf_counter() - start) * 1000
+
+    omini = Omini(model_path, warmup=False)
+    dummy = np.zeros((1, 3, omini._input_l, omini._input_l), dtype=np.float32)
+    runs = []
+    for _ in range(2):
+        start = time.perf_counter()
+        omini._session.run(None, {omini._input_name: dummy})
+        runs.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "import_ms": import_ms,
+        "session_ms": omini.startup_report["session_ms"],
+        "model_cache_hit": omini.startup_report["model_cache_hit"],
+        "first_run_ms": runs[0],
+        "second_run_ms": runs[1],
+    }
+
+
+def _spawn(model_path: str, cache_dir: str, model_cache: bool) -> dict:
+    env = dict(os.environ)
+    env["WINCONTROL_CACHE_DIR"] = cache_dir
+    env["WINCONTROL_MODEL_CACHE"] = "1" if model_cache else "0"
+    out = subprocess.run(
+        [sys.executable, "-m", __spec__.name, "--child", "--model", model_path],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.model)))
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = {
+            "no cache": _spawn(args.model, cache_dir, model_cache=False),
+            "cold cache": _spawn(args.model, cache_dir, model_cache=True),
+            "warm cache": _spawn(args.model, cache_dir, model_cache=True),
+        }
+
+    for name, r in results.items():
+        print(
+            f"{name:>10}: import {r['import_ms']:7.1f} ms  "
+            f"session {r['session_ms']:7.1f} ms (hit={r['model_cache_hit']})  "
+            f"first run {r['first_run_ms']:7.1f} ms  "
+            f"second run {r['second_run_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
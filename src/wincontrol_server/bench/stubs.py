@@ -0,0 +1,192 @@
+"""无头环境下的设备桩: 替换mss/pynput/pyperclip和推理会话, 使基准测试可以在没有显示器和模型的Linux上运行"""
+
+import sys
+import time
+import types
+
+import numpy as np
+
+
+class _FakeShot:
+    """模拟mss ScreenShot"""
+
+    def __init__(self, raw: bytearray, width: int, height: int):
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.size = (width, height)
+
+    @property
+    def bgra(self) -> bytes:
+        return bytes(self.raw)
+
+
+class MssStats:
+    """统计mss句柄构造/显示器枚举/截图次数, 并持有桩返回的整屏画面"""
+
+    def __init__(self, width: int, height: int):
+        self.instances = 0
+        self.enumerations = 0
+        self.grabs = 0
+        self.width = width
+        self.height = height
+        self.frame = bytearray(width * height * 4)
+
+    def set_frame(self, bgra: np.ndarray) -> None:
+        """替换整屏画面(形状为(height, width, 4)的BGRA数组), 尺寸变化后需让截图服务重新枚举显示器"""
+        self.height, self.width = bgra.shape[:2]
+        self.frame = bytearray(np.ascontiguousarray(bgra, dtype=np.uint8).tobytes())
+
+    def reset(self):
+        self.instances = 0
+        self.enumerations = 0
+        self.grabs = 0
+
+
+def install_mss_stub(
+    width: int = 1920,
+    height: int = 1080,
+    setup_cost: float = 0.0,
+    enum_cost: float = 0.0,
+) -> MssStats:
+    """安装mss桩模块, setup_cost/enum_cost为模拟的句柄构造/显示器枚举耗时(秒)"""
+    stats = MssStats(width, height)
+
+    class _FakeMSS:
+        def __init__(self, **kwargs):
+            stats.instances += 1
+            if setup_cost:
+                time.sleep(setup_cost)
+            self._monitors = None
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+
+        @property
+        def monitors(self) -> list[dict]:
+            if self._monitors is None:
+                stats.enumerations += 1
+                if enum_cost:
+                    time.sleep(enum_cost)
+                primary = {
+                    "left": 0,
+                    "top": 0,
+                    "width": stats.width,
+                    "height": stats.height,
+                }
+                self._monitors = [dict(primary), primary]
+            return self._monitors
+
+        def grab(self, monitor: dict) -> _FakeShot:
+            stats.grabs += 1
+            w = monitor["width"]
+            h = monitor["height"]
+            if w == stats.width and h == stats.height:
+                return _FakeShot(stats.frame, w, h)
+            return _FakeShot(bytearray(w * h * 4), w, h)
+
+        def close(self):
+            pass
+
+    module = types.ModuleType("mss")
+    module.mss = _FakeMSS
+    sys.modules["mss"] = module
+    return stats
+
+
+def install_input_stubs() -> None:
+    """安装pynput和pyperclip桩模块, 鼠标键盘操作只记录指针位置不产生输入"""
+
+    class _Button:
+        left = "left"
+        right = "right"
+        middle = "middle"
+        x1 = "x1"
+        x2 = "x2"
+
+    class _MouseController:
+        def __init__(self):
+            self.position = (0, 0)
+
+        def move(self, dx: int, dy: int):
+            self.position = (self.position[0] + dx, self.position[1] + dy)
+
+        def click(self, button, count: int = 1):
+            pass
+
+        def press(self, button):
+            pass
+
+        def release(self, button):
+            pass
+
+        def scroll(self, dx: int, dy: int):
+            pass
+
+    class _Key:
+        def __getattr__(self, name: str) -> str:
+            return name
+
+    class _KeyboardController:
+        def press(self, key):
+            pass
+
+        def release(self, key):
+            pass
+
+    mouse = types.ModuleType("pynput.mouse")
+    mouse.Button = _Button
+    mouse.Controller = _MouseController
+    keyboard = types.ModuleType("pynput.keyboard")
+    keyboard.Key = _Key()
+    keyboard.Controller = _KeyboardController
+    pynput = types.ModuleType("pynput")
+    pynput.mouse = mouse
+    pynput.keyboard = keyboard
+
+    pyperclip = types.ModuleType("pyperclip")
+    pyperclip.copy = lambda text: None
+
+    sys.modules.update(
+        {
+            "pynput": pynput,
+            "pynput.mouse": mouse,
+            "pynput.keyboard": keyboard,
+            "pyperclip": pyperclip,
+        }
+    )
+
+
+class _FakeNode:
+    def __init__(self, name: str, shape: list, type: str = "tensor(float)"):
+        self.name = name
+        self.shape = shape
+        self.type = type
+
+
+class FakeSession:
+    """模拟Omini的ONNX推理会话: 输出固定的一组随机候选框, 分布接近真实模型(少量高置信度框)"""
+
+    def __init__(self, input_l: int = 640, candidates: int = 8400, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        cx = rng.uniform(0, input_l, candidates)
+        cy = rng.uniform(0, input_l, candidates)
+        w = rng.uniform(8, input_l / 6, candidates)
+        h = rng.uniform(8, input_l / 10, candidates)
+        scores = rng.beta(0.3, 8.0, candidates)
+        self._output = np.stack([cx, cy, w, h, scores]).astype(np.float32)
+        self._inputs = [_FakeNode("images", ["batch", 3, input_l, input_l])]
+        self._outputs = [_FakeNode("output0", ["batch", 5, candidates])]
+
+    def get_inputs(self) -> list:
+        return self._inputs
+
+    def get_outputs(self) -> list:
+        return self._outputs
+
+    def run(self, output_names, feed: dict) -> list[np.ndarray]:
+        batch = len(next(iter(feed.values())))
+        return [np.repeat(self._output[np.newaxis], batch, axis=0)]
@@ -0,0 +1,217 @@
+"""离线基准套件(wincontrol-bench): 在录制的PNG帧或合成界面帧上测量解析流水线各环节和截图编码的
+吞吐量、p50/p95/p99延迟和峰值RSS, 结果输出为JSON便于比较不同构建。mss/pynput使用桩模块, 可在无头Linux上运行"""
+
+import argparse
+import json
+from pathlib import Path
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.stubs import (
+    FakeSession,
+    install_input_stubs,
+    install_mss_stub,
+)
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+_DEFAULT_RESOLUTIONS = ["1920x1080", "2560x1440", "3840x2160"]
+_TIERS = ["glance", "medium", "full"]
+CASES = ["preprocess", "nms", "overlap_nms", "draw", "parse", "fingerprint"] + [
+    f"screenshot_{tier}" for tier in _TIERS
+]
+
+
+def peak_rss_mb() -> float | None:
+    """进程峰值常驻内存(MB), 平台不支持时为None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB, macOS为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(fn, iterations: int, warmup: int) -> dict:
+    """重复调用fn, 返回吞吐量和延迟分位数"""
+    for _ in range(warmup):
+        fn()
+    latencies = np.empty(iterations)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        fn()
+        latencies[i] = (time.perf_counter() - t) * 1000
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / elapsed,
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def load_frames(frames_dir: str | None, resolutions: list[str], seed: int):
+    """逐个产出(名称, BGR整屏图像): 目录中的PNG帧, 或按分辨率生成的合成界面"""
+    if frames_dir:
+        paths = sorted(Path(frames_dir).glob("*.png"))
+        if not paths:
+            raise ValueError(f"No PNG frames in {frames_dir}")
+        for path in paths:
+            img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError(f"Failed to read frame: {path}")
+            yield path.name, img
+        return
+
+    for resolution in resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        icons = max(50, width * height // 20000)
+        img, _ = synthetic_ui(width, height, icons, seed)
+        yield resolution, img
+
+
+def run_suite(args) -> dict:
+    mss_stats = install_mss_stub()
+    install_input_stubs()
+
+    from wincontrol_server.devices.screen import get_screen_service
+    from wincontrol_server.parser.omini import Omini
+    from wincontrol_server.resources import screen_resources
+    from wincontrol_server.runtime.executors import CancelToken
+
+    fake = args.fake_model or not Path(args.model).is_file()
+    if fake:
+        omini = Omini("", session=FakeSession(seed=args.seed))
+    else:
+        omini = Omini(args.model)
+    input_l = omini._input_l
+
+    results = []
+    for name, screen_bgr in load_frames(args.frames, args.resolution, args.seed):
+        height, width = screen_bgr.shape[:2]
+        mss_stats.set_frame(cv2.cvtColor(screen_bgr, cv2.COLOR_BGR2BGRA))
+        get_screen_service().invalidate()
+
+        # 与screen_region_parser相同的中间半屏区域
+        left, top = width // 4, height // 4
+        region = np.ascontiguousarray(
+            screen_bgr[top : top + height // 2, left : left + width // 2]
+        )
+        proc_img, ratio, pad = omini._preprocess(region)
+        output = omini._session.run(None, {omini._input_name: proc_img})[0][0].T
+        candidates = output[output[:, 4] > omini.settings[0]]
+        boxes_raw, scores = candidates[:, :4], candidates[:, 4]
+        kept = boxes_raw[omini._nms(boxes_raw, scores)]
+        draw_boxes = np.stack(
+            [
+                (kept[:, 0] - kept[:, 2] / 2 - pad[0]) / ratio,
+                (kept[:, 1] - kept[:, 3] / 2 - pad[1]) / ratio,
+                (kept[:, 0] + kept[:, 2] / 2 - pad[0]) / ratio,
+                (kept[:, 1] + kept[:, 3] / 2 - pad[1]) / ratio,
+            ],
+            axis=1,
+        )
+        canvas = region.copy()
+
+        def screenshot(tier: str):
+            # 清除上次结果, 测量完整的叠加指针+缩放+编码路径
+            screen_resources._LAST_SHOTS.clear()
+            return screen_resources._screen_shot(
+                CancelToken(), screen_resources.resolve_tier(tier)
+            )
+
+        def fingerprint():
+            screen_resources._LAST_FINGERPRINT = None
+            return screen_resources._fingerprint(CancelToken())
+
+        cases = {
+            "preprocess": lambda: omini._preprocess(region),
+            "nms": lambda: omini._nms(boxes_raw, scores),
+            "overlap_nms": lambda: omini._overlap_nms(kept),
+            "draw": lambda: omini._draw(canvas, draw_boxes),
+            "parse": lambda: omini.parse(left, top, canvas),
+            "fingerprint": fingerprint,
+        }
+        for tier in _TIERS:
+            cases[f"screenshot_{tier}"] = lambda tier=tier: screenshot(tier)
+        for case in args.cases:
+            stats = measure(cases[case], args.iterations, args.warmup)
+            record = {
+                "case": case,
+                "frame": name,
+                "width": width,
+                "height": height,
+                "candidates": len(boxes_raw),
+                **stats,
+            }
+            results.append(record)
+            print(
+                f"{name:>16} {case:>12}: {stats['throughput_per_s']:9.1f}/s  "
+                f"p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  "
+                f"p99 {stats['p99_ms']:8.2f} ms",
+                file=sys.stderr,
+            )
+
+    import onnxruntime as ort
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "onnxruntime": ort.__version__,
+            "model": "fake" if fake else str(Path(args.model).resolve()),
+            "input_size": input_l,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="wincontrol-bench", description=__doc__)
+    parser.add_argument("--frames", help="PNG帧目录, 不指定时使用合成界面帧")
+    parser.add_argument(
+        "--resolution",
+        nargs="+",
+        default=_DEFAULT_RESOLUTIONS,
+        help="合成帧的分辨率, 如1920x1080",
+    )
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument(
+        "--fake-model", action="store_true", help="使用模拟推理会话(模型不存在时自动启用)"
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果写入JSON文件, 默认输出到标准输出")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""基准测试用的合成界面截图"""
+
+import cv2
+import numpy as np
+
+
+def synthetic_ui(
+    width: int, height: int, icons: int, seed: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """生成合成界面: 浅色背景上的工具栏、小图标、复选框和按钮, 返回(BGR图像, 元素框[x1, y1, x2, y2])"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 243, dtype=np.uint8)
+    boxes = []
+
+    def element(x: int, y: int, w: int, h: int):
+        color = tuple(int(c) for c in rng.integers(0, 160, 3))
+        cv2.rectangle(img, (x, y), (x + w - 1, y + h - 1), color, -1)
+        if w >= 12 and h >= 12:
+            cv2.rectangle(img, (x + 3, y + 3), (x + w - 4, y + h - 4), (255, 255, 255), 1)
+        boxes.append((x, y, x + w, y + h))
+
+    # 顶部工具栏: 一排间距很小的图标
+    x = 8
+    while x < width - 40:
+        size = int(rng.integers(14, 24))
+        element(x, 8, size, size)
+        x += size + int(rng.integers(6, 14))
+
+    # 随机散布的复选框/图标/按钮, 互不重叠
+    occupied = np.zeros((height, width), dtype=bool)
+    occupied[:40] = True
+    tries = 0
+    while len(boxes) < icons and tries < icons * 50:
+        tries += 1
+        if rng.random() < 0.7:
+            w = h = int(rng.integers(12, 26))
+        else:
+            w, h = int(rng.integers(60, 160)), int(rng.integers(22, 36))
+        x = int(rng.integers(0, width - w))
+        y = int(rng.integers(40, height - h))
+        if occupied[y - 6 : y + h + 6, x - 6 : x + w + 6].any():
+            continue
+        occupied[y : y + h, x : x + w] = True
+        element(x, y, w, h)
+    return img, np.array(boxes, dtype=np.int64)
@@ -0,0 +1,96 @@
+"""高DPI切片解析基准: 在合成的4K界面截图上比较整块缩放解析与重叠切片解析的召回率、精确率、跨切片合并后的重复框数和耗时;
+没有真实模型时使用模拟会话, 只检查切片流程并报告框数和耗时"""
+
+import argparse
+from pathlib import Path
+import time
+
+import numpy as np
+
+from wincontrol_server.bench.stubs import FakeSession, install_mss_stub
+from wincontrol_server.bench.synthetic import synthetic_ui
+
+_DEFAULT_MODEL = Path(__file__).parent.parent / "tools" / "omini.onnx"
+
+
+def evaluate(parsed_boxes: dict, truth: np.ndarray, space) -> dict:
+    """按框中心落入真实元素框判定命中, 每个真实元素只算一个正确框, 同一元素上多出的框算重复框"""
+    if not parsed_boxes:
+        return {"recall": 0.0, "precision": 0.0, "duplicates": 0}
+    centers = np.array(list(parsed_boxes.values()))
+    lo = np.stack(space.to_coord(truth[:, 0], truth[:, 1]), axis=1)
+    hi = np.stack(space.to_coord(truth[:, 2] - 1, truth[:, 3] - 1), axis=1)
+    inside = (
+        (centers[:, None, 0] >= lo[:, 0])
+        & (centers[:, None, 0] <= hi[:, 0])
+        & (centers[:, None, 1] >= lo[:, 1])
+        & (centers[:, None, 1] <= hi[:, 1])
+    )
+    # 合成界面的元素互不重叠, 命中的元素数即一对一匹配数
+    matched = int(inside.any(axis=0).sum())
+    return {
+        "recall": matched / len(truth),
+        "precision": matched / len(centers),
+        "duplicates": int(inside.any(axis=1).sum()) - matched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=str(_DEFAULT_MODEL))
+    parser.add_argument("--fake-model", action="store_true")
+    parser.add_argument("--screen", type=int, nargs=2, default=(3840, 2160))
+    parser.add_argument("--icons", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--tile-scale", type=float, nargs="+", default=[1.0, 1.5])
+    parser.add_argument("--tile-overlap", type=float, default=0.25)
+    args = parser.parse_args()
+
+    screen_w, screen_h = args.screen
+    install_mss_stub(screen_w, screen_h)
+    from wincontrol_server.parser.omini import Omini
+    from wincontrol_server.runtime.runtime import get_coordinate_space
+
+    # 模拟会话输出的是随机框, 召回率和重复框数没有意义, 此时只检查切片流程
+    accuracy = not args.fake_model and Path(args.model).is_file()
+    if accuracy:
+        omini = Omini(args.model)
+    else:
+        omini = Omini("", session=FakeSession())
+        print("plumbing check only: no real model, recall/precision are not reported")
+    space = get_coordinate_space()
+    # 与screen_region_parser相同的半屏区域(左上)
+    region_w, region_h = screen_w // 2, screen_h // 2
+
+    modes = {"single crop": lambda img: omini.parse(0, 0, img)}
+    for scale in args.tile_scale:
+        modes[f"tiled x{scale:g}"] = lambda img, scale=scale: omini.parse_tiled(
+            0, 0, img, scale, args.tile_overlap
+        )
+
+    for name, parse in modes.items():
+        scores, latencies, counts = [], [], []
+        for seed in range(args.samples):
+            img, truth = synthetic_ui(region_w, region_h, args.icons, seed)
+            start = time.perf_counter()
+            result = parse(img)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if accuracy:
+                scores.append(evaluate(result.boxes, truth, space))
+            counts.append(len(result.boxes))
+        report = ""
+        if accuracy:
+            mean = {key: np.mean([s[key] for s in scores]) for key in scores[0]}
+            report = (
+                f"recall {mean['recall']:6.1%}  "
+                f"precision {mean['precision']:6.1%}  "
+                f"duplicates {mean['duplicates']:5.0f}  "
+            )
+        print(
+            f"{name:>12}: {report}boxes {np.mean(counts):6.0f}  "
+            f"latency {np.median(latencies):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
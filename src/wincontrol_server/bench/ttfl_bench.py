@@ -0,0 +1,93 @@
+"""服务启动到首个工具列表的耗时: 通过stdio启动服务, 计时initialize/list_tools/get_prompt和首次区域解析,
+对比后台加载模型与启动时同步加载模型"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+def _serve(eager: bool, load_delay: float):
+    """子进程入口: 安装设备桩后启动服务, eager时先同步加载模型(模拟旧行为)"""
+    from wincontrol_server.bench.stubs import install_input_stubs, install_mss_stub
+
+    install_mss_stub()
+    install_input_stubs()
+
+    from wincontrol_server.parser.omini import Omini
+
+    if load_delay:
+        # 模拟大模型的加载耗时
+        init = Omini.__init__
+
+        def slow_init(self, *args, **kwargs):
+            time.sleep(load_delay)
+            init(self, *args, **kwargs)
+
+        Omini.__init__ = slow_init
+
+    from wincontrol_server import server
+    from wincontrol_server.tools import screen_tools
+
+    if eager:
+        screen_tools._OMINI.get()
+    server.main()
+
+
+async def _measure(eager: bool, load_delay: float) -> dict:
+    args = ["-m", __spec__.name, "--serve", "--load-delay", str(load_delay)]
+    if eager:
+        args.append("--eager")
+    params = StdioServerParameters(command=sys.executable, args=args)
+
+    timings = {}
+    start = time.perf_counter()
+
+    def mark(name: str):
+        timings[name] = (time.perf_counter() - start) * 1000
+
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                mark("initialize_ms")
+                await session.list_tools()
+                mark("list_tools_ms")
+                await session.get_prompt("system_prompt")
+                mark("get_prompt_ms")
+                await session.call_tool("pointer_move_to", {"u": 500, "v": 500})
+                mark("pointer_tool_ms")
+                await session.call_tool("screen_region_parser", {"region": "mid_mid"})
+                mark("first_parse_ms")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--load-delay", type=float, default=0.0, help="模拟的模型加载额外耗时(秒)"
+    )
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.eager, args.load_delay)
+        return
+
+    for eager in (True, False):
+        runs = [asyncio.run(_measure(eager, args.load_delay)) for _ in range(args.runs)]
+        label = "eager" if eager else "background"
+        summary = "  ".join(
+            f"{name[:-3]} {min(r[name] for r in runs):7.1f} ms" for name in runs[0]
+        )
+        print(f"{label:>10}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
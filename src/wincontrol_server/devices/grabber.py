@@ -0,0 +1,169 @@
+from collections import deque
+import threading
+import time
+
+from wincontrol_server.devices.screen import (
+    Frame,
+    ScreenService,
+    get_screen_service,
+)
+from wincontrol_server.runtime.config import env_bool, env_float, env_int
+
+
+class FrameGrabber:
+    """后台截图线程, 以固定帧率截图并保存最近N帧, 长时间无人请求时进入空闲模式停止截图"""
+
+    def __init__(
+        self,
+        service: ScreenService,
+        fps: float = 10.0,
+        max_frames: int = 4,
+        max_bytes: int = 256 * 1024 * 1024,
+        idle_timeout: float = 5.0,
+    ):
+        if fps <= 0 or max_frames <= 0 or max_bytes <= 0:
+            raise ValueError("fps/max_frames/max_bytes must be > 0")
+        self._service = service
+        self._interval = 1.0 / fps
+        self._max_frames = max_frames
+        self._max_bytes = max_bytes
+        self._idle_timeout = idle_timeout
+
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._last_request = time.monotonic()
+        self._error = None
+        self._thread = None
+
+    def start(self) -> None:
+        """启动截图线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="wincontrol-grabber", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止截图线程并释放缓存帧"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        with self._cond:
+            self._frames.clear()
+
+    @property
+    def idle(self) -> bool:
+        """是否处于空闲模式"""
+        return time.monotonic() - self._last_request > self._idle_timeout
+
+    def frames(self) -> list[Frame]:
+        """返回当前缓存的所有帧(从旧到新)"""
+        with self._cond:
+            return list(self._frames)
+
+    def latest(self, newer_than: float | None = None, timeout: float = 2.0) -> Frame:
+        """返回最新帧, newer_than不为空时等待时间戳晚于newer_than的帧, 返回帧的像素只读"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # 记录请求时间, 同时唤醒空闲中的截图线程
+            self._last_request = time.monotonic()
+            self._cond.notify_all()
+            while True:
+                if self._frames:
+                    frame = self._frames[-1]
+                    if newer_than is None or frame.timestamp > newer_than:
+                        return frame
+                if self._error is not None:
+                    raise self._error
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("no new frame captured in time")
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                while self.idle and not self._stop_event.is_set():
+                    # 空闲模式: 释放缓存帧, 等待新的请求
+                    self._frames.clear()
+                    self._cond.wait()
+            if self._stop_event.is_set():
+                break
+
+            start = time.monotonic()
+            try:
+                frame = self._service.capture_frame()
+                frame.bgra.flags.writeable = False
+                with self._cond:
+                    self._error = None
+                    self._frames.append(frame)
+                    self._trim()
+                    self._cond.notify_all()
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+
+            wait = self._interval - (time.monotonic() - start)
+            if wait > 0:
+                self._stop_event.wait(wait)
+
+    def _trim(self):
+        """按帧数和内存上限淘汰旧帧, 至少保留最新1帧"""
+        frame_bytes = self._frames[-1].bgra.nbytes
+        limit = max(1, min(self._max_frames, self._max_bytes // frame_bytes))
+        while len(self._frames) > limit:
+            self._frames.popleft()
+
+
+_GRABBER = None
+_GRABBER_LOCK = threading.Lock()
+
+
+def get_frame_grabber() -> FrameGrabber | None:
+    """获取后台截图线程, 需设置环境变量WINCONTROL_GRABBER=1开启, 未开启时返回None"""
+    global _GRABBER
+    if not env_bool("WINCONTROL_GRABBER", False):
+        return None
+    with _GRABBER_LOCK:
+        if _GRABBER is None:
+            _GRABBER = FrameGrabber(
+                get_screen_service(),
+                fps=env_float("WINCONTROL_GRABBER_FPS", 10.0),
+                max_frames=env_int("WINCONTROL_GRABBER_FRAMES", 4),
+                max_bytes=env_int("WINCONTROL_GRABBER_MAX_MB", 256) * 1024 * 1024,
+                idle_timeout=env_float("WINCONTROL_GRABBER_IDLE", 5.0),
+            )
+            _GRABBER.start()
+        return _GRABBER
+
+
+# 最近一次鼠标/键盘输入结束的时间(time.monotonic()), 截图时只接受之后开始截取的帧
+_LAST_INPUT = None
+
+
+def mark_input() -> None:
+    """记录一次鼠标/键盘输入, 之后的截图不会返回输入前截取的缓存帧"""
+    global _LAST_INPUT
+    _LAST_INPUT = time.monotonic()
+
+
+def last_input_time() -> float | None:
+    """最近一次输入的时间, 从未输入时为None"""
+    return _LAST_INPUT
+
+
+def latest_frame(newer_than: float | None = None) -> Frame:
+    """获取最新整屏截图帧, 开启后台截图时返回缓存帧(像素只读), 否则同步截图"""
+    grabber = get_frame_grabber()
+    if grabber is None:
+        return get_screen_service().capture_frame()
+    return grabber.latest(newer_than)
+
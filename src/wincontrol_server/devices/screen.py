@@ -1,45 +1,251 @@
+from dataclasses import dataclass
+import itertools
+import sys
+import threading
+import time
+
+import cv2
 import mss
 import numpy as np
 
 
-class Screen:
-    """屏幕类, 坐标从左上角(0, 0)开始到右小角(width-1, height-1)结束"""
+@dataclass(frozen=True)
+class ScreenGeometry:
+    """主显示器几何信息"""
+
+    left: int
+    top: int
+    width: int
+    height: int
+
+    def as_monitor(self) -> dict:
+        """转换为mss的monitor字典"""
+        return {
+            "left": self.left,
+            "top": self.top,
+            "width": self.width,
+            "height": self.height,
+        }
+
+
+def bgra_to_bgr(bgra: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """BGRA转换为连续的BGR数组, out不为空时直接写入预分配缓冲区"""
+    if out is None:
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+    if out.shape != bgra.shape[:2] + (3,) or out.dtype != np.uint8:
+        raise ValueError("out buffer shape/dtype mismatch")
+    cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+    return out
+
+
+def _bgra_view(mss_img) -> np.ndarray:
+    """将mss截图包装为形状为(height, width, 4)的BGRA视图, 不拷贝像素"""
+    img = np.frombuffer(mss_img.raw, dtype=np.uint8)
+    return img.reshape(mss_img.size[1], mss_img.size[0], 4)
+
+
+_SCRATCH = threading.local()
+
+
+def scratch_buffer(name: str, shape: tuple, dtype=np.uint8) -> np.ndarray:
+    """获取当前线程可复用的预分配缓冲区, 形状或类型变化时重新分配"""
+    buffers = getattr(_SCRATCH, "buffers", None)
+    if buffers is None:
+        buffers = _SCRATCH.buffers = {}
+    buf = buffers.get(name)
+    if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+        buf = buffers[name] = np.empty(shape, dtype=dtype)
+    return buf
+
+
+@dataclass
+class Frame:
+    """截图帧"""
+
+    frame_id: int
+    timestamp: float  # 开始截图时的time.monotonic()时间戳
+    bgra: np.ndarray  # 形状为(height, width, 4)的BGRA视图, 直接引用截图缓冲区
+
+    @property
+    def image(self) -> np.ndarray:
+        """形状为(height, width, 3)的BGR跨步视图, 不拷贝像素"""
+        return self.bgra[:, :, :3]
+
+    def bgr(self, out: np.ndarray | None = None) -> np.ndarray:
+        """转换为连续的BGR数组, out不为空时写入预分配缓冲区"""
+        return bgra_to_bgr(self.bgra, out)
+
+
+def _topology_signature() -> tuple | None:
+    """获取显示器拓扑签名(分辨率/虚拟屏幕/显示器数量), 非Windows平台返回None"""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+
+    metrics = ctypes.windll.user32.GetSystemMetrics
+    # SM_CXSCREEN, SM_CYSCREEN, SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN,
+    # SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN, SM_CMONITORS
+    return tuple(metrics(i) for i in (0, 1, 76, 77, 78, 79, 80))
+
+
+class ScreenService:
+    """长期存活的截图服务, 每个线程持有一个mss句柄, 缓存显示器几何信息, 仅在分辨率或拓扑变化时失效"""
+
+    def __init__(self, check_interval: float = 0.5, refresh_interval: float = 5.0):
+        # check_interval: 拓扑签名检查间隔(秒)
+        # refresh_interval: 无法获取拓扑签名时, 强制重新枚举显示器的间隔(秒)
+        self._check_interval = check_interval
+        self._refresh_interval = refresh_interval
 
-    def __init__(self):
-        self._sct = mss.mss()
-        self._monitor = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
 
-        for monitor in self._sct.monitors[1:]:
-            if monitor["left"] == 0 and monitor["top"] == 0:
-                self._monitor = monitor
+        self._geometry = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._enumerated_at = 0.0
+        self._generation = 0
+        self._frame_ids = itertools.count(1)
+
+    @property
+    def generation(self) -> int:
+        """几何信息版本号, 每次显示器变化后加1"""
+        return self._generation
+
+    @property
+    def geometry(self) -> ScreenGeometry:
+        """获取主显示器几何信息(带缓存)"""
+        now = time.monotonic()
+        if self._geometry is not None and now - self._checked_at < self._check_interval:
+            return self._geometry
+
+        with self._lock:
+            now = time.monotonic()
+            if self._geometry is None or self._is_stale(now):
+                self._enumerate(now)
+            self._checked_at = now
+            return self._geometry
+
+    def invalidate(self) -> None:
+        """使缓存的几何信息失效, 下次访问时重新枚举显示器"""
+        with self._lock:
+            self._geometry = None
+
+    def grab(self, monitor: dict):
+        """使用当前线程的mss句柄截图, 返回mss ScreenShot"""
+        return self._handle().grab(monitor)
+
+    def capture_frame(self) -> Frame:
+        """同步截取主显示器整屏, 返回带帧号和时间戳的截图帧"""
+        # 时间戳取截图开始的时间, 晚于某次输入的帧一定是在输入之后截取的
+        timestamp = time.monotonic()
+        mss_img = self.grab(self.geometry.as_monitor())
+        return Frame(next(self._frame_ids), timestamp, _bgra_view(mss_img))
+
+    def close(self) -> None:
+        """关闭当前线程的mss句柄"""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+    def _is_stale(self, now: float) -> bool:
+        """判断缓存的几何信息是否过期"""
+        signature = _topology_signature()
+        if signature is None:
+            return now - self._enumerated_at >= self._refresh_interval
+        return signature != self._signature
+
+    def _enumerate(self, now: float) -> None:
+        """重新枚举显示器, 选择左上角为(0, 0)的显示器作为主显示器"""
+        with mss.mss() as sct:
+            monitors = sct.monitors
+
+        monitor = None
+        for m in monitors[1:]:
+            if m["left"] == 0 and m["top"] == 0:
+                monitor = m
                 break
 
-        if self._monitor is None:
-            self._monitor = self._sct.monitors[1]
+        if monitor is None:
+            monitor = monitors[1]
+
+        geometry = ScreenGeometry(
+            monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+        )
+        if geometry != self._geometry:
+            # 显示器变化, 各线程的mss句柄需要重建
+            self._generation += 1
+        self._geometry = geometry
+        self._signature = _topology_signature()
+        self._enumerated_at = now
+
+    def _handle(self):
+        """获取当前线程的mss句柄, 几何信息变化后重建"""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None and self._local.generation == self._generation:
+            return sct
+        if sct is not None:
+            sct.close()
+        sct = mss.mss()
+        self._local.sct = sct
+        self._local.generation = self._generation
+        return sct
 
-        self.left = self._monitor["left"]
-        self.top = self._monitor["top"]
-        self.width = self._monitor["width"]
-        self.height = self._monitor["height"]
+
+_SERVICE = ScreenService()
+
+
+def get_screen_service() -> ScreenService:
+    """获取进程级截图服务"""
+    return _SERVICE
+
+
+class Screen:
+    """屏幕类, 坐标从左上角(0, 0)开始到右小角(width-1, height-1)结束
+
+    轻量视图, 几何信息和mss句柄都来自长期存活的截图服务, 构造和退出均不产生系统调用
+    """
+
+    def __init__(self, service: ScreenService | None = None):
+        self._service = service or _SERVICE
+        self._geometry = self._service.geometry
+
+        self.left = self._geometry.left
+        self.top = self._geometry.top
+        self.width = self._geometry.width
+        self.height = self._geometry.height
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._sct.close()
+        # mss句柄由截图服务持有, 这里无需关闭
+        pass
 
-    def capture(self) -> np.ndarray:
-        """GUI截图, 返回形状为(height, width, 3)的BGR numpy数组"""
-        mss_img = self._sct.grab(self._monitor)
-        img = np.frombuffer(mss_img.bgra, dtype=np.uint8)
-        img = img.reshape(mss_img.size[1], mss_img.size[0], 4)
-        img = img[:, :, :3].copy()
-        return img
+    def capture(self, out: np.ndarray | None = None) -> np.ndarray:
+        """GUI截图, 返回形状为(height, width, 3)的BGR numpy数组, out不为空时写入预分配缓冲区"""
+        return self._service.capture_frame().bgr(out)
+
+    def capture_bgra(self) -> np.ndarray:
+        """GUI截图, 返回形状为(height, width, 4)的BGRA视图, 不拷贝像素"""
+        return self._service.capture_frame().bgra
 
     def capture_region(
+        self,
+        left: int,
+        top: int,
+        width: int,
+        height: int,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """GUI区域截图, 返回形状为(height, width, 3)的BGR numpy数组, out不为空时写入预分配缓冲区"""
+        return bgra_to_bgr(self.capture_region_bgra(left, top, width, height), out)
+
+    def capture_region_bgra(
         self, left: int, top: int, width: int, height: int
     ) -> np.ndarray:
-        """GUI区域截图, 返回形状为(height, width, 3)的BGR numpy数组"""
+        """GUI区域截图, 返回形状为(height, width, 4)的BGRA视图, 不拷贝像素"""
         if (
             left < 0
             or top < 0
@@ -55,8 +261,4 @@ class Screen:
             "width": width,
             "height": height,
         }
-        mss_img = self._sct.grab(region)
-        img = np.frombuffer(mss_img.bgra, dtype=np.uint8)
-        img = img.reshape(mss_img.size[1], mss_img.size[0], 4)
-        img = img[:, :, :3].copy()
-        return img
+        return _bgra_view(self._service.grab(region))
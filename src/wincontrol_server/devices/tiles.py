@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+
+import cv2
+import numpy as np
+
+from wincontrol_server.devices.screen import Frame
+from wincontrol_server.runtime.config import env_int
+
+
+@lru_cache(maxsize=8)
+def _weights(n: int, seed: int) -> np.ndarray:
+    """生成n个奇数的随机uint64权重"""
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(0, 2**63, n, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    weights.flags.writeable = False
+    return weights
+
+
+def tile_hashes(bgra: np.ndarray, tile: int) -> np.ndarray:
+    """计算每个tile的位置加权校验和, 返回形状为(rows, cols)的uint64数组, 边缘tile可不满"""
+    h, w = bgra.shape[:2]
+    px = np.ascontiguousarray(bgra).view(np.uint32).reshape(h, w)
+    wx = _weights(w, 0)
+    wy = _weights(h, 1)
+    col_starts = np.arange(0, w, tile)
+
+    rows = []
+    with np.errstate(over="ignore"):
+        for r0 in range(0, h, tile):
+            band = px[r0 : r0 + tile].astype(np.uint64)
+            band *= wx
+            per_row = np.add.reduceat(band, col_starts, axis=1)
+            per_row *= wy[r0 : r0 + tile, None]
+            rows.append(per_row.sum(axis=0, dtype=np.uint64))
+    return np.stack(rows)
+
+
+def tile_means(bgra: np.ndarray, tile: int) -> np.ndarray:
+    """每个tile的平均灰度(uint8, 形状为(rows, cols)), 作为帧的感知指纹, 对光标闪烁等细小变化不敏感"""
+    h, w = bgra.shape[:2]
+    rows, cols = -(-h // tile), -(-w // tile)
+    gray = cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+    # 补齐到tile的整数倍, 整数倍的INTER_AREA缩小走块平均的快速路径
+    gray = cv2.copyMakeBorder(
+        gray, 0, rows * tile - h, 0, cols * tile - w, cv2.BORDER_REPLICATE
+    )
+    return cv2.resize(gray, (cols, rows), interpolation=cv2.INTER_AREA)
+
+
+class TileTracker:
+    """分块脏区检测, 记录最近若干帧的tile哈希, 查询某帧之后哪些tile发生了变化"""
+
+    def __init__(self, tile: int = 64, history: int = 32):
+        if tile <= 0 or history <= 0:
+            raise ValueError("tile/history must be > 0")
+        self.tile = tile
+        self._history = history
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, frame: Frame) -> np.ndarray:
+        """计算并记录帧的tile哈希, 同一帧只计算一次"""
+        with self._lock:
+            hashes = self._hashes.get(frame.frame_id)
+            if hashes is not None:
+                return hashes
+
+        hashes = tile_hashes(frame.bgra, self.tile)
+
+        with self._lock:
+            self._hashes[frame.frame_id] = hashes
+            self._hashes.move_to_end(frame.frame_id)
+            while len(self._hashes) > self._history:
+                self._hashes.popitem(last=False)
+        return hashes
+
+    def changed_since(self, since_id: int, frame_id: int) -> np.ndarray | None:
+        """返回frame_id相对since_id发生变化的tile掩码(rows, cols), 任一帧不在记录中或尺寸变化时返回None"""
+        with self._lock:
+            old = self._hashes.get(since_id)
+            new = self._hashes.get(frame_id)
+        if old is None or new is None or old.shape != new.shape:
+            return None
+        return old != new
+
+    def dirty_rects(
+        self, since_id: int, frame_id: int
+    ) -> list[tuple[int, int, int, int]] | None:
+        """返回发生变化的tile矩形列表(left, top, width, height), 无法比较时返回None"""
+        mask = self.changed_since(since_id, frame_id)
+        if mask is None:
+            return None
+        return [
+            (int(c) * self.tile, int(r) * self.tile, self.tile, self.tile)
+            for r, c in zip(*np.nonzero(mask))
+        ]
+
+    def is_clean(
+        self,
+        since_id: int,
+        frame_id: int,
+        left: int,
+        top: int,
+        width: int,
+        height: int,
+    ) -> bool:
+        """判断区域内的tile在两帧之间是否都没有变化"""
+        mask = self.changed_since(since_id, frame_id)
+        if mask is None:
+            return False
+        r0 = top // self.tile
+        r1 = (top + height - 1) // self.tile + 1
+        c0 = left // self.tile
+        c1 = (left + width - 1) // self.tile + 1
+        return not mask[r0:r1, c0:c1].any()
+
+
+_TRACKER = TileTracker(tile=env_int("WINCONTROL_TILE_SIZE", 64))
+
+
+def get_tile_tracker() -> TileTracker:
+    """获取进程级分块脏区检测器"""
+    return _TRACKER
@@ -0,0 +1,192 @@
+from concurrent.futures import CancelledError, Future
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from wincontrol_server.parser.omini import Omini, ParsedResult
+from wincontrol_server.parser.worker_pool import OminiPool
+from wincontrol_server.runtime.executors import CancelToken, Cancelled
+from wincontrol_server.runtime.profiler import (
+    Profiler,
+    count,
+    get_profiler,
+    merge,
+    stage,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """并发解析请求的微批调度器, 接口与Omini相同
+
+    单区域解析请求先进入队列, 调度线程取到第一个请求后在window_ms内继续收集,
+    凑满max_batch或窗口结束时把这批区域交给parse_batch, 一次推理后把结果分发给各调用方。
+    上一批推理期间到达的请求会自然组成下一批, window_ms为0时不额外等待。
+    后端能同时推理多批时(多个工作进程)用concurrency个调度线程各自收集和推理。
+    批量解析、切片解析和不支持batch的模型直接交给后端。
+    每批推理的阶段耗时并入这批中每个请求的调用记录; 排队期间被取消的请求不会进入批次。
+    """
+
+    def __init__(
+        self,
+        backend: Omini | OminiPool,
+        max_batch: int = 8,
+        window_ms: float = 0.0,
+        concurrency: int = 1,
+    ):
+        if max_batch < 1:
+            raise ValueError(f"Invalid max batch size: {max_batch}")
+        self._backend = backend
+        self._max_batch = max_batch
+        self._window = window_ms / 1000
+        self._concurrency = max(1, concurrency)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._started = False
+        self.startup_report = backend.startup_report
+
+    @property
+    def settings(self) -> tuple[float, float, float]:
+        """解析参数(conf, iou, overlap)"""
+        return self._backend.settings
+
+    @property
+    def supports_batch(self) -> bool:
+        """模型输入的batch维是否为动态维度"""
+        return self._backend.supports_batch
+
+    def parse(
+        self, left: int, top: int, img: np.ndarray, token: CancelToken | None = None
+    ) -> ParsedResult:
+        """解析GUI, 与同一窗口内的其他请求合并为一次batch推理, token被取消时抛出Cancelled"""
+        if self._max_batch == 1 or not self._backend.supports_batch:
+            return self._backend.parse(left, top, img)
+        self._start()
+        future = Future()
+        self._queue.put((left, top, img, token, future))
+        with stage("batch_wait"):
+            result, batch_size, stages, counters = self._wait(future, token)
+        merge(stages, counters)
+        count("batch_size", batch_size)
+        return result
+
+    def parse_batch(
+        self, regions: list[tuple[int, int, np.ndarray]]
+    ) -> list[ParsedResult]:
+        """一次推理解析多个区域, 直接交给后端"""
+        return self._backend.parse_batch(regions)
+
+    def parse_tiled(
+        self,
+        left: int,
+        top: int,
+        img: np.ndarray,
+        tile_scale: float = 1.0,
+        tile_overlap: float = 0.25,
+    ) -> ParsedResult:
+        """按接近原始分辨率切片解析, 直接交给后端(切片已在一次batch推理中完成)"""
+        return self._backend.parse_tiled(left, top, img, tile_scale, tile_overlap)
+
+    def stats(self) -> dict:
+        """请求数、批次数、平均批大小和排队请求数"""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch": self._requests / self._batches if self._batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self._concurrency):
+            threading.Thread(
+                target=self._dispatch, name=f"omini-batcher-{i}", daemon=True
+            ).start()
+
+    @staticmethod
+    def _wait(future: Future, token: CancelToken | None) -> tuple:
+        """等待批次结果, 期间token被取消时撤回排队中的请求并抛出Cancelled"""
+        if token is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=0.05)
+            except CancelledError:
+                # 调度线程取批时发现token已取消, 请求已被丢弃
+                raise Cancelled() from None
+            except TimeoutError:
+                if token.cancelled:
+                    future.cancel()
+                    token.check()
+
+    @staticmethod
+    def _accept(request: tuple) -> bool:
+        """请求能否进入批次: 已取消的请求被丢弃, 接受后调用方不能再撤回"""
+        *_, token, future = request
+        if token is not None and token.cancelled:
+            future.cancel()
+        return future.set_running_or_notify_cancel()
+
+    def _collect(self) -> list[tuple]:
+        """阻塞取到第一个有效请求后, 在窗口内继续收集直到凑满一批"""
+        batch = []
+        while not batch:
+            request = self._queue.get()
+            if self._accept(request):
+                batch.append(request)
+        deadline = time.perf_counter() + self._window
+        while len(batch) < self._max_batch:
+            try:
+                # 已在排队的请求无需等待
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if self._accept(request):
+                batch.append(request)
+        return batch
+
+    def _parse_batch(self, regions: list[tuple[int, int, np.ndarray]]) -> tuple:
+        """推理一批区域, 分析开启时返回这批推理的阶段耗时和计数"""
+        if not get_profiler().enabled:
+            return self._backend.parse_batch(regions), {}, {}
+        with Profiler(enabled=True, history=1).trace("parse_batch") as trace:
+            results = self._backend.parse_batch(regions)
+        return results, trace.stages, trace.counters
+
+    def _dispatch(self) -> None:
+        """调度线程: 逐批推理并把结果或异常交给各请求"""
+        while True:
+            batch = self._collect()
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+            try:
+                # 每批在独立的上下文中推理, 阶段耗时记在临时的调用记录里再分给各请求
+                results, stages, counters = contextvars.Context().run(
+                    self._parse_batch,
+                    [(left, top, img) for left, top, img, *_ in batch],
+                )
+            except Exception as e:
+                logger.warning("batched parse of %d regions failed: %s", len(batch), e)
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            for (*_, future), result in zip(batch, results):
+                future.set_result((result, len(batch), stages, counters))
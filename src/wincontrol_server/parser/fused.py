@@ -0,0 +1,210 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from wincontrol_server.parser.model_cache import import_onnx, model_digest
+from wincontrol_server.runtime.config import cache_dir
+
+logger = logging.getLogger(__name__)
+
+# 融合模型的输入: letterbox后的BGR uint8画布, 形状为(N, size, size, 3)
+FUSED_INPUT = "images_u8"
+# 融合模型的输出: NMS后保留框所属的图像序号、(cx, cy, w, h)框和置信度, 按图像和置信度从高到低排列
+FUSED_OUTPUTS = ("batch_index", "boxes", "scores")
+
+# 构造NonMaxSuppression需要的最低opset(Squeeze/Slice以输入给出axes)
+_MIN_OPSET = 13
+
+
+def build_fused_model(
+    model_path: str, out_path: str, conf: float, iou: float, max_boxes: int = 0
+) -> Path:
+    """在原模型前后拼接预处理和NMS, 生成融合模型
+
+    图中完成BGR->RGB、转float并除以255、NHWC->NCHW, 原模型输出(N, 5, A)拆成框和置信度后
+    送入NonMaxSuppression(center_point_box=1, 置信度阈值conf, IOU阈值iou),
+    只输出保留下来的框。max_boxes为每张图最多保留的框数, 为0时不限制。
+    置信度相同时NonMaxSuppression优先保留序号小的框, classic流水线沿用原实现的
+    numpy排序, 两者只在置信度相同的框之间可能保留不同的框。
+    """
+    # 只有构建融合模型时需要onnx包, 推理时只依赖onnxruntime
+    onnx = import_onnx()
+    from onnx import TensorProto, helper, numpy_helper
+
+    model = onnx.load(model_path)
+    graph = model.graph
+    if len(graph.input) != 1 or len(graph.output) != 1:
+        raise ValueError("fused model expects a single-input, single-output detector")
+    opset = max(
+        (o.version for o in model.opset_import if o.domain in ("", "ai.onnx")),
+        default=0,
+    )
+    if opset < _MIN_OPSET:
+        raise ValueError(f"fused model needs opset >= {_MIN_OPSET}, got {opset}")
+
+    model_input = graph.input[0]
+    model_output = graph.output[0]
+    in_dims = model_input.type.tensor_type.shape.dim
+    out_dims = model_output.type.tensor_type.shape.dim
+    if len(in_dims) != 4 or in_dims[1].dim_value != 3 or len(out_dims) != 3:
+        raise ValueError("fused model expects (N, 3, L, L) input and (N, 5, A) output")
+    size = in_dims[2].dim_value
+    if max_boxes <= 0:
+        max_boxes = out_dims[2].dim_value or 1 << 20
+
+    def const(name: str, value, dtype) -> str:
+        graph.initializer.append(
+            numpy_helper.from_array(np.asarray(value, dtype=dtype), name)
+        )
+        return name
+
+    # 预处理: (N, L, L, 3) uint8 BGR -> (N, 3, L, L) float32 RGB / 255
+    pre = [
+        helper.make_node(
+            "Gather",
+            [FUSED_INPUT, const("fused_bgr_to_rgb", [2, 1, 0], np.int64)],
+            ["fused_rgb_u8"],
+            axis=3,
+        ),
+        helper.make_node(
+            "Cast", ["fused_rgb_u8"], ["fused_rgb"], to=TensorProto.FLOAT
+        ),
+        helper.make_node(
+            "Div",
+            ["fused_rgb", const("fused_scale", 255.0, np.float32)],
+            ["fused_norm"],
+        ),
+        helper.make_node(
+            "Transpose", ["fused_norm"], [model_input.name], perm=[0, 3, 1, 2]
+        ),
+    ]
+
+    # 后处理: (N, 5, A) -> 框(N, A, 4)和置信度(N, 1, A) -> NMS -> 按(图像, 框)取出保留框
+    axis1 = const("fused_axis1", [1], np.int64)
+    post = [
+        helper.make_node(
+            "Slice",
+            [
+                model_output.name,
+                const("fused_box_start", [0], np.int64),
+                const("fused_box_end", [4], np.int64),
+                axis1,
+            ],
+            ["fused_xywh"],
+        ),
+        helper.make_node(
+            "Transpose", ["fused_xywh"], ["fused_all_boxes"], perm=[0, 2, 1]
+        ),
+        helper.make_node(
+            "Slice",
+            [
+                model_output.name,
+                const("fused_score_start", [4], np.int64),
+                const("fused_score_end", [5], np.int64),
+                axis1,
+            ],
+            ["fused_all_scores"],
+        ),
+        helper.make_node(
+            "NonMaxSuppression",
+            [
+                "fused_all_boxes",
+                "fused_all_scores",
+                const("fused_max_boxes", [max_boxes], np.int64),
+                const("fused_iou", [iou], np.float32),
+                const("fused_conf", [conf], np.float32),
+            ],
+            ["fused_selected"],
+            center_point_box=1,
+        ),
+        helper.make_node(
+            "Gather",
+            ["fused_selected", const("fused_batch_box", [0, 2], np.int64)],
+            ["fused_keep"],
+            axis=1,
+        ),
+        helper.make_node(
+            "Gather",
+            ["fused_selected", const("fused_batch_col", 0, np.int64)],
+            [FUSED_OUTPUTS[0]],
+            axis=1,
+        ),
+        helper.make_node(
+            "GatherND", ["fused_all_boxes", "fused_keep"], [FUSED_OUTPUTS[1]]
+        ),
+        helper.make_node("Squeeze", ["fused_all_scores", axis1], ["fused_scores_na"]),
+        helper.make_node(
+            "GatherND", ["fused_scores_na", "fused_keep"], [FUSED_OUTPUTS[2]]
+        ),
+    ]
+
+    nodes = pre + list(graph.node) + post
+    del graph.node[:]
+    graph.node.extend(nodes)
+
+    batch = in_dims[0]
+    batch_dim = batch.dim_param or batch.dim_value
+    del graph.input[:]
+    graph.input.append(
+        helper.make_tensor_value_info(
+            FUSED_INPUT, TensorProto.UINT8, [batch_dim, size, size, 3]
+        )
+    )
+    del graph.output[:]
+    for name, elem_type, shape in zip(
+        FUSED_OUTPUTS,
+        (TensorProto.INT64, TensorProto.FLOAT, TensorProto.FLOAT),
+        (["K"], ["K", 4], ["K"]),
+    ):
+        graph.output.append(helper.make_tensor_value_info(name, elem_type, shape))
+    onnx.checker.check_model(model)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, out_path)
+    return out_path
+
+
+def fused_model_path(model_path: str, conf: float, iou: float) -> Path:
+    """融合模型的缓存路径, 按原模型哈希和烘焙进图中的阈值区分"""
+    name = f"{model_digest(model_path)[:16]}-fused-c{conf:g}-i{iou:g}.onnx"
+    return cache_dir() / "models" / name
+
+
+def ensure_fused_model(model_path: str, conf: float, iou: float) -> Path:
+    """返回融合模型路径, 缓存中没有时构建(需要可选依赖wincontrol[build]中的onnx包)"""
+    path = fused_model_path(model_path, conf, iou)
+    if path.is_file():
+        return path
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    build_fused_model(model_path, str(tmp_path), conf, iou)
+    os.replace(tmp_path, path)
+    logger.info("built fused model %s", path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="由omini.onnx构建带预处理和NMS的融合模型"
+    )
+    parser.add_argument("model")
+    parser.add_argument("output", nargs="?", help="默认写入模型缓存目录")
+    parser.add_argument("--conf", type=float, default=0.05)
+    parser.add_argument("--iou", type=float, default=0.1)
+    parser.add_argument("--max-boxes", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.output is None:
+        path = ensure_fused_model(args.model, args.conf, args.iou)
+    else:
+        path = build_fused_model(
+            args.model, args.output, args.conf, args.iou, args.max_boxes
+        )
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from dataclasses import replace
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import onnxruntime as ort
+
+from wincontrol_server.parser.session import (
+    SessionConfig,
+    available_providers,
+    session_options,
+)
+from wincontrol_server.runtime.config import cache_dir, env_bool
+
+logger = logging.getLogger(__name__)
+
+
+def model_digest(model_path: str) -> str:
+    """模型文件的sha256, 按(路径, 大小, 修改时间)缓存在缓存目录中, 避免每次启动重新哈希"""
+    path = Path(model_path).resolve()
+    stat = path.stat()
+    index_path = cache_dir() / "digests.json"
+    stamp = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    if stamp in index:
+        return index[stamp]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    index[stamp] = digest
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        logger.warning("failed to write model digest index: %s", e)
+    return digest
+
+
+def import_onnx():
+    """导入onnx包: 只有构建融合/量化模型时需要, 属于可选依赖wincontrol[build]"""
+    try:
+        import onnx
+    except ImportError as e:
+        raise ImportError(
+            "building fused or quantized models requires the onnx package, "
+            "install it with: pip install 'wincontrol[build]'"
+        ) from e
+    return onnx
+
+
+# "all"级别包含与CPU指令集相关的布局变换(NCHWc), 序列化后在另一种CPU上可能无法加载;
+# 缓存的模型最多优化到"extended", 其余优化在加载缓存模型时再做
+_SERIALIZED_LEVELS = ("disable", "basic", "extended")
+
+
+def serialized_level(config: SessionConfig) -> str:
+    """写入缓存的优化后模型所用的优化级别"""
+    level = config.graph_optimization_level
+    return level if level in _SERIALIZED_LEVELS else "extended"
+
+
+def optimized_model_path(model_path: str, config: SessionConfig) -> Path:
+    """优化后模型的缓存路径, 按模型哈希/ORT版本/执行后端/序列化的优化级别区分"""
+    provider = available_providers(config)[0]
+    name = (
+        f"{model_digest(model_path)[:16]}"
+        f"-ort{ort.__version__}"
+        f"-{provider}"
+        f"-{serialized_level(config)}.onnx"
+    )
+    return cache_dir() / "models" / name
+
+
+def create_cached_session(
+    model_path: str, config: SessionConfig
+) -> tuple[ort.InferenceSession, bool]:
+    """创建推理会话, 优先加载缓存的优化后模型, 未命中时把本次优化结果写入缓存, 返回(会话, 是否命中)"""
+    providers = available_providers(config)
+    if (
+        not env_bool("WINCONTROL_MODEL_CACHE", True)
+        or config.graph_optimization_level == "disable"
+    ):
+        return ort.InferenceSession(
+            model_path, sess_options=session_options(config), providers=providers
+        ), False
+
+    level = serialized_level(config)
+    # 缓存模型已包含全部优化时加载时跳过图优化, 否则加载时再做超出序列化级别的优化
+    complete = level == config.graph_optimization_level
+    load_config = (
+        replace(config, graph_optimization_level="disable") if complete else config
+    )
+
+    cached_path = optimized_model_path(model_path, config)
+    if cached_path.is_file():
+        try:
+            session = ort.InferenceSession(
+                str(cached_path),
+                sess_options=session_options(load_config),
+                providers=providers,
+            )
+            return session, True
+        except Exception as e:
+            logger.warning("invalid optimized model cache %s: %s", cached_path, e)
+            cached_path.unlink(missing_ok=True)
+
+    options = session_options(replace(config, graph_optimization_level=level))
+    tmp_path = cached_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cached_path.parent.mkdir(parents=True, exist_ok=True)
+        options.optimized_model_filepath = str(tmp_path)
+        session = ort.InferenceSession(
+            model_path, sess_options=options, providers=providers
+        )
+        os.replace(tmp_path, cached_path)
+    except Exception as e:
+        # 部分执行后端不支持导出优化后模型, 退化为不带缓存的会话
+        logger.warning("failed to cache optimized model: %s", e)
+        tmp_path.unlink(missing_ok=True)
+        return ort.InferenceSession(
+            model_path, sess_options=session_options(config), providers=providers
+        ), False
+    if complete:
+        return session, False
+    # 序列化的级别低于要求的级别, 由缓存模型创建完整优化的会话
+    return ort.InferenceSession(
+        str(cached_path), sess_options=session_options(load_config), providers=providers
+    ), False
@@ -0,0 +1,442 @@
+from dataclasses import dataclass
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.devices.screen import scratch_buffer
+from wincontrol_server.parser.fused import ensure_fused_model
+from wincontrol_server.parser.model_cache import create_cached_session
+from wincontrol_server.parser.postprocess import covered, nms, overlap_nms
+from wincontrol_server.parser.preprocess import (
+    letterbox,
+    letterbox_canvas,
+    tile_grid,
+)
+from wincontrol_server.parser.session import SessionConfig, load_session_config
+from wincontrol_server.runtime.profiler import count, stage
+from wincontrol_server.runtime.runtime import CoordinateSpace, get_coordinate_space
+
+logger = logging.getLogger(__name__)
+
+# 切片解析时距切片内部边不超过该距离(模型输入像素)的框视为接缝框
+_SEAM_MARGIN = 2
+
+# classic为在numpy中做letterbox归一化、置信度过滤和NMS;
+# fused为加载图中已包含归一化和NMS的融合模型, 只输入uint8画布、只输出保留下来的框
+PIPELINES = ("classic", "fused")
+
+
+@dataclass
+class ParsedResult:
+    """解析结果"""
+
+    parsed_img: np.ndarray
+    boxes: dict[int, tuple[int, int]]
+
+
+class Omini:
+    """GUI Parser"""
+
+    def __init__(
+        self,
+        model_path: str,
+        conf: float = 0.05,
+        iou: float = 0.1,
+        overlap: float = 0.3,
+        session_config: SessionConfig | None = None,
+        warmup: bool = True,
+        session=None,
+        pipeline: str = "classic",
+    ):
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Invalid parse pipeline: {pipeline}")
+        self._conf = conf
+        self._iou = iou
+        self._overlap = overlap
+        # 框中心换算为归一化坐标所用的坐标空间, 为None时取当前屏幕的;
+        # 工作进程中由主进程随请求传入
+        self.coordinate_space: CoordinateSpace | None = None
+
+        start = time.perf_counter()
+        cache_hit = False
+        if session is not None:
+            # 直接使用外部创建的会话(基准测试中的模拟会话等)
+            self._session = session
+        else:
+            if session_config is None:
+                session_config = load_session_config()
+            if pipeline == "fused":
+                # 阈值烘焙在融合模型中, 按原模型和阈值缓存
+                model_path = str(ensure_fused_model(model_path, conf, iou))
+            self._session, cache_hit = create_cached_session(
+                model_path, session_config
+            )
+        session_ms = (time.perf_counter() - start) * 1000
+
+        input_data = self._session.get_inputs()[0]
+        self._input_name = input_data.name
+        # 融合模型的输入为(N, L, L, 3)的uint8画布
+        self._fused = input_data.type == "tensor(uint8)"
+        self._input_l = input_data.shape[1] if self._fused else input_data.shape[2]
+
+        # 启动耗时: 会话创建(是否命中优化模型缓存)和首次推理
+        self.startup_report = {
+            "session_ms": session_ms,
+            "model_cache_hit": cache_hit,
+            "warmup_ms": self.warmup() if warmup else None,
+        }
+        logger.info("omini startup: %s", self.startup_report)
+
+    def warmup(self) -> float:
+        """用全零输入做一次推理, 让首次调用的内存分配和内核初始化提前完成, 返回耗时(ms)"""
+        if self._fused:
+            dummy = np.zeros((1, self._input_l, self._input_l, 3), dtype=np.uint8)
+        else:
+            dummy = np.zeros((1, 3, self._input_l, self._input_l), dtype=np.float32)
+        start = time.perf_counter()
+        self._session.run(None, {self._input_name: dummy})
+        return (time.perf_counter() - start) * 1000
+
+    @property
+    def settings(self) -> tuple[float, float, float]:
+        """解析参数(conf, iou, overlap)"""
+        return (self._conf, self._iou, self._overlap)
+
+    @property
+    def supports_batch(self) -> bool:
+        """模型输入的batch维是否为动态维度"""
+        batch = self._session.get_inputs()[0].shape[0]
+        return not (isinstance(batch, int) and batch == 1)
+
+    @property
+    def pipeline(self) -> str:
+        """当前会话使用的解析流水线"""
+        return "fused" if self._fused else "classic"
+
+    def parse(self, left: int, top: int, img: np.ndarray) -> ParsedResult:
+        """解析GUI, 形参为解析区域起始坐标和BGR numpy数组"""
+        ((boxes_raw, scores, ratio, pad),) = self._detect([img])
+        return self._postprocess(left, top, img, boxes_raw, scores, ratio, pad)
+
+    def parse_batch(
+        self, regions: list[tuple[int, int, np.ndarray]]
+    ) -> list[ParsedResult]:
+        """一次推理解析多个区域, 形参为(区域起始x, 区域起始y, BGR numpy数组)列表; 模型不支持批量时逐个解析"""
+        return [
+            self._postprocess(left, top, img, *detected)
+            for (left, top, img), detected in zip(
+                regions, self._detect([img for _, _, img in regions])
+            )
+        ]
+
+    def parse_tiled(
+        self,
+        left: int,
+        top: int,
+        img: np.ndarray,
+        tile_scale: float = 1.0,
+        tile_overlap: float = 0.25,
+    ) -> ParsedResult:
+        """按接近原始分辨率切片解析, 适合高DPI屏幕上的小图标
+
+        区域被切成边长为输入尺寸×tile_scale、相互重叠的切片, 所有切片一次batch推理,
+        每个切片先按单张图的规则去重, 检测框映射回区域坐标后合并。贴在切片内部接缝上的框
+        多半是被截断的元素, 若已被相邻切片中的完整框覆盖则丢弃, 其余框再按IOU和重叠规则跨切片去重。
+        """
+        img_h = img.shape[0]
+        img_w = img.shape[1]
+        tile = max(1, round(self._input_l * tile_scale))
+        tiles = tile_grid(img_w, img_h, tile, tile_overlap)
+
+        crops = [img[y : y + h, x : x + w] for x, y, w, h in tiles]
+        boxes_list = []
+        scores_list = []
+        seam_list = []
+        for (x, y, w, h), (boxes_raw, scores, ratio, pad) in zip(
+            tiles, self._detect(crops)
+        ):
+            # 切片内先按单张图的规则过滤置信度、去重和过滤重叠框
+            idx = self._overlap_nms(boxes_raw)
+            boxes_raw, scores = boxes_raw[idx].astype(np.float64), scores[idx]
+            # 切片输入坐标 -> 区域坐标
+            boxes_raw[:, 0] = (boxes_raw[:, 0] - pad[0]) / ratio + x
+            boxes_raw[:, 1] = (boxes_raw[:, 1] - pad[1]) / ratio + y
+            boxes_raw[:, 2:] /= ratio
+
+            # 贴在切片内部边(非区域边缘)上的框
+            x1 = boxes_raw[:, 0] - boxes_raw[:, 2] / 2
+            y1 = boxes_raw[:, 1] - boxes_raw[:, 3] / 2
+            x2 = boxes_raw[:, 0] + boxes_raw[:, 2] / 2
+            y2 = boxes_raw[:, 1] + boxes_raw[:, 3] / 2
+            margin = _SEAM_MARGIN / ratio
+            seam = np.zeros(len(boxes_raw), dtype=bool)
+            if x > 0:
+                seam |= x1 <= x + margin
+            if y > 0:
+                seam |= y1 <= y + margin
+            if x + w < img_w:
+                seam |= x2 >= x + w - margin
+            if y + h < img_h:
+                seam |= y2 >= y + h - margin
+
+            boxes_list.append(boxes_raw)
+            scores_list.append(scores)
+            seam_list.append(seam)
+
+        boxes_raw = np.concatenate(boxes_list)
+        scores = np.concatenate(scores_list)
+        seam = np.concatenate(seam_list)
+        if len(boxes_raw) == 0:
+            return ParsedResult(img, {})
+
+        # 1. 丢弃被完整框覆盖的接缝框
+        drop = seam.copy()
+        drop[seam] = covered(boxes_raw[seam], boxes_raw[~seam], self._overlap)
+        boxes_raw, scores = boxes_raw[~drop], scores[~drop]
+
+        # 2. 跨切片IOU去重和重叠框过滤
+        idx = self._nms(boxes_raw, scores)
+        boxes_raw, scores = boxes_raw[idx], scores[idx]
+        idx = self._overlap_nms(boxes_raw)
+        boxes_raw = boxes_raw[idx]
+
+        boxes = np.stack(
+            [
+                boxes_raw[:, 0] - boxes_raw[:, 2] / 2,
+                boxes_raw[:, 1] - boxes_raw[:, 3] / 2,
+                boxes_raw[:, 0] + boxes_raw[:, 2] / 2,
+                boxes_raw[:, 1] + boxes_raw[:, 3] / 2,
+            ],
+            axis=1,
+        )
+        return self._finish(left, top, img, boxes)
+
+    def _detect(
+        self, images: list[np.ndarray]
+    ) -> list[tuple[np.ndarray, np.ndarray, float, tuple[int, int]]]:
+        """批量检测, 返回每张图经置信度过滤和NMS后的(框[cx, cy, w, h], 置信度, 缩放比例, 填充偏移);
+        模型不支持批量时逐张推理"""
+        if not images:
+            return []
+        if not self.supports_batch and len(images) > 1:
+            return [detected for image in images for detected in self._detect([image])]
+        if self._fused:
+            return self._detect_fused(images)
+
+        if len(images) == 1:
+            proc_img, ratio, pad = self._preprocess(images[0])
+            geometry = [(ratio, pad)]
+        else:
+            proc_img = scratch_buffer(
+                "omini_batch",
+                (len(images), 3, self._input_l, self._input_l),
+                np.float32,
+            )
+            geometry = []
+            with stage("preprocess"):
+                for i, image in enumerate(images):
+                    _, ratio, pad = letterbox(image, self._input_l, out=proc_img[i])
+                    geometry.append((ratio, pad))
+
+        outputs = self._run(proc_img)[0]
+        return [
+            (*self._filter(output), ratio, pad)
+            for output, (ratio, pad) in zip(outputs, geometry)
+        ]
+
+    def _detect_fused(
+        self, images: list[np.ndarray]
+    ) -> list[tuple[np.ndarray, np.ndarray, float, tuple[int, int]]]:
+        """融合模型检测: 只在numpy中做letterbox, 归一化、置信度过滤和NMS都在图中完成"""
+        batch = scratch_buffer(
+            "omini_batch_u8", (len(images), self._input_l, self._input_l, 3)
+        )
+        geometry = []
+        with stage("preprocess"):
+            for i, image in enumerate(images):
+                _, ratio, pad = letterbox_canvas(image, self._input_l, out=batch[i])
+                geometry.append((ratio, pad))
+
+        batch_index, boxes_raw, scores = self._run(batch)
+        count("boxes_after_nms", len(boxes_raw))
+        results = []
+        for i, (ratio, pad) in enumerate(geometry):
+            # 输出按图像序号排列, 同一张图内按置信度从高到低
+            selected = batch_index == i
+            results.append((boxes_raw[selected], scores[selected], ratio, pad))
+        return results
+
+    def _run(self, tensor: np.ndarray) -> list[np.ndarray]:
+        """执行推理, 返回全部输出"""
+        count("batch_size", len(tensor))
+        with stage("inference"):
+            return self._session.run(None, {self._input_name: tensor})
+
+    def _filter(self, output: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """单张图的模型输出(5, A)经置信度过滤和NMS, 返回(框[cx, cy, w, h], 置信度)"""
+        outputs = output.T  # outputs每一行是一个检测框
+        boxes_raw = outputs[:, :4]  # [cx, cy, w, h]
+        scores = outputs[:, 4]  # 置信度
+
+        # 1. 过滤置信度
+        with stage("score_filter"):
+            idx = scores > self._conf
+            boxes_raw, scores = boxes_raw[idx], scores[idx]
+        count("boxes_after_score", len(boxes_raw))
+
+        # 2. 过滤IOU
+        idx = self._nms(boxes_raw, scores)
+        return boxes_raw[idx], scores[idx]
+
+    def _postprocess(
+        self,
+        left: int,
+        top: int,
+        img: np.ndarray,
+        boxes_raw: np.ndarray,
+        scores: np.ndarray,
+        ratio: float,
+        pad: tuple[int, int],
+    ) -> ParsedResult:
+        """由单张图NMS后的框得到解析结果"""
+        if len(boxes_raw) == 0:
+            return ParsedResult(img, {})  # 没有检测到任何框, 直接返回原图
+        region_left, region_top = pad
+
+        # 3. 过滤重叠框
+        idx = self._overlap_nms(boxes_raw)
+        boxes_raw, scores = boxes_raw[idx], scores[idx]
+
+        # 4. 坐标还原
+        with stage("box_restore"):
+            boxes = np.stack(
+                [
+                    (boxes_raw[:, 0] - boxes_raw[:, 2] / 2 - region_left) / ratio,
+                    (boxes_raw[:, 1] - boxes_raw[:, 3] / 2 - region_top) / ratio,
+                    (boxes_raw[:, 0] + boxes_raw[:, 2] / 2 - region_left) / ratio,
+                    (boxes_raw[:, 1] + boxes_raw[:, 3] / 2 - region_top) / ratio,
+                ],
+                axis=1,
+            )
+        return self._finish(left, top, img, boxes)
+
+    def _finish(
+        self, left: int, top: int, img: np.ndarray, boxes: np.ndarray
+    ) -> ParsedResult:
+        """由区域坐标下的框(x1, y1, x2, y2)裁剪、过滤极小框、画框并构造归一化坐标结果"""
+        img_h = img.shape[0]
+        img_w = img.shape[1]
+
+        with stage("box_restore"):
+            boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, img_w)
+            boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, img_h)
+
+            # 5. 过滤极小框
+            # 计算每个框的宽度和高度
+            widths = boxes[:, 2] - boxes[:, 0]
+            heights = boxes[:, 3] - boxes[:, 1]
+
+            # 过滤条件：宽度和高度必须都大于 10 像素
+            keep = (widths > 10) & (heights > 10)
+            boxes = boxes[keep]
+        count("boxes", len(boxes))
+
+        # 6. 画框
+        with stage("draw"):
+            drawed_img = self._draw(img, boxes)
+
+        # 7. 构造归一化坐标结果
+        with stage("coords"):
+            boxes_center = np.round((boxes[:, :2] + boxes[:, 2:]) / 2).astype(int)
+            boxes_center[:, 0] += left
+            boxes_center[:, 1] += top
+
+            space = self.coordinate_space
+            if space is None:
+                space = get_coordinate_space()
+            u, v = space.to_coord(
+                boxes_center[:, 0], boxes_center[:, 1]
+            )
+            boxes_map = {
+                i: (int(ui), int(vi)) for i, (ui, vi) in enumerate(zip(u, v))
+            }
+
+        return ParsedResult(drawed_img, boxes_map)
+
+    def _preprocess(
+        self, image: np.ndarray
+    ) -> tuple[np.ndarray, float, tuple[int, int]]:
+        """预处理图像, 返回RGB numpy数组(复用线程内的输入缓冲区)"""
+        with stage("preprocess"):
+            proc_img, ratio, pad = letterbox(image, self._input_l)
+        return proc_img[np.newaxis], ratio, pad
+
+    def _nms(self, boxes_raw: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """去重, 返回保留框的索引"""
+        with stage("nms"):
+            idx = nms(boxes_raw, scores, self._iou)
+        count("boxes_after_nms", len(idx))
+        return idx
+
+    def _overlap_nms(self, boxes_raw: np.ndarray) -> np.ndarray:
+        """过滤重叠框: 当大框包小框（交集占小框比例超阈值）时，去掉大框，保留小框。返回保留框的索引"""
+        with stage("overlap_nms"):
+            idx = overlap_nms(boxes_raw, self._overlap)
+        count("boxes_after_overlap", len(idx))
+        return idx
+
+    def _draw(self, img: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        for i, box in enumerate(boxes):
+            x1, y1, x2, y2 = box.astype(int)
+            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 1)
+
+            label = str(i)
+            font_scale = 0.5
+            thickness = 1
+            (tw, th), _ = cv2.getTextSize(
+                label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
+            )
+
+            # 标签尺寸
+            padding = 1
+            bg_w = tw + padding * 2
+            bg_h = th + padding * 2
+
+            # 计算面积比例（标签原始面积 / 框面积）
+            box_area = (x2 - x1) * (y2 - y1)
+            label_area = bg_w * bg_h
+
+            # 默认位置框内左上角
+            bg_x1 = x1
+            bg_y1 = y1
+            text_x = x1 + padding
+            text_y = y1 + bg_h - padding  # 文字基线在背景框底部
+
+            # 如果占用超过10%，尝试放到框外
+            if label_area > box_area * 0.10:
+                # 计算框外位置
+                out_y1 = y1 - bg_h
+
+                # 如果没有超出图片上边界，则使用框外位置
+                if out_y1 >= 0:
+                    bg_y1 = out_y1
+                    text_y = y1 - padding
+
+            # 绘制标签背景和文字
+            bg_x2 = bg_x1 + bg_w
+            bg_y2 = bg_y1 + bg_h
+
+            cv2.rectangle(img, (bg_x1, bg_y1), (bg_x2, bg_y2), (0, 255, 0), -1)
+            cv2.putText(
+                img,
+                label,
+                (text_x, text_y),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                font_scale,
+                (0, 0, 0),
+                thickness,
+                lineType=cv2.LINE_AA,
+            )
+        return img
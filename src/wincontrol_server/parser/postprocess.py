@@ -0,0 +1,123 @@
+from typing import Callable
+
+import numpy as np
+
+
+def _corners(boxes_raw: np.ndarray) -> tuple[np.ndarray, ...]:
+    """[cx, cy, w, h] 转换为 (x1, y1, x2, y2, areas)"""
+    x1 = boxes_raw[:, 0] - (boxes_raw[:, 2] / 2)
+    y1 = boxes_raw[:, 1] - (boxes_raw[:, 3] / 2)
+    x2 = boxes_raw[:, 0] + (boxes_raw[:, 2] / 2)
+    y2 = boxes_raw[:, 1] + (boxes_raw[:, 3] / 2)
+    areas = (x2 - x1) * (y2 - y1)
+    return x1, y1, x2, y2, areas
+
+
+def _intersections(
+    corners: tuple[np.ndarray, ...], rows: np.ndarray, cols: np.ndarray
+) -> np.ndarray:
+    """计算rows中每个框与cols中每个框的交集面积, 返回形状为(len(rows), len(cols))的矩阵"""
+    x1, y1, x2, y2, _ = corners
+    xx1 = np.maximum(x1[rows, None], x1[cols])
+    yy1 = np.maximum(y1[rows, None], y1[cols])
+    xx2 = np.minimum(x2[rows, None], x2[cols])
+    yy2 = np.minimum(y2[rows, None], y2[cols])
+    return np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
+
+
+# 分块贪心抑制的块大小上下限, 以及每块与剩余队列之间抑制矩阵的元素数预算
+_MIN_BLOCK = 16
+_MAX_BLOCK = 256
+_BLOCK_ELEMENTS = 1 << 15
+# 严格上三角掩码: 块内只有排在前面的框能抑制后面的框
+_UPPER = np.triu(np.ones((_MAX_BLOCK, _MAX_BLOCK), dtype=bool), 1)
+
+
+def greedy_suppress(
+    order: np.ndarray, suppresses: Callable[[np.ndarray, np.ndarray], np.ndarray]
+) -> np.ndarray:
+    """分块贪心抑制, 结果与逐个框的贪心循环完全一致
+
+    按order顺序处理框, 被任一已保留框抑制的框丢弃, 否则保留。
+    suppresses(rows, cols)返回bool矩阵, 表示rows中的框是否抑制cols中的框。
+    每次取剩余队列的前若干个框, 块内抑制矩阵取严格上三角后, 迭代
+    "保留 = 没有被块内保留的框抑制"直到不动点: 上三角矩阵的不动点唯一, 就是贪心的结果,
+    迭代次数只取决于抑制链的长度。再用一次矩阵运算把块内保留的框对队列其余部分的抑制
+    全部算完。块大小按矩阵元素数预算随剩余队列长度变化, 框少时整体一次算完,
+    框多时用小块保持矩阵在缓存内。
+    """
+    keep = []
+    remaining = order
+    while remaining.size > 0:
+        block = min(_MAX_BLOCK, max(_MIN_BLOCK, _BLOCK_ELEMENTS // remaining.size))
+        head = remaining[:block]
+        inner = suppresses(head, head)
+        inner &= _UPPER[: head.size, : head.size]
+        alive = ~inner.any(axis=0)
+        while True:
+            # bool矩阵乘法: 被任一保留的框抑制
+            update = ~(alive @ inner)
+            if np.array_equal(update, alive):
+                break
+            alive = update
+        kept_idx = head[alive]
+        keep.append(kept_idx)
+
+        remaining = remaining[block:]
+        if remaining.size > 0:
+            remaining = remaining[~suppresses(kept_idx, remaining).any(axis=0)]
+
+    return np.concatenate(keep).astype(np.int64)
+
+
+def nms(boxes_raw: np.ndarray, scores: np.ndarray, iou: float) -> np.ndarray:
+    """IOU去重, 按置信度从高到低保留框, 返回保留框的索引
+
+    排序与原Omini._nms相同(scores.argsort()[::-1]), 置信度相同时的保留结果也与之一致
+    """
+    if len(boxes_raw) == 0:
+        return np.array([], dtype=np.int64)
+
+    corners = _corners(boxes_raw)
+    areas = corners[4]
+
+    def suppresses(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        inter = _intersections(corners, rows, cols)
+        iou_mat = inter / (areas[rows, None] + areas[cols] - inter + 1e-6)
+        # 写成~(x <= 阈值), 与逐框循环一样把NaN视为抑制
+        return ~(iou_mat <= iou)
+
+    return greedy_suppress(scores.argsort()[::-1], suppresses)
+
+
+def overlap_nms(boxes_raw: np.ndarray, overlap: float) -> np.ndarray:
+    """过滤重叠框: 按面积从小到大保留框, 交集占已保留小框的比例超阈值的大框被去掉, 返回保留框的索引"""
+    if len(boxes_raw) == 0:
+        return np.array([], dtype=np.int64)
+
+    corners = _corners(boxes_raw)
+    areas = corners[4]
+
+    def suppresses(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        inter = _intersections(corners, rows, cols)
+        return ~(inter / (areas[rows, None] + 1e-6) <= overlap)
+
+    return greedy_suppress(areas.argsort(), suppresses)
+
+
+def covered(boxes_raw: np.ndarray, by_raw: np.ndarray, overlap: float) -> np.ndarray:
+    """boxes_raw中每个框是否被by_raw中任一框覆盖(交集占该框面积的比例超阈值), 返回bool掩码"""
+    if len(boxes_raw) == 0 or len(by_raw) == 0:
+        return np.zeros(len(boxes_raw), dtype=bool)
+
+    corners = _corners(np.concatenate([boxes_raw, by_raw]))
+    areas = corners[4]
+    cols = np.arange(len(boxes_raw), len(boxes_raw) + len(by_raw))
+    mask = np.empty(len(boxes_raw), dtype=bool)
+    # 分块计算, 限制交集矩阵的大小
+    step = max(1, (1 << 20) // len(cols))
+    for start in range(0, len(boxes_raw), step):
+        rows = np.arange(start, min(start + step, len(boxes_raw)))
+        inter = _intersections(corners, rows, cols)
+        mask[rows] = (inter / (areas[rows, None] + 1e-6) > overlap).any(axis=1)
+    return mask
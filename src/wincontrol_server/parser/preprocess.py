@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+
+from wincontrol_server.devices.screen import scratch_buffer
+
+_PAD_VALUE = 114
+_SCALE = np.float32(255.0)
+
+
+def letterbox_geometry(
+    img_w: int, img_h: int, size: int
+) -> tuple[float, int, int, int, int]:
+    """等比缩放到size×size并居中填充的几何参数, 返回(缩放比例, 缩放后宽, 缩放后高, 左填充, 上填充)"""
+    ratio = size / max(img_w, img_h)
+    if img_w > img_h:
+        new_w = size
+        new_h = round(img_h * ratio)
+    else:
+        new_w = round(img_w * ratio)
+        new_h = size
+    left = int(np.floor((size - new_w) / 2))
+    top = int(np.floor((size - new_h) / 2))
+    return ratio, new_w, new_h, left, top
+
+
+def tile_grid(
+    width: int, height: int, tile: int, overlap: float
+) -> list[tuple[int, int, int, int]]:
+    """把width×height的图像切成边长tile、相邻重叠比例约为overlap的网格, 返回(x, y, w, h)列表
+
+    每个方向上的切片均匀分布且首尾贴齐图像边缘, 图像小于tile的方向不切分。
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError(f"Invalid tile overlap: {overlap}")
+
+    def starts(length: int) -> list[int]:
+        if length <= tile:
+            return [0]
+        step = tile * (1 - overlap)
+        count = int(np.ceil((length - tile) / step)) + 1
+        return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+    tile_w = min(tile, width)
+    tile_h = min(tile, height)
+    return [(x, y, tile_w, tile_h) for y in starts(height) for x in starts(width)]
+
+
+def letterbox_canvas(
+    image: np.ndarray, size: int, out: np.ndarray | None = None
+) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """BGR图像等比缩放并居中填充到(size, size, 3)的uint8画布, 不做通道变换和归一化
+
+    out为None时使用线程内复用的画布, 下次调用会覆盖。返回(画布, 缩放比例, (左填充, 上填充))
+    """
+    ratio, new_w, new_h, left, top = letterbox_geometry(
+        image.shape[1], image.shape[0], size
+    )
+
+    canvas = out
+    if canvas is None:
+        canvas = scratch_buffer("letterbox_canvas", (size, size, 3))
+    cv2.resize(
+        image, (new_w, new_h), dst=canvas[top : top + new_h, left : left + new_w]
+    )
+    # 只重填四周的填充区域
+    canvas[:top] = _PAD_VALUE
+    canvas[top + new_h :] = _PAD_VALUE
+    canvas[top : top + new_h, :left] = _PAD_VALUE
+    canvas[top : top + new_h, left + new_w :] = _PAD_VALUE
+    return canvas, ratio, (left, top)
+
+
+def letterbox(
+    image: np.ndarray, size: int, out: np.ndarray | None = None
+) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """BGR图像letterbox预处理, 结果为RGB、归一化到[0, 1]的(3, size, size) float32张量
+
+    缩放结果直接写入线程内复用的uint8画布, 拆分通道后除以255写入out,
+    不产生整图大小的临时数组。out为None时使用线程内复用的缓冲区, 下次调用会覆盖。
+    返回(张量, 缩放比例, (左填充, 上填充))
+    """
+    canvas, ratio, (left, top) = letterbox_canvas(image, size)
+
+    # BGR -> RGB并转为CHW: 输出通道c取画布通道2-c, 先拆成连续的uint8平面再整体归一化
+    planes = scratch_buffer("letterbox_planes", (3, size, size))
+    for c in range(3):
+        cv2.extractChannel(canvas, 2 - c, dst=planes[c])
+    if out is None:
+        out = scratch_buffer("letterbox_input", (3, size, size), np.float32)
+    np.divide(planes, _SCALE, out=out, dtype=np.float32)
+    return out, ratio, (left, top)
@@ -0,0 +1,162 @@
+import argparse
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from wincontrol_server.bench.common import half_screen_regions
+from wincontrol_server.parser.model_cache import import_onnx
+from wincontrol_server.parser.preprocess import letterbox
+
+logger = logging.getLogger(__name__)
+
+# 模型变体: fp32为原模型, int8为动态或静态量化模型, fp16为半精度模型
+MODEL_VARIANTS = ("fp32", "int8", "fp16")
+
+
+def variant_path(model_path: str, variant: str) -> Path:
+    """模型变体的路径, 与原模型放在同一目录, 如omini.int8.onnx"""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Invalid model variant: {variant}")
+    path = Path(model_path)
+    if variant == "fp32":
+        return path
+    return path.with_name(f"{path.stem}.{variant}{path.suffix}")
+
+
+def calibration_inputs(
+    frames_dir: str, size: int, limit: int = 0
+) -> list[np.ndarray]:
+    """目录中PNG整屏帧的九个半屏区域(与screen_region_parser相同), letterbox后作为校准输入"""
+    paths = sorted(Path(frames_dir).glob("*.png"))
+    if not paths:
+        raise ValueError(f"No PNG frames in {frames_dir}")
+    inputs = []
+    for path in paths:
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to read frame: {path}")
+        for _, _, region in half_screen_regions(img):
+            tensor = np.empty((1, 3, size, size), dtype=np.float32)
+            letterbox(region, size, out=tensor[0])
+            inputs.append(tensor)
+    if limit > 0:
+        inputs = inputs[:limit]
+    return inputs
+
+
+def quantize_int8(
+    model_path: str,
+    out_path: str,
+    frames_dir: str | None = None,
+    calibration_limit: int = 0,
+) -> Path:
+    """INT8量化: 给出校准帧目录时为静态量化(QDQ, 按通道量化权重), 否则为只量化权重的动态量化"""
+    # 量化工具随onnxruntime发布, 但依赖onnx包, 只在生成模型时导入
+    onnx = import_onnx()
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if frames_dir is None:
+        quantize_dynamic(model_path, out_path, weight_type=QuantType.QInt8)
+        return out_path
+
+    model = onnx.load(model_path)
+    graph = model.graph
+    model_input = graph.input[0]
+    input_name = model_input.name
+    size = model_input.type.tensor_type.shape.dim[2].dim_value
+    # 输出把框坐标(0~输入尺寸)和置信度(0~1)拼在同一个张量里, 共用一个量化比例时
+    # 置信度会被舍入为0, 产生输出的节点保持浮点; 排除节点按名称指定, 先给无名节点命名
+    for i, node in enumerate(graph.node):
+        if not node.name:
+            node.name = f"{node.op_type}_{i}"
+    outputs = {output.name for output in graph.output}
+    head = [node.name for node in graph.node if outputs & set(node.output)]
+    named_path = out_path.with_suffix(".named.onnx")
+    onnx.save(model, named_path)
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter(calibration_inputs(frames_dir, size, calibration_limit))
+
+        def get_next(self):
+            tensor = next(self._inputs, None)
+            return None if tensor is None else {input_name: tensor}
+
+    try:
+        quantize_static(
+            named_path,
+            out_path,
+            _Reader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            nodes_to_exclude=head,
+        )
+    finally:
+        named_path.unlink(missing_ok=True)
+    return out_path
+
+
+def convert_fp16(model_path: str, out_path: str) -> Path:
+    """半精度模型, 输入输出仍为float32, 与原模型可以互换"""
+    onnx = import_onnx()
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(model_path), keep_io_types=True)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, out_path)
+    return out_path
+
+
+def build_variant(
+    model_path: str,
+    variant: str,
+    out_path: str | None = None,
+    frames_dir: str | None = None,
+    calibration_limit: int = 0,
+) -> Path:
+    """生成模型变体, out_path为None时写到variant_path给出的位置"""
+    if out_path is None:
+        out_path = str(variant_path(model_path, variant))
+    if variant == "int8":
+        path = quantize_int8(model_path, out_path, frames_dir, calibration_limit)
+    elif variant == "fp16":
+        path = convert_fp16(model_path, out_path)
+    else:
+        raise ValueError(f"Nothing to build for model variant: {variant}")
+    logger.info("built %s model %s", variant, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="由omini.onnx生成INT8/FP16模型变体")
+    parser.add_argument("model")
+    parser.add_argument("variant", choices=[v for v in MODEL_VARIANTS if v != "fp32"])
+    parser.add_argument("--output", help="默认与原模型放在同一目录")
+    parser.add_argument(
+        "--frames", help="INT8静态量化的校准帧目录(PNG整屏截图), 不给出时为动态量化"
+    )
+    parser.add_argument("--calibration-limit", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        build_variant(
+            args.model, args.variant, args.output, args.frames, args.calibration_limit
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
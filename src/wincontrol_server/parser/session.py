@@ -0,0 +1,139 @@
+from dataclasses import dataclass, fields, replace
+import os
+
+import onnxruntime as ort
+
+from wincontrol_server.runtime.config import (
+    env_bool,
+    env_int,
+    env_str,
+    load_config_section,
+)
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+@dataclass(frozen=True)
+class SessionConfig:
+    """ONNX Runtime会话参数, 线程数为0时使用ORT默认值"""
+
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    execution_mode: str = "sequential"
+    graph_optimization_level: str = "all"
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    allow_spinning: bool = True
+    providers: tuple[str, ...] = ("CUDAExecutionProvider", "CPUExecutionProvider")
+
+    def __post_init__(self):
+        if self.execution_mode not in _EXECUTION_MODES:
+            raise ValueError(f"Invalid execution_mode: {self.execution_mode}")
+        if self.graph_optimization_level not in _OPT_LEVELS:
+            raise ValueError(
+                f"Invalid graph_optimization_level: {self.graph_optimization_level}"
+            )
+        if self.intra_op_num_threads < 0 or self.inter_op_num_threads < 0:
+            raise ValueError("thread counts must be >= 0")
+
+
+def _cpu_count() -> int:
+    return os.cpu_count() or 1
+
+
+# 预设: latency为独占全部核心追求最低延迟, shared为与桌面程序共享核心(少线程, 不自旋)
+PRESETS = {
+    "default": lambda: SessionConfig(),
+    "latency": lambda: SessionConfig(
+        intra_op_num_threads=_cpu_count(),
+        inter_op_num_threads=1,
+        allow_spinning=True,
+    ),
+    "shared": lambda: SessionConfig(
+        intra_op_num_threads=max(1, _cpu_count() // 4),
+        inter_op_num_threads=1,
+        allow_spinning=False,
+    ),
+}
+
+# 环境变量名 -> (配置项, 读取函数)
+_ENV_OVERRIDES = {
+    "WINCONTROL_ORT_INTRA_THREADS": ("intra_op_num_threads", env_int),
+    "WINCONTROL_ORT_INTER_THREADS": ("inter_op_num_threads", env_int),
+    "WINCONTROL_ORT_EXECUTION_MODE": ("execution_mode", env_str),
+    "WINCONTROL_ORT_OPT_LEVEL": ("graph_optimization_level", env_str),
+    "WINCONTROL_ORT_MEM_ARENA": ("enable_cpu_mem_arena", env_bool),
+    "WINCONTROL_ORT_MEM_PATTERN": ("enable_mem_pattern", env_bool),
+    "WINCONTROL_ORT_SPINNING": ("allow_spinning", env_bool),
+    "WINCONTROL_ORT_PROVIDERS": ("providers", env_str),
+}
+
+
+def load_session_config() -> SessionConfig:
+    """读取会话参数, 优先级: 环境变量 > 配置文件[onnx]节 > 预设"""
+    section = dict(load_config_section("onnx"))
+    preset = env_str("WINCONTROL_ORT_PRESET", section.pop("preset", "default"))
+    if preset not in PRESETS:
+        raise ValueError(f"Invalid onnx preset: {preset}")
+    config = PRESETS[preset]()
+
+    names = {f.name for f in fields(SessionConfig)}
+    unknown = set(section) - names
+    if unknown:
+        raise ValueError(f"Unknown onnx config keys: {sorted(unknown)}")
+    overrides = dict(section)
+
+    for env_name, (name, read) in _ENV_OVERRIDES.items():
+        if os.environ.get(env_name, "").strip():
+            overrides[name] = read(env_name, None)
+
+    providers = overrides.get("providers")
+    if isinstance(providers, str):
+        overrides["providers"] = tuple(
+            p.strip() for p in providers.split(",") if p.strip()
+        )
+    elif providers is not None:
+        overrides["providers"] = tuple(providers)
+
+    return replace(config, **overrides)
+
+
+def session_options(config: SessionConfig) -> ort.SessionOptions:
+    """根据会话参数构造SessionOptions"""
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config.intra_op_num_threads
+    options.inter_op_num_threads = config.inter_op_num_threads
+    options.execution_mode = _EXECUTION_MODES[config.execution_mode]
+    options.graph_optimization_level = _OPT_LEVELS[config.graph_optimization_level]
+    options.enable_cpu_mem_arena = config.enable_cpu_mem_arena
+    options.enable_mem_pattern = config.enable_mem_pattern
+    spinning = "1" if config.allow_spinning else "0"
+    options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+    return options
+
+
+def available_providers(config: SessionConfig) -> list[str]:
+    """过滤掉当前环境不可用的执行后端, 保持配置中的优先顺序"""
+    available = set(ort.get_available_providers())
+    providers = [p for p in config.providers if p in available]
+    return providers or ["CPUExecutionProvider"]
+
+
+def create_session(model_path: str, config: SessionConfig) -> ort.InferenceSession:
+    """按会话参数创建推理会话"""
+    return ort.InferenceSession(
+        model_path,
+        sess_options=session_options(config),
+        providers=available_providers(config),
+    )
@@ -0,0 +1,440 @@
+import atexit
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Callable
+
+import numpy as np
+
+from wincontrol_server.parser.omini import Omini, ParsedResult
+from wincontrol_server.runtime.profiler import Profiler, count, merge, stage
+from wincontrol_server.runtime.runtime import CoordinateSpace, get_coordinate_space
+
+logger = logging.getLogger(__name__)
+
+# 共享内存按该粒度向上取整分配, 区域尺寸小幅变化时不必重新分配
+_SHM_GRANULARITY = 1024 * 1024
+
+
+class WorkerError(RuntimeError):
+    """解析工作进程启动失败、崩溃或无响应"""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """工作进程中挂载主进程创建的共享内存, 由主进程负责释放"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # spawn的子进程与主进程共用资源跟踪器, 重复登记不会导致提前释放
+    return shared_memory.SharedMemory(name=name)
+
+
+def _serve(omini: Omini, shm: shared_memory.SharedMemory, request: tuple) -> tuple:
+    """在工作进程中执行一次解析, 标注图原地写回共享内存, 返回(框列表, 阶段耗时, 计数)"""
+    method, _, images, args, space = request
+    views = [
+        np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        for offset, shape, _, _ in images
+    ]
+    omini.coordinate_space = space
+    with Profiler(enabled=True, history=1).trace(method) as trace:
+        if method == "parse_batch":
+            results = omini.parse_batch(
+                [(left, top, view) for (_, _, left, top), view in zip(images, views)]
+            )
+        else:
+            _, _, left, top = images[0]
+            results = [getattr(omini, method)(left, top, views[0], *args)]
+    for view, result in zip(views, results):
+        if result.parsed_img is not view:
+            np.copyto(view, result.parsed_img)
+    return [result.boxes for result in results], trace.stages, trace.counters
+
+
+def _worker_main(factory: Callable[[], Omini], conn) -> None:
+    """工作进程入口: 构造Omini后循环处理请求, 收到None或管道关闭时退出"""
+    try:
+        omini = factory()
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(
+        (
+            "ready",
+            {
+                "settings": omini.settings,
+                "supports_batch": omini.supports_batch,
+                "startup_report": omini.startup_report,
+            },
+        )
+    )
+
+    shm = None
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        if request == "ping":
+            conn.send("pong")
+            continue
+
+        shm_name = request[1]
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = _attach(shm_name)
+        try:
+            conn.send(("ok", *_serve(omini, shm, request)))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+    if shm is not None:
+        shm.close()
+
+
+class _Worker:
+    """一个解析工作进程及其共享内存和管道"""
+
+    def __init__(self, context, factory: Callable[[], Omini], index: int):
+        self._context = context
+        self._factory = factory
+        self.index = index
+        self.process = None
+        self.info = None
+        self._conn = None
+        self._shm = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, timeout: float) -> None:
+        """启动工作进程并等待模型加载完成"""
+        conn, child_conn = self._context.Pipe()
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(self._factory, child_conn),
+            name=f"omini-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._conn = conn
+
+        status, payload = self._recv(timeout)
+        if status != "ready":
+            self.stop()
+            raise WorkerError(f"omini worker {self.index} failed to start: {payload}")
+        self.info = payload
+
+    def stop(self) -> None:
+        """通知工作进程退出, 超时未退出时强制结束"""
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+        if self.process is not None:
+            self.process.join(1.0)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self) -> None:
+        """结束工作进程并释放共享内存"""
+        self.stop()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def ping(self, timeout: float) -> None:
+        """健康检查, 无响应时抛出WorkerError"""
+        self._send("ping")
+        if self._recv(timeout) != "pong":
+            raise WorkerError(f"omini worker {self.index} sent an unexpected reply")
+
+    def call(
+        self,
+        method: str,
+        regions: list[tuple[int, int, np.ndarray]],
+        args: tuple,
+        space: CoordinateSpace,
+        timeout: float,
+    ) -> tuple[list[ParsedResult], dict, dict]:
+        """区域图像写入共享内存后请求工作进程解析, 返回(解析结果列表, 阶段耗时, 计数)"""
+        with stage("shm_write"):
+            shm = self._buffer(sum(img.nbytes for _, _, img in regions))
+            images = []
+            offset = 0
+            for left, top, img in regions:
+                view = np.ndarray(
+                    img.shape, dtype=np.uint8, buffer=shm.buf, offset=offset
+                )
+                np.copyto(view, img)
+                images.append((offset, img.shape, left, top))
+                offset += img.nbytes
+            del view
+
+        with stage("worker"):
+            self._send((method, shm.name, images, args, space))
+            status, *payload = self._recv(timeout)
+        if status != "ok":
+            raise RuntimeError(f"omini worker {self.index} failed:\n{payload[0]}")
+
+        boxes_list, stages, counters = payload
+        with stage("shm_read"):
+            results = [
+                ParsedResult(
+                    np.ndarray(
+                        shape, dtype=np.uint8, buffer=shm.buf, offset=offset
+                    ).copy(),
+                    boxes,
+                )
+                for (offset, shape, _, _), boxes in zip(images, boxes_list)
+            ]
+        return results, stages, counters
+
+    def _buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        """容量不小于nbytes的共享内存, 不足时重新分配"""
+        if self._shm is None or self._shm.size < nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            size = -(-max(nbytes, 1) // _SHM_GRANULARITY) * _SHM_GRANULARITY
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        return self._shm
+
+    def _connection(self):
+        """与工作进程的管道, 进程未运行(如重启失败)时抛出WorkerError"""
+        if self._conn is None:
+            raise WorkerError(f"omini worker {self.index} is not running")
+        return self._conn
+
+    def _send(self, message) -> None:
+        conn = self._connection()
+        try:
+            conn.send(message)
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"omini worker {self.index} is gone: {e}") from e
+
+    def _recv(self, timeout: float):
+        """等待回复, 期间工作进程退出或超时则抛出WorkerError"""
+        deadline = time.monotonic() + timeout
+        conn = self._connection()
+        try:
+            while not conn.poll(0.05):
+                if not self.process.is_alive():
+                    raise WorkerError(
+                        f"omini worker {self.index} exited with code "
+                        f"{self.process.exitcode}"
+                    )
+                if time.monotonic() > deadline:
+                    raise WorkerError(
+                        f"omini worker {self.index} did not reply in {timeout}s"
+                    )
+            return conn.recv()
+        except EOFError as e:
+            raise WorkerError(f"omini worker {self.index} closed the pipe") from e
+        except OSError as e:
+            raise WorkerError(f"omini worker {self.index} is gone: {e}") from e
+
+
+class OminiPool:
+    """在独立进程中运行Omini的解析后端, 接口与Omini相同
+
+    每个工作进程各自加载模型, 区域图像和标注图经共享内存传递, 管道中只有元数据和框坐标;
+    推理和画框不再占用主进程的GIL, 传输事件循环不会被解析拖慢。请求排队等待空闲进程,
+    进程在请求中崩溃或无响应时重启并重试一次, 后台线程定期对空闲进程做健康检查;
+    重启失败的进程仍留在空闲队列中, 下次请求或健康检查时再次重启。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Omini],
+        workers: int = 1,
+        timeout: float = 30.0,
+        start_timeout: float = 120.0,
+        health_interval: float = 5.0,
+    ):
+        if workers < 1:
+            raise ValueError(f"Invalid worker count: {workers}")
+        self._timeout = timeout
+        self._start_timeout = start_timeout
+        self._health_interval = health_interval
+        # 主进程可能已有截图、加载等线程, 统一用spawn启动, 与Windows行为一致
+        context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(context, factory, i) for i in range(workers)]
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._waiting = 0
+        self._busy = 0
+        self._requests = 0
+        self._restarts = 0
+        self._failures = 0
+
+        try:
+            for worker in self._workers:
+                worker.start(start_timeout)
+                self._idle.put(worker)
+        except BaseException:
+            self.close()
+            raise
+        info = self._workers[0].info
+        self._settings = tuple(info["settings"])
+        self._supports_batch = info["supports_batch"]
+        self.startup_report = {
+            "workers": [worker.info["startup_report"] for worker in self._workers]
+        }
+        logger.info("omini pool startup: %s", self.startup_report)
+
+        atexit.register(self.close)
+        if health_interval > 0:
+            threading.Thread(
+                target=self._monitor, name="omini-pool-health", daemon=True
+            ).start()
+
+    @property
+    def settings(self) -> tuple[float, float, float]:
+        """解析参数(conf, iou, overlap)"""
+        return self._settings
+
+    @property
+    def supports_batch(self) -> bool:
+        """模型输入的batch维是否为动态维度"""
+        return self._supports_batch
+
+    def parse(self, left: int, top: int, img: np.ndarray) -> ParsedResult:
+        """解析GUI, 形参为解析区域起始坐标和BGR numpy数组"""
+        return self._call("parse", [(left, top, img)])[0]
+
+    def parse_batch(
+        self, regions: list[tuple[int, int, np.ndarray]]
+    ) -> list[ParsedResult]:
+        """在同一个工作进程中一次推理解析多个区域"""
+        if not regions:
+            return []
+        return self._call("parse_batch", regions)
+
+    def parse_tiled(
+        self,
+        left: int,
+        top: int,
+        img: np.ndarray,
+        tile_scale: float = 1.0,
+        tile_overlap: float = 0.25,
+    ) -> ParsedResult:
+        """按接近原始分辨率切片解析"""
+        return self._call(
+            "parse_tiled", [(left, top, img)], (tile_scale, tile_overlap)
+        )[0]
+
+    def stats(self) -> dict:
+        """工作进程数、存活数、正在处理请求的进程数、排队请求数和重启次数"""
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "alive": sum(worker.alive for worker in self._workers),
+                "busy": self._busy,
+                "queued": self._waiting,
+                "requests": self._requests,
+                "restarts": self._restarts,
+                "failures": self._failures,
+            }
+
+    def close(self) -> None:
+        """结束全部工作进程并释放共享内存, 重复调用无效果"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        for worker in self._workers:
+            worker.close()
+
+    def _call(
+        self, method: str, regions: list[tuple[int, int, np.ndarray]], args=()
+    ) -> list[ParsedResult]:
+        if self._closed.is_set():
+            raise RuntimeError("omini pool is closed")
+        space = get_coordinate_space()
+        worker = self._acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    results, stages, counters = worker.call(
+                        method, regions, args, space, self._timeout
+                    )
+                    break
+                except WorkerError as e:
+                    with self._lock:
+                        self._failures += 1
+                    logger.warning("%s, restarting", e)
+                    self._restart(worker)
+                    if attempt:
+                        raise
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._idle.put(worker)
+        # 工作进程中的预处理、推理等阶段耗时并入当前调用
+        merge(stages, counters)
+        return results
+
+    def _acquire(self) -> _Worker:
+        """取一个空闲的工作进程, 全忙时排队等待"""
+        with self._lock:
+            self._requests += 1
+            self._waiting += 1
+            count("parse_queue_depth", self._waiting - 1)
+        try:
+            with stage("queue_wait"):
+                worker = self._idle.get()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        with self._lock:
+            self._busy += 1
+        return worker
+
+    def _restart(self, worker: _Worker) -> None:
+        """重启一个崩溃或无响应的工作进程, 启动失败时留待下次请求或健康检查再试"""
+        with self._lock:
+            self._restarts += 1
+        worker.stop()
+        if self._closed.is_set():
+            return
+        try:
+            worker.start(self._start_timeout)
+        except WorkerError as e:
+            logger.error("%s", e)
+
+    def _monitor(self) -> None:
+        """定期检查空闲的工作进程, 已退出或不响应ping的进程被重启
+
+        每次只从空闲队列取出一个进程, 健康的立即放回, 重启失败进程时其余进程照常处理请求
+        """
+        while not self._closed.wait(self._health_interval):
+            for _ in range(len(self._workers)):
+                if self._closed.is_set():
+                    break
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    worker.ping(self._health_interval)
+                except WorkerError as e:
+                    logger.warning("%s, restarting", e)
+                    self._restart(worker)
+                finally:
+                    self._idle.put(worker)
@@ -0,0 +1,12 @@
+import json
+
+from mcp.server.fastmcp import FastMCP
+
+from wincontrol_server.runtime.profiler import get_profiler
+
+
+def register(mcp: FastMCP):
+    @mcp.resource("profile://stats", mime_type="application/json")
+    def profile_stats() -> str:
+        """获取各工具调用的分阶段耗时和计数统计, 需设置WINCONTROL_PROFILE=1开启"""
+        return json.dumps(get_profiler().stats(), ensure_ascii=False)
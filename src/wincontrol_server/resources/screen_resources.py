@@ -1,51 +1,410 @@
+import base64
+from dataclasses import dataclass
+from functools import lru_cache
+import json
+import math
 from pathlib import Path
 
 import cv2
 from mcp.server.fastmcp import FastMCP
 import numpy as np
 
+from wincontrol_server.devices.grabber import last_input_time, latest_frame
 from wincontrol_server.devices.mouse import Mouse
-from wincontrol_server.devices.screen import Screen
+from wincontrol_server.devices.screen import (
+    Frame,
+    Screen,
+    bgra_to_bgr,
+    scratch_buffer,
+)
+from wincontrol_server.devices.tiles import get_tile_tracker, tile_means
+from wincontrol_server.runtime.codec import ImageEncoder, load_encoder_config
+from wincontrol_server.runtime.config import env_bool, env_float, env_int, env_str
+from wincontrol_server.runtime.executors import CancelToken, run_cpu
+from wincontrol_server.runtime.profiler import count, get_profiler, stage
+from wincontrol_server.runtime.runtime import get_coordinate_space
 
 
 _SCRIPT_DIR = Path(__file__).parent
 _POINTER_IMG = cv2.imread(str(_SCRIPT_DIR / "pointer.png"), cv2.IMREAD_UNCHANGED)
-_POINTER_H, _POINTER_W = _POINTER_IMG.shape[:2]
+# 在缩小后的截图上叠加缩小的指针, 关闭时在原分辨率截图上叠加后再缩小
+_POINTER_AFTER_RESIZE = env_bool("WINCONTROL_POINTER_AFTER_RESIZE", True)
 
 
-def register(mcp: FastMCP):
-    @mcp.resource("screen://screenshot", mime_type="image/png")
-    def screen_shot() -> bytes:
-        """获取当前屏幕截图"""
-        with Screen() as screen:
-            img_bgr = screen.capture()
-            px, py = Mouse().position
-            pw = _POINTER_W
-            ph = _POINTER_H
-
-            if px + pw > screen.width:
-                pw = screen.width - px
-            if py + ph > screen.height:
-                ph = screen.height - py
-
-            if pw <= 0 or ph <= 0:
-                pass
-            else:
-                pointer = _POINTER_IMG[:ph, :pw]
-                alpha = pointer[:, :, 3] / 255.0
-                for c in range(3):
-                    img_bgr[py : py + ph, px : px + pw, c] = (
-                        alpha * pointer[:, :, c]
-                        + (1 - alpha) * img_bgr[py : py + ph, px : px + pw, c]
-                    ).astype(np.uint8)
-
-            img_bgr = cv2.resize(
+@lru_cache(maxsize=4)
+def _pointer_sprite(scale: float) -> tuple[np.ndarray, np.ndarray]:
+    """按比例缩放的预乘alpha指针: (预乘后的BGR, 255-alpha扩展到三通道)"""
+    bgr = _POINTER_IMG[:, :, :3].astype(np.float32)
+    alpha = _POINTER_IMG[:, :, 3:].astype(np.float32)
+    premul = bgr * alpha / 255
+    inv_alpha = np.repeat(255 - alpha, 3, axis=2)
+    if scale != 1.0:
+        h, w = _POINTER_IMG.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        # 预乘后颜色和alpha都是线性量, 可以分别缩放
+        premul = cv2.resize(premul, size, interpolation=cv2.INTER_AREA)
+        inv_alpha = cv2.resize(inv_alpha, size, interpolation=cv2.INTER_AREA)
+    return (
+        np.rint(premul).astype(np.uint8),
+        np.rint(inv_alpha).astype(np.uint8),
+    )
+
+
+def overlay_pointer(img: np.ndarray, x: int, y: int, scale: float = 1.0) -> None:
+    """在BGR图像的(x, y)处原地叠加指针, 超出图像四边的部分会被裁掉"""
+    premul, inv_alpha = _pointer_sprite(scale)
+    ph, pw = premul.shape[:2]
+    h, w = img.shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + pw, w), min(y + ph, h)
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    roi = img[y0:y1, x0:x1]
+    sprite = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    # dst = dst * (255 - alpha) / 255 + 预乘颜色, 全部为uint8饱和运算
+    cv2.multiply(roi, inv_alpha[sprite], dst=roi, scale=1 / 255)
+    cv2.add(roi, premul[sprite], dst=roi)
+
+
+# 截图的编码参数(WINCONTROL_SCREENSHOT_*或配置文件[encode.screenshot]节),
+# 资源只能声明一种MIME类型, 因此不支持auto
+_ENCODER = ImageEncoder(load_encoder_config("screenshot"))
+if _ENCODER.config.mime_type is None:
+    raise ValueError("screenshot encoding needs a fixed format, auto is not supported")
+
+
+def budget_scale(width: int, height: int, max_tokens: int, pixels_per_token: int):
+    """不超过图像token预算的最大缩放比例, 不会放大, max_tokens为0时不缩放"""
+    if max_tokens <= 0:
+        return 1.0
+    return min(1.0, math.sqrt(max_tokens * pixels_per_token / (width * height)))
+
+
+@dataclass(frozen=True)
+class FidelityTier:
+    """截图精度档位, 按图像token预算计算缩放比例, max_tokens为0时不缩放"""
+
+    name: str
+    max_tokens: int
+    grayscale: bool = False
+
+    def scale(self, width: int, height: int, pixels_per_token: int) -> float:
+        return budget_scale(width, height, self.max_tokens, pixels_per_token)
+
+
+# 每个图像token对应的像素数, 默认按28x28的视觉patch估算
+_PIXELS_PER_TOKEN = env_int("WINCONTROL_SCREENSHOT_PIXELS_PER_TOKEN", 28 * 28)
+# glance为操作后确认用的低分辨率灰度图, medium为默认, full为原始分辨率
+_TIERS = {
+    "glance": FidelityTier(
+        "glance", env_int("WINCONTROL_SCREENSHOT_GLANCE_TOKENS", 256), grayscale=True
+    ),
+    "medium": FidelityTier(
+        "medium", env_int("WINCONTROL_SCREENSHOT_MEDIUM_TOKENS", 1024)
+    ),
+    "full": FidelityTier("full", env_int("WINCONTROL_SCREENSHOT_FULL_TOKENS", 0)),
+}
+_DEFAULT_TIER = env_str("WINCONTROL_SCREENSHOT_TIER", "medium")
+if _DEFAULT_TIER not in _TIERS:
+    raise ValueError(f"Invalid WINCONTROL_SCREENSHOT_TIER: {_DEFAULT_TIER}")
+# 缩小后的指针不小于原图的一半, 保证低分辨率档位中仍然可见
+_MIN_POINTER_SCALE = 0.5
+
+
+def resolve_tier(tier: str) -> FidelityTier:
+    """档位名, 或者直接给出token预算的数字(彩色)"""
+    if tier in _TIERS:
+        return _TIERS[tier]
+    if tier.isdigit():
+        return FidelityTier(f"{tier} tokens", int(tier))
+    raise ValueError(f"Unknown screenshot tier: {tier}, expected one of {list(_TIERS)}")
+
+
+def _render(
+    bgra: np.ndarray,
+    x: int,
+    y: int,
+    scale: float,
+    grayscale: bool = False,
+    buffer: str = "screenshot",
+) -> np.ndarray:
+    """把BGRA图像按比例缩放并在(x, y)处(相对图像左上角)叠加指针, 可选转为灰度"""
+    height, width = bgra.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    pointer_scale = max(scale, _MIN_POINTER_SCALE)
+    if _POINTER_AFTER_RESIZE:
+        # 先缩小再转换为BGR, 只需转换缩小后的像素
+        if scale < 1.0:
+            with stage("resize"):
+                bgra = cv2.resize(bgra, size, interpolation=cv2.INTER_AREA)
+        # 转换到线程内复用的预分配缓冲区, 叠加指针不会修改截图帧
+        img_bgr = bgra_to_bgr(bgra, out=scratch_buffer(buffer, size[::-1] + (3,)))
+        with stage("pointer_overlay"):
+            overlay_pointer(
                 img_bgr,
-                (screen.width // 2, screen.height // 2),
-                interpolation=cv2.INTER_AREA,
+                math.floor(x * scale),
+                math.floor(y * scale),
+                scale=pointer_scale,
             )
+    else:
+        img_bgr = bgra_to_bgr(bgra, out=scratch_buffer(buffer, (height, width, 3)))
+        with stage("pointer_overlay"):
+            overlay_pointer(img_bgr, x, y, scale=pointer_scale / scale)
+        if scale < 1.0:
+            with stage("resize"):
+                img_bgr = cv2.resize(img_bgr, size, interpolation=cv2.INTER_AREA)
+
+    if grayscale:
+        with stage("grayscale"):
+            img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+    count("image_pixels", img_bgr.shape[0] * img_bgr.shape[1])
+    return img_bgr
+
+
+# 最近一次发给模型的整屏截图对应的帧: (帧号, BGRA拷贝), 差分截图以它为基准;
+# host只保留最新的整屏截图和最新的差分截图, 所以只有整屏截图才更新它
+_SENT_FRAME = None
+
+
+def _remember_sent(frame: Frame) -> None:
+    """记录发给模型的帧, 拷贝到复用的缓冲区中"""
+    global _SENT_FRAME
+
+    with stage("remember_frame"):
+        buf = None if _SENT_FRAME is None else _SENT_FRAME[1]
+        if buf is None or buf.shape != frame.bgra.shape:
+            buf = np.empty_like(frame.bgra)
+        np.copyto(buf, frame.bgra)
+    _SENT_FRAME = (frame.frame_id, buf)
+
+
+# 各命名档位最近一次返回的截图: 档位 -> (帧号, 指针位置, 编码后的字节);
+# 直接给出token预算的档位可以是任意数字, 不缓存, 避免字典无限增长
+_LAST_SHOTS = {}
+
+
+def _screen_shot(token: CancelToken, tier: FidelityTier) -> bytes:
+    """截图并叠加指针, 按档位缩放(和转为灰度)后按配置的格式编码"""
+    with Screen() as screen:
+        with stage("capture"):
+            frame = latest_frame(newer_than=last_input_time())
+            px, py = Mouse().position
+
+            # 画面和指针位置都没有变化时, 直接复用该档位上次编码的结果
+            tracker = get_tile_tracker()
+            tracker.update(frame)
+        last = _LAST_SHOTS.get(tier)
+        if last is not None:
+            last_id, last_pos, last_data = last
+            mask = tracker.changed_since(last_id, frame.frame_id)
+            if last_pos == (px, py) and mask is not None and not mask.any():
+                count("reused", 1)
+                _remember_sent(frame)
+                return last_data
+
+        scale = tier.scale(screen.width, screen.height, _PIXELS_PER_TOKEN)
+        img = _render(
+            frame.bgra, px - screen.left, py - screen.top, scale, tier.grayscale
+        )
+        token.check()
+        data = _ENCODER.encode(img).data
+        if tier.name in _TIERS:
+            _LAST_SHOTS[tier] = (frame.frame_id, (px, py), data)
+        _remember_sent(frame)
+        return data
+
+
+# 差分截图的编码参数(WINCONTROL_DELTA_*或配置文件[encode.delta]节), 结果放在JSON中, 支持auto
+_DELTA_ENCODER = ImageEncoder(load_encoder_config("delta"))
+# 变化区域截图和整屏缩略图的token预算
+_DELTA_CROP_TOKENS = env_int("WINCONTROL_DELTA_CROP_TOKENS", 1024)
+_DELTA_THUMB_TOKENS = env_int("WINCONTROL_DELTA_THUMB_TOKENS", 64)
+# 像素变化阈值(灰度化后的差值), 变化区域外扩的边距
+_DELTA_THRESHOLD = env_int("WINCONTROL_DELTA_THRESHOLD", 4)
+_DELTA_MARGIN = env_int("WINCONTROL_DELTA_MARGIN", 16)
+# 变化区域超过屏幕面积的这一比例时直接返回默认档位的整屏截图
+_DELTA_MAX_AREA = env_float("WINCONTROL_DELTA_MAX_AREA", 0.5)
+
+
+def changed_bbox(
+    old: np.ndarray, new: np.ndarray, threshold: int, hint: np.ndarray | None, tile: int
+) -> tuple[int, int, int, int] | None:
+    """两帧BGRA之间变化像素的外接矩形(x0, y0, x1, y1), 没有变化时为None;
+    hint为tile变化掩码, 只在变化的tile范围内逐像素比较"""
+    height, width = new.shape[:2]
+    x0, y0, x1, y1 = 0, 0, width, height
+    if hint is not None:
+        rows, cols = np.nonzero(hint)
+        if len(rows) == 0:
+            return None
+        x0, y0 = int(cols.min()) * tile, int(rows.min()) * tile
+        x1 = min(width, (int(cols.max()) + 1) * tile)
+        y1 = min(height, (int(rows.max()) + 1) * tile)
+
+    diff = cv2.absdiff(old[y0:y1, x0:x1], new[y0:y1, x0:x1])
+    # 灰度化的是各通道差值的绝对值, 任一通道变化都会计入
+    diff = cv2.cvtColor(diff, cv2.COLOR_BGRA2GRAY)
+    _, mask = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    return x0 + x, y0 + y, x0 + x + w, y0 + y + h
+
+
+def _encoded_json(img: np.ndarray) -> dict:
+    encoded = _DELTA_ENCODER.encode(img)
+    return {
+        "mime_type": encoded.mime_type,
+        "width": int(img.shape[1]),
+        "height": int(img.shape[0]),
+        "data": base64.b64encode(encoded.data).decode("ascii"),
+    }
+
+
+def _delta_shot(token: CancelToken) -> dict:
+    """与上次发给模型的整屏截图相比的变化区域截图(原始精度)和整屏缩略图, 变化过大时返回整屏截图"""
+    with Screen() as screen:
+        with stage("capture"):
+            frame = latest_frame(newer_than=last_input_time())
+            px, py = Mouse().position
+            tracker = get_tile_tracker()
+            tracker.update(frame)
+
+        space = get_coordinate_space()
+        x, y = px - screen.left, py - screen.top
+        result = {"pointer": list(space.point_to_coord(px, py))}
+
+        bbox = None
+        sent = _SENT_FRAME
+        comparable = sent is not None and sent[1].shape == frame.bgra.shape
+        if comparable:
+            with stage("diff"):
+                bbox = changed_bbox(
+                    sent[1],
+                    frame.bgra,
+                    _DELTA_THRESHOLD,
+                    tracker.changed_since(sent[0], frame.frame_id),
+                    tracker.tile,
+                )
+            if bbox is not None:
+                margin = _DELTA_MARGIN
+                bbox = (
+                    max(0, bbox[0] - margin),
+                    max(0, bbox[1] - margin),
+                    min(screen.width, bbox[2] + margin),
+                    min(screen.height, bbox[3] + margin),
+                )
+                x0, y0, x1, y1 = bbox
+                area = (x1 - x0) * (y1 - y0) / (screen.width * screen.height)
+                comparable = area <= _DELTA_MAX_AREA
+
+        token.check()
+        if not comparable:
+            # 没有可比较的基准帧或变化过大, 返回默认档位的整屏截图
+            tier = _TIERS[_DEFAULT_TIER]
+            scale = tier.scale(screen.width, screen.height, _PIXELS_PER_TOKEN)
+            img = _render(frame.bgra, x, y, scale, tier.grayscale)
+            result.update(changed=True, full=True, image=_encoded_json(img))
+            _remember_sent(frame)
+            return result
+
+        result.update(changed=bbox is not None, full=False)
+        if bbox is not None:
+            x0, y0, x1, y1 = bbox
+            scale = budget_scale(
+                x1 - x0, y1 - y0, _DELTA_CROP_TOKENS, _PIXELS_PER_TOKEN
+            )
+            crop = _render(
+                frame.bgra[y0:y1, x0:x1], x - x0, y - y0, scale, buffer="delta_crop"
+            )
+            u0, v0 = space.point_to_coord(screen.left + x0, screen.top + y0)
+            u1, v1 = space.point_to_coord(screen.left + x1 - 1, screen.top + y1 - 1)
+            result.update(bbox=[u0, v0, u1, v1], crop=_encoded_json(crop))
+
+        # 整屏缩略图, 标出变化区域
+        scale = budget_scale(
+            screen.width, screen.height, _DELTA_THUMB_TOKENS, _PIXELS_PER_TOKEN
+        )
+        thumb = _render(frame.bgra, x, y, scale)
+        if bbox is not None:
+            cv2.rectangle(
+                thumb,
+                (math.floor(bbox[0] * scale), math.floor(bbox[1] * scale)),
+                (math.ceil(bbox[2] * scale) - 1, math.ceil(bbox[3] * scale) - 1),
+                (0, 0, 255),
+                1,
+            )
+        result["thumbnail"] = _encoded_json(thumb)
+        return result
+
+
+# 指纹的tile边长: tile越小越能察觉输入单个字符这类细小变化
+_FINGERPRINT_TILE = env_int("WINCONTROL_FINGERPRINT_TILE", 32)
+# 最近一次计算的指纹: (帧号, tile平均灰度)
+_LAST_FINGERPRINT = None
+
+
+def _fingerprint(token: CancelToken) -> dict:
+    """当前帧的感知指纹(每个tile的平均灰度)和指针位置, 不缩放也不编码截图"""
+    global _LAST_FINGERPRINT
+
+    with Screen() as screen:
+        with stage("capture"):
+            frame = latest_frame(newer_than=last_input_time())
+            px, py = Mouse().position
+            tracker = get_tile_tracker()
+            tracker.update(frame)
+
+        # 画面没有变化时沿用上次的指纹
+        means = None
+        if _LAST_FINGERPRINT is not None:
+            last_id, last_means = _LAST_FINGERPRINT
+            mask = tracker.changed_since(last_id, frame.frame_id)
+            if mask is not None and not mask.any():
+                count("reused", 1)
+                means = last_means
+        if means is None:
+            with stage("tile_means"):
+                means = tile_means(frame.bgra, _FINGERPRINT_TILE)
+        _LAST_FINGERPRINT = (frame.frame_id, means)
+
+        return {
+            "width": screen.width,
+            "height": screen.height,
+            "pointer": [px, py],
+            "tile": _FINGERPRINT_TILE,
+            "shape": list(means.shape),
+            "means": base64.b64encode(means.tobytes()).decode("ascii"),
+        }
+
+
+def register(mcp: FastMCP):
+    # 截图、差分和编码都在CPU线程池中执行, 不阻塞事件循环
+    @mcp.resource("screen://screenshot", mime_type=_ENCODER.config.mime_type)
+    async def screen_shot() -> bytes:
+        """获取当前屏幕截图(默认精度档位)"""
+        with get_profiler().trace("screen_shot"):
+            return await run_cpu(_screen_shot, _TIERS[_DEFAULT_TIER])
+
+    @mcp.resource("screen://screenshot/{tier}", mime_type=_ENCODER.config.mime_type)
+    async def screen_shot_tier(tier: str) -> bytes:
+        """按精度档位获取屏幕截图: glance(低分辨率灰度, 用于确认操作结果)/medium/full,
+        或者直接给出图像token预算"""
+        with get_profiler().trace("screen_shot"):
+            return await run_cpu(_screen_shot, resolve_tier(tier))
+
+    @mcp.resource("screen://fingerprint", mime_type="application/json")
+    async def screen_fingerprint() -> str:
+        """获取当前屏幕的感知指纹和指针位置, 用于判断画面与上一张截图相比是否变化"""
+        with get_profiler().trace("screen_fingerprint"):
+            return json.dumps(await run_cpu(_fingerprint))
 
-            success, img = cv2.imencode(".png", img_bgr)
-            if not success:
-                raise ValueError("imencode failed")
-            return img.tobytes()
+    @mcp.resource("screen://delta", mime_type="application/json")
+    async def screen_delta() -> str:
+        """获取与上次发给模型的整屏截图相比的变化区域截图(含归一化坐标)和整屏缩略图"""
+        with get_profiler().trace("screen_delta"):
+            return json.dumps(await run_cpu(_delta_shot))
@@ -0,0 +1,216 @@
+from dataclasses import dataclass, fields, replace
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from wincontrol_server.runtime.config import env_int, env_str, load_config_section
+from wincontrol_server.runtime.profiler import count, stage
+
+logger = logging.getLogger(__name__)
+
+# 格式 -> (扩展名, MIME类型, 质量参数)
+_FORMATS = {
+    "png": (".png", "image/png", cv2.IMWRITE_PNG_COMPRESSION),
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+@dataclass(frozen=True)
+class EncoderConfig:
+    """图像编码参数, format为auto时在字节预算内按画质从高到低选择第一个满足的编码"""
+
+    format: str = "png"
+    png_compression: int = 1  # 0-9, 越大越慢越小, 1为OpenCV默认值
+    jpeg_quality: int = 90
+    webp_quality: int = 90
+    max_bytes: int = 0  # auto的字节预算, 0为不限制(等同于png)
+    min_quality: int = 50  # auto降低有损画质的下限
+    auto_formats: tuple[str, ...] = ("webp", "jpeg")  # auto可选用的有损格式
+
+    def __post_init__(self):
+        if self.format != "auto" and self.format not in _FORMATS:
+            raise ValueError(f"Invalid image format: {self.format}")
+        if not 0 <= self.png_compression <= 9:
+            raise ValueError("png_compression must be in [0, 9]")
+        for name in ("jpeg_quality", "webp_quality", "min_quality"):
+            if not 1 <= getattr(self, name) <= 100:
+                raise ValueError(f"{name} must be in [1, 100]")
+        if self.max_bytes < 0:
+            raise ValueError("max_bytes must be >= 0")
+        for fmt in self.auto_formats:
+            if fmt not in ("jpeg", "webp"):
+                raise ValueError(f"Invalid lossy format for auto: {fmt}")
+
+    @property
+    def mime_type(self) -> str | None:
+        """固定格式的MIME类型, auto时每次编码结果可能不同, 返回None"""
+        if self.format == "auto":
+            return None
+        return _FORMATS[self.format][1]
+
+
+@dataclass(frozen=True)
+class Encoded:
+    """一次编码的结果"""
+
+    data: bytes
+    format: str
+    quality: int
+    encode_ms: float  # 包含auto尝试的所有候选的总耗时
+    attempts: int = 1
+
+    @property
+    def mime_type(self) -> str:
+        return _FORMATS[self.format][1]
+
+
+# auto在大图上先编码缩小的探测图估计各候选的体积, 跳过注定超出预算的候选;
+# 缩小后细节更密集, 实际体积不低于按面积放大的探测体积乘以这一比例
+# (合成界面和录制的桌面帧上, 长宽缩小4倍时实测为0.22~0.6)
+_PROBE_SCALE = 4
+_PROBE_MIN_RATIO = 0.2
+_PROBE_MIN_PIXELS = 512 * 512
+
+
+def _encode_once(img: np.ndarray, fmt: str, quality: int) -> bytes:
+    ext, _, param = _FORMATS[fmt]
+    success, buf = cv2.imencode(ext, img, [param, quality])
+    if not success:
+        raise ValueError(f"imencode failed for {fmt}")
+    return buf.tobytes()
+
+
+class ImageEncoder:
+    """按配置编码图像, 每次编码的格式、耗时和字节数计入当前分析调用"""
+
+    def __init__(self, config: EncoderConfig):
+        self.config = config
+        self._ladder = self._build_ladder(config)
+        # auto下次开始尝试的候选序号, 避免每次都先编码注定超出预算的高画质候选
+        self._start = 0
+
+    @staticmethod
+    def _build_ladder(config: EncoderConfig) -> list[tuple[str, int]]:
+        """auto的候选列表: 先无损PNG, 再按画质从高到低(每级降10)的有损格式"""
+        qualities = {"jpeg": config.jpeg_quality, "webp": config.webp_quality}
+        lossy = []
+        for order, fmt in enumerate(config.auto_formats):
+            top = qualities[fmt]
+            for q in range(top, min(top, config.min_quality) - 1, -10):
+                lossy.append((-q, order, fmt, q))
+        return [("png", config.png_compression)] + [
+            (fmt, q) for _, _, fmt, q in sorted(lossy)
+        ]
+
+    def _quality(self, fmt: str) -> int:
+        if fmt == "png":
+            return self.config.png_compression
+        return getattr(self.config, f"{fmt}_quality")
+
+    def encode(self, img: np.ndarray) -> Encoded:
+        with stage("image_encode"):
+            start = time.perf_counter()
+            if self.config.format != "auto":
+                fmt = self.config.format
+                quality = self._quality(fmt)
+                data, attempts = _encode_once(img, fmt, quality), 1
+            else:
+                fmt, quality, data, attempts = self._encode_auto(img)
+            encode_ms = (time.perf_counter() - start) * 1000
+
+        count("image_bytes", len(data))
+        count("encode_attempts", attempts)
+        logger.debug(
+            "encoded %dx%d as %s q=%d: %d bytes in %.1f ms (%d attempts)",
+            img.shape[1],
+            img.shape[0],
+            fmt,
+            quality,
+            len(data),
+            encode_ms,
+            attempts,
+        )
+        return Encoded(data, fmt, quality, encode_ms, attempts)
+
+    def _encode_auto(self, img: np.ndarray) -> tuple[str, int, bytes, int]:
+        budget = self.config.max_bytes
+        ladder = self._ladder
+        if budget == 0:
+            fmt, quality = ladder[0]
+            return fmt, quality, _encode_once(img, fmt, quality), 1
+
+        probe = None
+        if img.shape[0] * img.shape[1] >= _PROBE_MIN_PIXELS:
+            size = (img.shape[1] // _PROBE_SCALE, img.shape[0] // _PROBE_SCALE)
+            probe = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+            probe_factor = img.size / probe.size * _PROBE_MIN_RATIO
+
+        smallest = None
+        attempts = 0
+        for i in range(self._start, len(ladder)):
+            fmt, quality = ladder[i]
+            if probe is not None and i < len(ladder) - 1:
+                # 体积下限的估计已超出预算, 不再编码原图
+                estimate = len(_encode_once(probe, fmt, quality)) * probe_factor
+                count("encode_probes", 1)
+                if estimate > budget:
+                    continue
+            data = _encode_once(img, fmt, quality)
+            attempts += 1
+            if len(data) <= budget:
+                # 远低于预算时下次从上一级开始, 画面变简单后可以回到更高画质
+                self._start = i - 1 if i > 0 and len(data) < budget // 2 else i
+                return fmt, quality, data, attempts
+            if smallest is None or len(data) < len(smallest[2]):
+                smallest = (fmt, quality, data)
+        # 全部超出预算时返回最小的结果(最后一个候选总会编码)
+        self._start = len(ladder) - 1
+        return (*smallest, attempts)
+
+
+# 环境变量后缀 -> (配置项, 读取函数)
+_ENV_SUFFIXES = {
+    "FORMAT": ("format", env_str),
+    "PNG_COMPRESSION": ("png_compression", env_int),
+    "JPEG_QUALITY": ("jpeg_quality", env_int),
+    "WEBP_QUALITY": ("webp_quality", env_int),
+    "MAX_BYTES": ("max_bytes", env_int),
+    "MIN_QUALITY": ("min_quality", env_int),
+    "AUTO_FORMATS": ("auto_formats", env_str),
+}
+
+
+def load_encoder_config(target: str, **defaults) -> EncoderConfig:
+    """读取某个输出(screenshot/parser)的编码参数, 优先级: 环境变量WINCONTROL_<TARGET>_* >
+    配置文件[encode.<target>]节 > [encode]节 > defaults"""
+    section = dict(load_config_section("encode"))
+    specific = section.pop(target, {})
+    if not isinstance(specific, dict):
+        raise ValueError(f"Invalid config section [encode.{target}]")
+    # 去掉其他输出的子表
+    section = {k: v for k, v in section.items() if not isinstance(v, dict)}
+    overrides = {**defaults, **section, **specific}
+
+    names = {f.name for f in fields(EncoderConfig)}
+    unknown = set(overrides) - names
+    if unknown:
+        raise ValueError(f"Unknown encode config keys: {sorted(unknown)}")
+
+    prefix = f"WINCONTROL_{target.upper()}_"
+    for suffix, (name, read) in _ENV_SUFFIXES.items():
+        if os.environ.get(prefix + suffix, "").strip():
+            overrides[name] = read(prefix + suffix, None)
+
+    formats = overrides.get("auto_formats")
+    if isinstance(formats, str):
+        overrides["auto_formats"] = tuple(
+            f.strip() for f in formats.split(",") if f.strip()
+        )
+    elif formats is not None:
+        overrides["auto_formats"] = tuple(formats)
+
+    return replace(EncoderConfig(), **overrides)
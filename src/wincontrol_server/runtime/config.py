@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+import tomllib
+
+
+def env_str(name: str, default: str) -> str:
+    """读取字符串环境变量"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """读取布尔环境变量(1/true/yes/on为真)"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数环境变量"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid integer for {name}: {value}")
+
+
+def env_float(name: str, default: float) -> float:
+    """读取浮点数环境变量"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Invalid float for {name}: {value}")
+
+
+def config_path() -> Path:
+    """配置文件路径, 可通过环境变量WINCONTROL_CONFIG指定, 默认为~/.wincontrol/config.toml"""
+    path = os.environ.get("WINCONTROL_CONFIG")
+    if path:
+        return Path(path)
+    return Path.home() / ".wincontrol" / "config.toml"
+
+
+def load_config_section(section: str) -> dict:
+    """读取配置文件中的一节, 文件或该节不存在时返回空字典"""
+    path = config_path()
+    if not path.is_file():
+        return {}
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+    value = config.get(section, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"Invalid config section [{section}] in {path}")
+    return value
+
+
+def cache_dir() -> Path:
+    """缓存目录, 可通过环境变量WINCONTROL_CACHE_DIR指定"""
+    path = os.environ.get("WINCONTROL_CACHE_DIR")
+    if path:
+        return Path(path)
+    local_app_data = os.environ.get("LOCALAPPDATA")
+    if local_app_data:
+        return Path(local_app_data) / "wincontrol" / "cache"
+    return Path.home() / ".cache" / "wincontrol"
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+import contextvars
+import os
+import threading
+from typing import Callable, TypeVar
+
+from wincontrol_server.runtime.config import env_int
+
+T = TypeVar("T")
+
+
+class Cancelled(Exception):
+    """工作线程中的任务已被调用方取消"""
+
+
+class CancelToken:
+    """跨线程的取消标记, 工作函数在检查点调用check(), 等待时用sleep()代替time.sleep()"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """已取消时抛出Cancelled"""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def sleep(self, seconds: float) -> None:
+        """可被取消打断的等待, 取消时抛出Cancelled"""
+        if self._event.wait(seconds):
+            raise Cancelled()
+
+
+# 截图、推理、编码等CPU密集任务的线程池(numpy/OpenCV/ONNX Runtime计算时释放GIL)
+_CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=env_int("WINCONTROL_CPU_WORKERS", min(4, os.cpu_count() or 1)),
+    thread_name_prefix="wincontrol-cpu",
+)
+# 键鼠输入必须按调用顺序执行, 全部交给同一个设备线程
+_DEVICE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="wincontrol-device"
+)
+
+
+async def _run(executor: Executor, fn: Callable[..., T], *args) -> T:
+    """在线程池中执行fn(token, *args), 协程被取消时通过token通知工作函数中止"""
+    token = CancelToken()
+    # 复制上下文, 工作线程中的profiler阶段计入当前调用
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, context.run, fn, token, *args)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+
+
+async def run_cpu(fn: Callable[..., T], *args) -> T:
+    """在CPU线程池中执行fn(token, *args)"""
+    return await _run(_CPU_EXECUTOR, fn, *args)
+
+
+async def run_device(fn: Callable[..., T], *args) -> T:
+    """在设备线程中执行fn(token, *args)"""
+    return await _run(_DEVICE_EXECUTOR, fn, *args)
@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import Future
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoader(Generic[T]):
+    """在后台线程中构造耗时对象, 调用方按需同步等待或异步等待其就绪"""
+
+    def __init__(self, factory: Callable[[], T], name: str = "loader"):
+        self._factory = factory
+        self._name = name
+        self._future = Future()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        """启动后台加载, 重复调用无效果"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            # 标记为运行中, 异步等待方被取消时不会连带取消加载
+            self._future.set_running_or_notify_cancel()
+        threading.Thread(target=self._run, name=self._name, daemon=True).start()
+
+    def _run(self):
+        try:
+            self._future.set_result(self._factory())
+        except BaseException as e:
+            self._future.set_exception(e)
+
+    @property
+    def ready(self) -> bool:
+        """是否已加载完成(包括加载失败)"""
+        return self._future.done()
+
+    def get(self, timeout: float | None = None) -> T:
+        """阻塞等待加载完成并返回对象, 尚未启动时先启动, 加载失败时抛出原异常"""
+        self.start()
+        return self._future.result(timeout)
+
+    async def wait(self) -> T:
+        """异步等待加载完成, 等待期间不阻塞事件循环"""
+        self.start()
+        return await asyncio.wrap_future(self._future)
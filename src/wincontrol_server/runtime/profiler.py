@@ -0,0 +1,202 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from wincontrol_server.runtime.config import env_bool, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+
+class _NullStage:
+    """关闭分析时使用的空计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """阶段计时器, 退出时把耗时累加到所属的调用记录"""
+
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: "Trace", name: str):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = (time.perf_counter() - self._start) * 1000
+        stages = self._trace.stages
+        stages[self._name] = stages.get(self._name, 0.0) + elapsed
+        return False
+
+
+class Trace:
+    """一次调用的分阶段耗时(ms)和计数"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.timestamp = time.time()
+        self.total_ms = 0.0
+        self.stages = {}
+        self.counters = {}
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "total_ms": self.total_ms,
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+
+_CURRENT = ContextVar("wincontrol_trace", default=None)
+
+
+class Profiler:
+    """轻量级分阶段分析器, 关闭时trace/stage/count几乎没有开销"""
+
+    def __init__(self, enabled: bool = False, path: str = "", history: int = 256):
+        self.enabled = enabled
+        self._path = path
+        self._history = history
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        # 调用名 -> {"calls": 次数, "total": 耗时队列, "stages": {阶段名: 耗时队列}}
+        self._summary = {}
+        # 名称 -> 返回当前状态的函数(工作进程池的排队深度等), 查询统计时调用
+        self._gauges = {}
+
+    @contextmanager
+    def trace(self, name: str):
+        """记录一次调用, 期间的stage/count都归入该调用"""
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name)
+        token = _CURRENT.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.total_ms = (time.perf_counter() - start) * 1000
+            _CURRENT.reset(token)
+            self._record(trace)
+
+    def _record(self, trace: Trace):
+        with self._lock:
+            self._recent.append(trace)
+            summary = self._summary.setdefault(
+                trace.name,
+                {"calls": 0, "total": deque(maxlen=self._history), "stages": {}},
+            )
+            summary["calls"] += 1
+            summary["total"].append(trace.total_ms)
+            for name, ms in trace.stages.items():
+                summary["stages"].setdefault(
+                    name, deque(maxlen=self._history)
+                ).append(ms)
+
+        if self._path:
+            try:
+                with open(self._path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning("failed to write profile record: %s", e)
+
+    def register_gauge(self, name: str, fn: Callable[[], dict]) -> None:
+        """注册一个状态量, 无论是否开启分析都会出现在统计中"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def stats(self, recent: int = 10) -> dict:
+        """各调用和阶段耗时的统计(最近history次的p50/p95/max), 以及最近几次调用的明细"""
+
+        def describe(samples) -> dict:
+            values = np.fromiter(samples, dtype=np.float64)
+            return {
+                "samples": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max()),
+            }
+
+        with self._lock:
+            calls = {
+                name: {
+                    "calls": summary["calls"],
+                    "total": describe(summary["total"]),
+                    "stages": {
+                        stage: describe(samples)
+                        for stage, samples in summary["stages"].items()
+                    },
+                }
+                for name, summary in self._summary.items()
+            }
+            last = [trace.to_dict() for trace in list(self._recent)[-recent:]]
+            gauges = dict(self._gauges)
+        return {
+            "enabled": self.enabled,
+            "calls": calls,
+            "recent": last,
+            "gauges": {name: fn() for name, fn in gauges.items()},
+        }
+
+
+def stage(name: str):
+    """当前调用中的一个计时阶段, 不在调用中或分析关闭时为空操作"""
+    trace = _CURRENT.get()
+    if trace is None:
+        return _NULL_STAGE
+    return trace.stage(name)
+
+
+def count(name: str, value: int | float):
+    """累加当前调用的计数(框数量、字节数等), 批量解析时各张图的计数相加"""
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + value
+
+
+def merge(stages: dict, counters: dict):
+    """把其他进程中记录的阶段耗时和计数并入当前调用"""
+    trace = _CURRENT.get()
+    if trace is not None:
+        for name, ms in stages.items():
+            trace.stages[name] = trace.stages.get(name, 0.0) + ms
+        for name, value in counters.items():
+            trace.counters[name] = trace.counters.get(name, 0) + value
+
+
+# 设置了WINCONTROL_PROFILE_FILE时默认开启分析, 每次调用追加一行JSON
+_PROFILE_FILE = env_str("WINCONTROL_PROFILE_FILE", "")
+_PROFILER = Profiler(
+    enabled=env_bool("WINCONTROL_PROFILE", bool(_PROFILE_FILE)),
+    path=_PROFILE_FILE,
+    history=env_int("WINCONTROL_PROFILE_HISTORY", 256),
+)
+
+
+def get_profiler() -> Profiler:
+    return _PROFILER
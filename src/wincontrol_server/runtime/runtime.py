@@ -1,45 +1,73 @@
-from wincontrol_server.devices.screen import Screen
+from dataclasses import dataclass
+from functools import lru_cache
 
+import numpy as np
 
-def coord_to_screen(screen: Screen, u: int, v: int) -> tuple[int, int]:
-    """将归一化坐标(x轴统一为1到1000)转换为屏幕坐标"""
-    screen_w = screen.width
-    screen_h = screen.height
-    screen_left = screen.left
-    screen_top = screen.top
+from wincontrol_server.devices.screen import ScreenGeometry, get_screen_service
 
-    U_MAX = 1000
-    V_MAX = int(1000 / screen_w * screen_h)
+U_MAX = 1000
 
-    u = max(1, min(u, U_MAX))
-    v = max(1, min(v, V_MAX))
 
-    x = int(u / U_MAX * screen_w)
-    y = int(v / V_MAX * screen_h)
+@dataclass(frozen=True)
+class CoordinateSpace:
+    """归一化坐标(x轴统一为1到1000)与屏幕坐标的换算, 支持整组点一次换算"""
 
-    x_real = max(screen_left, min(screen_left + x, screen_left + screen_w - 1))
-    y_real = max(screen_top, min(screen_top + y, screen_top + screen_h - 1))
+    left: int
+    top: int
+    width: int
+    height: int
 
-    return (x_real, y_real)
+    @property
+    def u_max(self) -> int:
+        return U_MAX
 
+    @property
+    def v_max(self) -> int:
+        return int(U_MAX / self.width * self.height)
 
-def screen_to_coord(screen: Screen, x: int, y: int) -> tuple[int, int]:
-    """将屏幕坐标转换为归一化坐标(x轴统一为1到1000)"""
-    screen_w = screen.width
-    screen_h = screen.height
-    screen_left = screen.left
-    screen_top = screen.top
+    @classmethod
+    def from_geometry(cls, geometry: ScreenGeometry) -> "CoordinateSpace":
+        return cls(geometry.left, geometry.top, geometry.width, geometry.height)
 
-    U_MAX = 1000
-    V_MAX = int(1000 / screen_w * screen_h)
+    def to_screen(self, u, v) -> tuple[np.ndarray, np.ndarray]:
+        """将归一化坐标转换为屏幕坐标, u/v可以是标量或数组"""
+        v_max = self.v_max
+        u = np.clip(u, 1, U_MAX)
+        v = np.clip(v, 1, v_max)
 
-    x = x - screen_left
-    y = y - screen_top
+        x = np.floor(u / U_MAX * self.width).astype(np.int64)
+        y = np.floor(v / v_max * self.height).astype(np.int64)
 
-    x = max(0, min(x, screen_w - 1))
-    y = max(0, min(y, screen_h - 1))
+        x = np.clip(self.left + x, self.left, self.left + self.width - 1)
+        y = np.clip(self.top + y, self.top, self.top + self.height - 1)
+        return x, y
 
-    u = int(x / (screen_w - 1) * U_MAX)
-    v = int(y / (screen_h - 1) * V_MAX)
+    def to_coord(self, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """将屏幕坐标转换为归一化坐标, x/y可以是标量或数组"""
+        x = np.clip(np.asarray(x) - self.left, 0, self.width - 1)
+        y = np.clip(np.asarray(y) - self.top, 0, self.height - 1)
+
+        u = np.floor(x / (self.width - 1) * U_MAX).astype(np.int64)
+        v = np.floor(y / (self.height - 1) * self.v_max).astype(np.int64)
+        return np.maximum(1, u), np.maximum(1, v)
+
+    def point_to_screen(self, u: int, v: int) -> tuple[int, int]:
+        """单个点的归一化坐标转换为屏幕坐标"""
+        x, y = self.to_screen(u, v)
+        return int(x), int(y)
+
+    def point_to_coord(self, x: int, y: int) -> tuple[int, int]:
+        """单个点的屏幕坐标转换为归一化坐标"""
+        u, v = self.to_coord(x, y)
+        return int(u), int(v)
+
+
+@lru_cache(maxsize=8)
+def _coordinate_space(geometry: ScreenGeometry) -> CoordinateSpace:
+    return CoordinateSpace.from_geometry(geometry)
+
+
+def get_coordinate_space() -> CoordinateSpace:
+    """当前主显示器的坐标换算, 随截图服务缓存的几何信息更新"""
+    return _coordinate_space(get_screen_service().geometry)
 
-    return (max(1, u), max(1, v))
@@ -2,8 +2,9 @@ import ctypes
 
 from mcp.server.fastmcp import FastMCP
 
+from wincontrol_server.devices.grabber import get_frame_grabber
 from wincontrol_server.prompts import prompts
-from wincontrol_server.resources import screen_resources
+from wincontrol_server.resources import profile_resources, screen_resources
 from wincontrol_server.tools import mouse_tools
 from wincontrol_server.tools import keyboard_tools
 from wincontrol_server.tools import screen_tools
@@ -30,11 +31,15 @@ def enable_dpi_awareness():
 
 def main():
     enable_dpi_awareness()
+    # 开启后台截图时提前启动截图线程(需在DPI感知设置之后)
+    get_frame_grabber()
+    screen_tools.load_model_in_background()
 
     mcp = FastMCP("wincontrol", json_response=True)
 
     prompts.register(mcp)
     screen_resources.register(mcp)
+    profile_resources.register(mcp)
     mouse_tools.register(mcp)
     keyboard_tools.register(mcp)
     screen_tools.register(mcp)
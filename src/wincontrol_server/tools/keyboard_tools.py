@@ -1,10 +1,11 @@
 from enum import StrEnum
-import time
 
 from mcp.server.fastmcp import FastMCP
 from mcp.types import TextContent
 
+from wincontrol_server.devices.grabber import mark_input
 from wincontrol_server.devices.keyboard import Keyboard
+from wincontrol_server.runtime.executors import CancelToken, run_device
 
 
 class SpecialKey(StrEnum):
@@ -40,13 +41,42 @@ class ShortcutKey(StrEnum):
     CTRL_Z = "ctrl+z"
 
 
+def _type_str(token: CancelToken, text: str) -> None:
+    try:
+        Keyboard().type_str(text)
+    finally:
+        mark_input()
+
+
+def _tap(token: CancelToken, key: str) -> None:
+    try:
+        Keyboard().tap(key)
+    finally:
+        mark_input()
+
+
+def _tap_shortcut(token: CancelToken, keys: list[str]) -> None:
+    """依次按下组合键再全部松开, 被取消时也会松开已按下的键"""
+    kb = Keyboard()
+    pressed = []
+    try:
+        for key in keys:
+            kb.press(key)
+            pressed.append(key)
+
+        token.sleep(0.05)
+    finally:
+        for key in pressed:
+            kb.release(key)
+        mark_input()
+
+
 def register(mcp: FastMCP):
     @mcp.tool()
-    def type_str(text: str) -> dict:
+    async def type_str(text: str) -> dict:
         """在当前鼠标焦点的输入框中输入一段文本(中文/英文/数字)"""
-        kb = Keyboard()
         try:
-            kb.type_str(text)
+            await run_device(_type_str, text)
             return TextContent(
                 type="text",
                 text=f"typed: {text}",
@@ -58,11 +88,10 @@ def register(mcp: FastMCP):
             )
 
     @mcp.tool()
-    def tap_special_key(key: SpecialKey) -> dict:
+    async def tap_special_key(key: SpecialKey) -> dict:
         """敲击指定的单个特殊按键"""
-        kb = Keyboard()
         try:
-            kb.tap(key)
+            await run_device(_tap, key)
             return TextContent(
                 type="text",
                 text=f"pressed: {key}",
@@ -74,16 +103,15 @@ def register(mcp: FastMCP):
             )
 
     @mcp.tool()
-    def tap_normal_key(key: str) -> dict:
+    async def tap_normal_key(key: str) -> dict:
         """敲击指定的单个普通按键"""
         if len(key) != 1:
             return TextContent(
                 type="text",
                 text=f"error: {key} is not a normal key",
             )
-        kb = Keyboard()
         try:
-            kb.tap(key)
+            await run_device(_tap, key)
             return TextContent(
                 type="text",
                 text=f"pressed: {key}",
@@ -95,18 +123,10 @@ def register(mcp: FastMCP):
             )
 
     @mcp.tool()
-    def tap_shortcut(shortcut: ShortcutKey) -> dict:
+    async def tap_shortcut(shortcut: ShortcutKey) -> dict:
         """敲击指定的快捷键"""
-        kb = Keyboard()
-        keys = shortcut.split("+")
         try:
-            for key in keys:
-                kb.press(key)
-
-            time.sleep(0.05)
-
-            for key in keys:
-                kb.release(key)
+            await run_device(_tap_shortcut, shortcut.split("+"))
         except Exception as e:
             return TextContent(
                 type="text",
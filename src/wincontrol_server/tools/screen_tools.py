@@ -1,17 +1,32 @@
 import base64
-from dataclasses import dataclass
+from collections import OrderedDict
 from enum import StrEnum
+from functools import partial
+import hashlib
 import json
 from pathlib import Path
+import threading
 
-import cv2
 from mcp.server.fastmcp import FastMCP
 from mcp.types import ImageContent, TextContent
 import numpy as np
-import onnxruntime as ort
 
-from wincontrol_server.devices.screen import Screen
-from wincontrol_server.runtime.runtime import screen_to_coord
+from wincontrol_server.devices.grabber import last_input_time, latest_frame
+from wincontrol_server.devices.screen import Frame, Screen, bgra_to_bgr
+from wincontrol_server.devices.tiles import get_tile_tracker
+from wincontrol_server.parser.batcher import MicroBatcher
+from wincontrol_server.parser.omini import PIPELINES, Omini, ParsedResult
+from wincontrol_server.parser.quantize import MODEL_VARIANTS, variant_path
+from wincontrol_server.parser.worker_pool import OminiPool
+from wincontrol_server.runtime.codec import (
+    Encoded,
+    ImageEncoder,
+    load_encoder_config,
+)
+from wincontrol_server.runtime.config import env_float, env_int, env_str
+from wincontrol_server.runtime.executors import CancelToken, run_cpu
+from wincontrol_server.runtime.loader import BackgroundLoader
+from wincontrol_server.runtime.profiler import count, get_profiler, stage
 
 
 class Region(StrEnum):
@@ -28,318 +43,341 @@ class Region(StrEnum):
     RIGHT_DOWN = "right_down"
 
 
-@dataclass
-class ParsedResult:
-    """解析结果"""
-
-    parsed_img: np.ndarray
-    boxes: dict[int, tuple[int, int]]
-
-
-class Omini:
-    """GUI Parser"""
-
-    def __init__(
-        self,
-        model_path: str,
-        conf: float = 0.05,
-        iou: float = 0.1,
-        overlap: float = 0.3,
-    ):
-        self._conf = conf
-        self._iou = iou
-        self._overlap = overlap
-
-        self._session = ort.InferenceSession(
-            model_path, providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
-        )
-
-        input_data = self._session.get_inputs()[0]
-        self._input_name = input_data.name
-        self._input_l = input_data.shape[2]
-
-    def parse(self, left: int, top: int, img: np.ndarray) -> ParsedResult:
-        """解析GUI, 形参为解析区域起始坐标和BGR numpy数组"""
-        img_h = img.shape[0]
-        img_w = img.shape[1]
-
-        proc_img, ratio, (region_left, region_top) = self._preprocess(img)
-        outputs = self._session.run(None, {self._input_name: proc_img})[0][
-            0
-        ].T  # outputs每一行是一个检测框
-        boxes_raw = outputs[:, :4]  # [cx, cy, w, h]
-        scores = outputs[:, 4]  # 置信度
-
-        # 1. 过滤置信度
-        idx = scores > self._conf
-        if not idx.any():
-            return img  # 没有检测到任何框, 直接返回原图
-        boxes_raw, scores = boxes_raw[idx], scores[idx]
-
-        # 2. 过滤IOU
-        idx = self._nms(boxes_raw, scores)
-        boxes_raw, scores = boxes_raw[idx], scores[idx]
-
-        # 3. 过滤重叠框
-        idx = self._overlap_nms(boxes_raw)
-        boxes_raw, scores = boxes_raw[idx], scores[idx]
-
-        # 4. 坐标还原
-        boxes = np.stack(
-            [
-                (boxes_raw[:, 0] - boxes_raw[:, 2] / 2 - region_left) / ratio,
-                (boxes_raw[:, 1] - boxes_raw[:, 3] / 2 - region_top) / ratio,
-                (boxes_raw[:, 0] + boxes_raw[:, 2] / 2 - region_left) / ratio,
-                (boxes_raw[:, 1] + boxes_raw[:, 3] / 2 - region_top) / ratio,
-            ],
-            axis=1,
+class ParseCache:
+    """按区域像素内容寻址的解析结果LRU缓存, 同时限制条目数和内存占用"""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 128 * 1024 * 1024):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        img: np.ndarray,
+        left: int,
+        top: int,
+        screen_size: tuple[int, int],
+        settings: tuple,
+    ) -> tuple:
+        """缓存键: 区域像素哈希 + 区域位置 + 屏幕尺寸 + 解析参数"""
+        digest = hashlib.blake2b(np.ascontiguousarray(img), digest_size=16).digest()
+        return (digest, left, top, screen_size, settings)
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: tuple) -> tuple[ParsedResult, Encoded | None] | None:
+        """查询缓存, 返回(解析结果, 编码后的图像), 图像尚未编码时为None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: tuple, result: ParsedResult, encoded: Encoded | None) -> None:
+        """写入缓存, 超出条目数或内存上限时淘汰最久未使用的条目"""
+        result.parsed_img.flags.writeable = False
+        size = result.parsed_img.nbytes + (
+            len(encoded.data) if encoded is not None else 0
         )
-
-        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, img_w)
-        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, img_h)
-
-        # 5. 过滤极小框
-        # 计算每个框的宽度和高度
-        widths = boxes[:, 2] - boxes[:, 0]
-        heights = boxes[:, 3] - boxes[:, 1]
-
-        # 过滤条件：宽度和高度必须都大于 10 像素
-        keep = (widths > 10) & (heights > 10)
-        boxes = boxes[keep]
-
-        # 6. 画框
-        drawed_img = self._draw(img, boxes)
-
-        # 7. 构造归一化坐标结果
-        boxes_center = np.round((boxes[:, :2] + boxes[:, 2:]) / 2).astype(int)
-        boxes_center[:, 0] += left
-        boxes_center[:, 1] += top
-
-        with Screen() as screen:
-            boxes_map = {
-                i: screen_to_coord(screen, x, y)
-                for i, (x, y) in enumerate(boxes_center)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (result, encoded, size)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
             }
 
-        return ParsedResult(drawed_img, boxes_map)
 
-    def _preprocess(
-        self, image: np.ndarray
-    ) -> tuple[np.ndarray, float, tuple[int, int]]:
-        """预处理图像, 返回RGB numpy数组"""
-        img_h = image.shape[0]
-        img_w = image.shape[1]
+_SCRIPT_DIR = Path(__file__).parent
 
-        ratio = self._input_l / max(img_w, img_h)
-        if img_w > img_h:
-            new_w = self._input_l
-            new_h = round(img_h * ratio)
-        else:
-            new_w = round(img_w * ratio)
-            new_h = self._input_l
-        resized = cv2.resize(image, (new_w, new_h))
-
-        pad_w = (self._input_l - new_w) / 2
-        pad_h = (self._input_l - new_h) / 2
-
-        top = int(np.floor(pad_h))
-        bottom = int(np.ceil(pad_h))
-        left = int(np.floor(pad_w))
-        right = int(np.ceil(pad_w))
-
-        padded = cv2.copyMakeBorder(
-            resized,
-            top,
-            bottom,
-            left,
-            right,
-            cv2.BORDER_CONSTANT,
-            value=(114, 114, 114),
+# 解析后端: thread为在主进程的CPU线程池中推理, process为在独立的工作进程中推理,
+# 推理和画框不占用主进程的GIL
+_PARSE_BACKEND = env_str("WINCONTROL_PARSE_BACKEND", "thread")
+if _PARSE_BACKEND not in ("thread", "process"):
+    raise ValueError(f"Invalid WINCONTROL_PARSE_BACKEND: {_PARSE_BACKEND}")
+
+# 模型变体: fp32为omini.onnx, int8/fp16为同目录下由parser.quantize生成的omini.int8.onnx等
+_MODEL_VARIANT = env_str("WINCONTROL_MODEL_VARIANT", "fp32")
+if _MODEL_VARIANT not in MODEL_VARIANTS:
+    raise ValueError(f"Invalid WINCONTROL_MODEL_VARIANT: {_MODEL_VARIANT}")
+
+# 解析流水线: classic为numpy预处理和NMS, fused为加载图中包含预处理和NMS的融合模型
+# (首次使用时由omini.onnx构建并缓存, 需要onnx包)
+_PARSE_PIPELINE = env_str("WINCONTROL_PARSE_PIPELINE", "classic")
+if _PARSE_PIPELINE not in PIPELINES:
+    raise ValueError(f"Invalid WINCONTROL_PARSE_PIPELINE: {_PARSE_PIPELINE}")
+
+# 并发的单区域解析请求合并为一次batch推理, 批大小上限为1时关闭; 窗口默认为0,
+# 只合并上一批推理期间排队的请求, 单个请求不增加延迟
+_BATCH_MAX = env_int("WINCONTROL_PARSE_BATCH_MAX", 8)
+_BATCH_WINDOW_MS = env_float("WINCONTROL_PARSE_BATCH_WINDOW_MS", 0.0)
+
+
+def _load_omini() -> MicroBatcher:
+    model_path = variant_path(str(_SCRIPT_DIR / "omini.onnx"), _MODEL_VARIANT)
+    if not model_path.is_file():
+        raise ValueError(
+            f"Model variant {_MODEL_VARIANT} not found: {model_path}, build it with "
+            f"python -m wincontrol_server.parser.quantize omini.onnx {_MODEL_VARIANT}"
         )
-
-        proc_img = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-        proc_img = proc_img.transpose(2, 0, 1)[np.newaxis]
-        return np.ascontiguousarray(proc_img), ratio, (left, top)
-
-    def _nms(self, boxes_raw: np.ndarray, scores: np.ndarray) -> np.ndarray:
-        """去重, 返回保留框的索引"""
-        x1 = boxes_raw[:, 0] - (boxes_raw[:, 2] / 2)
-        y1 = boxes_raw[:, 1] - (boxes_raw[:, 3] / 2)
-        x2 = boxes_raw[:, 0] + (boxes_raw[:, 2] / 2)
-        y2 = boxes_raw[:, 1] + (boxes_raw[:, 3] / 2)
-
-        areas = (x2 - x1) * (y2 - y1)
-        order = scores.argsort()[::-1]
-        keep = []
-
-        while order.size > 0:
-            i = order[0]
-            keep.append(i)
-            if order.size == 1:
-                break
-
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
-            iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-6)
-            order = order[np.where(iou <= self._iou)[0] + 1]
-
-        return np.array(keep, dtype=np.int64)
-
-    def _overlap_nms(self, boxes_raw: np.ndarray) -> np.ndarray:
-        """过滤重叠框: 当大框包小框（交集占小框比例超阈值）时，去掉大框，保留小框。返回保留框的索引"""
-        if len(boxes_raw) == 0:
-            return np.array([], dtype=np.int64)
-
-        x1 = boxes_raw[:, 0] - boxes_raw[:, 2] / 2
-        y1 = boxes_raw[:, 1] - boxes_raw[:, 3] / 2
-        x2 = boxes_raw[:, 0] + boxes_raw[:, 2] / 2
-        y2 = boxes_raw[:, 1] + boxes_raw[:, 3] / 2
-        areas = (x2 - x1) * (y2 - y1)
-
-        order = areas.argsort()
-        keep = []
-
-        while order.size > 0:
-            i = order[0]
-            keep.append(i)
-
-            if order.size == 1:
-                break
-
-            # 计算当前最小框，与剩余所有的框的交集坐标
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            # 计算交集面积
-            w = np.maximum(0, xx2 - xx1)
-            h = np.maximum(0, yy2 - yy1)
-            inter = w * h
-
-            iom = inter / (areas[i] + 1e-6)
-
-            inds = np.where(iom <= self._overlap)[0]
-
-            order = order[inds + 1]
-
-        return np.array(keep, dtype=np.int64)
-
-    def _draw(self, img: np.ndarray, boxes: np.ndarray) -> np.ndarray:
-        for i, box in enumerate(boxes):
-            x1, y1, x2, y2 = box.astype(int)
-            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 1)
-
-            label = str(i)
-            font_scale = 0.5
-            thickness = 1
-            (tw, th), _ = cv2.getTextSize(
-                label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
+    model_path = str(model_path)
+    if _PARSE_BACKEND == "thread":
+        backend = Omini(model_path, pipeline=_PARSE_PIPELINE)
+        concurrency = 1
+    else:
+        concurrency = env_int("WINCONTROL_PARSE_WORKERS", 1)
+        backend = OminiPool(
+            partial(Omini, model_path, pipeline=_PARSE_PIPELINE),
+            workers=concurrency,
+            timeout=env_float("WINCONTROL_PARSE_WORKER_TIMEOUT", 30.0),
+            health_interval=env_float("WINCONTROL_PARSE_HEALTH_INTERVAL", 5.0),
+        )
+        # 工作进程数、排队深度和重启次数出现在profile://stats中
+        get_profiler().register_gauge("parse_workers", backend.stats)
+    batcher = MicroBatcher(backend, _BATCH_MAX, _BATCH_WINDOW_MS, concurrency)
+    get_profiler().register_gauge("parse_batcher", batcher.stats)
+    return batcher
+
+
+# 模型在后台线程加载, 服务无需等待模型即可响应握手和其他工具调用
+_OMINI = BackgroundLoader(_load_omini, name="omini-loader")
+_PARSE_CACHE = ParseCache(
+    max_entries=env_int("WINCONTROL_PARSE_CACHE_ENTRIES", 32),
+    max_bytes=env_int("WINCONTROL_PARSE_CACHE_MB", 128) * 1024 * 1024,
+)
+# 解析缓存的条目数、内存占用和命中/未命中次数出现在profile://stats中
+get_profiler().register_gauge("parse_cache", _PARSE_CACHE.stats)
+
+# 解析模式: region为每次只解析请求的区域, batch为一次推理解析全部九个区域并缓存,
+# tiled为按接近原始分辨率的重叠切片解析请求的区域(高DPI屏幕)
+_PARSE_MODE = env_str("WINCONTROL_PARSE_MODE", "region")
+if _PARSE_MODE not in ("region", "batch", "tiled"):
+    raise ValueError(f"Invalid WINCONTROL_PARSE_MODE: {_PARSE_MODE}")
+_TILE_SCALE = env_float("WINCONTROL_PARSE_TILE_SCALE", 1.0)
+_TILE_OVERLAP = env_float("WINCONTROL_PARSE_TILE_OVERLAP", 0.25)
+
+# 解析图的编码参数(WINCONTROL_PARSER_*或配置文件[encode.parser]节), 支持auto
+_ENCODER = ImageEncoder(load_encoder_config("parser"))
+
+# 每个区域最近一次解析所用的帧号、区域矩形和缓存键, 多个CPU线程会同时读写
+_REGION_KEYS = {}
+_REGION_KEYS_LOCK = threading.Lock()
+
+
+def load_model_in_background():
+    """启动后台模型加载"""
+    _OMINI.start()
+
+
+def _region_rects(
+    screen_w: int, screen_h: int
+) -> dict[Region, tuple[int, int, int, int]]:
+    """各区域的矩形(left, top, width, height), 每个区域为半屏大小"""
+    starts = {
+        Region.LEFT_UP: (0, 0),
+        Region.LEFT_MID: (0, screen_h // 4),
+        Region.LEFT_DOWN: (0, screen_h // 2),
+        Region.MID_UP: (screen_w // 4, 0),
+        Region.MID_MID: (screen_w // 4, screen_h // 4),
+        Region.MID_DOWN: (screen_w // 4, screen_h // 2),
+        Region.RIGHT_UP: (screen_w // 2, 0),
+        Region.RIGHT_MID: (screen_w // 2, screen_h // 4),
+        Region.RIGHT_DOWN: (screen_w // 2, screen_h // 2),
+    }
+    return {
+        region: (left, top, screen_w // 2, screen_h // 2)
+        for region, (left, top) in starts.items()
+    }
+
+
+def _crop(frame: Frame, rect: tuple[int, int, int, int]) -> np.ndarray:
+    left, top, width, height = rect
+    return bgra_to_bgr(frame.bgra[top : top + height, left : left + width])
+
+
+def _parse_settings(omini: Omini | OminiPool | MicroBatcher) -> tuple:
+    """影响解析结果的参数, 作为缓存键的一部分"""
+    if _PARSE_MODE == "tiled":
+        return (*omini.settings, _TILE_SCALE, _TILE_OVERLAP)
+    return omini.settings
+
+
+def _region_key(
+    region: Region,
+    rect: tuple[int, int, int, int],
+    frame: Frame,
+    screen_size: tuple[int, int],
+    settings: tuple,
+) -> tuple[tuple, np.ndarray | None]:
+    """区域的缓存键, 返回(缓存键, 区域BGR图像), 沿用上次缓存键时图像为None"""
+    # 区域内的tile自上次解析后都没有变化时沿用上次的缓存键, 省去像素哈希
+    with _REGION_KEYS_LOCK:
+        last = _REGION_KEYS.get(region)
+    if last is not None:
+        last_id, last_rect, last_key = last
+        if last_rect == rect and get_tile_tracker().is_clean(
+            last_id, frame.frame_id, *rect
+        ):
+            return last_key, None
+    img_bgr = _crop(frame, rect)
+    key = ParseCache.key(img_bgr, rect[0], rect[1], screen_size, settings)
+    return key, img_bgr
+
+
+def _remember_region_key(
+    region: Region, frame: Frame, rect: tuple[int, int, int, int], key: tuple
+) -> None:
+    """记录区域最近一次解析所用的帧号、区域矩形和缓存键"""
+    with _REGION_KEYS_LOCK:
+        _REGION_KEYS[region] = (frame.frame_id, rect, key)
+
+
+def _parse_all_regions(
+    token: CancelToken,
+    omini: Omini | OminiPool | MicroBatcher,
+    frame: Frame,
+    screen_size: tuple[int, int],
+    requested: Region,
+    requested_key: tuple,
+    requested_img: np.ndarray | None,
+) -> tuple[ParsedResult, Encoded]:
+    """同一帧的全部未缓存区域合并为一个batch推理并写入缓存, 返回请求区域的(解析结果, 编码后的图像)"""
+    rects = _region_rects(*screen_size)
+    pending = {}
+    for region, rect in rects.items():
+        # 逐个区域计算缓存键(像素哈希)之前检查是否已被取消
+        token.check()
+        if region == requested:
+            key, img_bgr = requested_key, requested_img
+        else:
+            key, img_bgr = _region_key(
+                region, rect, frame, screen_size, _parse_settings(omini)
             )
-
-            # 标签尺寸
-            padding = 1
-            bg_w = tw + padding * 2
-            bg_h = th + padding * 2
-
-            # 计算面积比例（标签原始面积 / 框面积）
-            box_area = (x2 - x1) * (y2 - y1)
-            label_area = bg_w * bg_h
-
-            # 默认位置框内左上角
-            bg_x1 = x1
-            bg_y1 = y1
-            text_x = x1 + padding
-            text_y = y1 + bg_h - padding  # 文字基线在背景框底部
-
-            # 如果占用超过10%，尝试放到框外
-            if label_area > box_area * 0.10:
-                # 计算框外位置
-                out_y1 = y1 - bg_h
-
-                # 如果没有超出图片上边界，则使用框外位置
-                if out_y1 >= 0:
-                    bg_y1 = out_y1
-                    text_y = y1 - padding
-
-            # 绘制标签背景和文字
-            bg_x2 = bg_x1 + bg_w
-            bg_y2 = bg_y1 + bg_h
-
-            cv2.rectangle(img, (bg_x1, bg_y1), (bg_x2, bg_y2), (0, 255, 0), -1)
-            cv2.putText(
-                img,
-                label,
-                (text_x, text_y),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                font_scale,
-                (0, 0, 0),
-                thickness,
-                lineType=cv2.LINE_AA,
+            if key in _PARSE_CACHE:
+                _remember_region_key(region, frame, rect, key)
+                continue
+        if img_bgr is None:
+            img_bgr = _crop(frame, rect)
+        pending[region] = (key, img_bgr)
+
+    token.check()
+    results = omini.parse_batch(
+        [
+            (rects[region][0], rects[region][1], img_bgr)
+            for region, (_, img_bgr) in pending.items()
+        ]
+    )
+    token.check()
+    requested_result = None
+    for (region, (key, _)), result in zip(pending.items(), results):
+        # 只编码请求区域的图像, 其他区域在被请求时再编码
+        encoded = None
+        if region == requested:
+            encoded = _ENCODER.encode(result.parsed_img)
+            requested_result = (result, encoded)
+        _PARSE_CACHE.put(key, result, encoded)
+        _remember_region_key(region, frame, rects[region], key)
+    return requested_result
+
+
+def _parse_region(token: CancelToken, omini: MicroBatcher, region: Region) -> list:
+    """解析一个区域并构造工具返回内容, 在推理和编码之前检查是否已被取消"""
+    with Screen() as screen:
+        screen_size = (screen.width, screen.height)
+        rect = _region_rects(*screen_size)[region]
+
+        with stage("capture"):
+            frame = latest_frame(newer_than=last_input_time())
+            get_tile_tracker().update(frame)
+
+        with stage("cache_key"):
+            key, img_bgr = _region_key(
+                region, rect, frame, screen_size, _parse_settings(omini)
             )
-        return img
-
 
-_SCRIPT_DIR = Path(__file__).parent
-_OMINI = Omini(str(_SCRIPT_DIR / "omini.onnx"))
+        cached = _PARSE_CACHE.get(key)
+        count("cache_hit", int(cached is not None))
+        token.check()
+        if cached is not None:
+            parsed_result, encoded = cached
+            if encoded is None:
+                encoded = _ENCODER.encode(parsed_result.parsed_img)
+                _PARSE_CACHE.put(key, parsed_result, encoded)
+        elif _PARSE_MODE == "batch" and omini.supports_batch:
+            parsed_result, encoded = _parse_all_regions(
+                token, omini, frame, screen_size, region, key, img_bgr
+            )
+        else:
+            if img_bgr is None:
+                img_bgr = _crop(frame, rect)
+            if _PARSE_MODE == "tiled":
+                parsed_result = omini.parse_tiled(
+                    rect[0], rect[1], img_bgr, _TILE_SCALE, _TILE_OVERLAP
+                )
+            else:
+                parsed_result = omini.parse(rect[0], rect[1], img_bgr, token)
+            token.check()
+            encoded = _ENCODER.encode(parsed_result.parsed_img)
+            _PARSE_CACHE.put(key, parsed_result, encoded)
+        _remember_region_key(region, frame, rect, key)
+
+        parsed_boxes = parsed_result.boxes
+        with stage("base64"):
+            img_base64 = base64.b64encode(encoded.data).decode("utf-8")
+            boxes_json = json.dumps(parsed_boxes)
+        count("payload_bytes", len(img_base64) + len(boxes_json))
+
+        return [
+            TextContent(
+                type="text",
+                text="这是解析的屏幕区域GUI元素图, 图中每个解析框的左上角都紧贴着一个解析框索引，分析解析框中的元素是否是要操作的目标，找出要操作的目标框索引: ",
+            ),
+            ImageContent(
+                type="image",
+                data=img_base64,
+                mimeType=encoded.mime_type,
+            ),
+            TextContent(
+                type="text",
+                text="框索引和框中心的归一化坐标对应关系为: ",
+            ),
+            TextContent(
+                type="text",
+                text=boxes_json,
+            ),
+        ]
 
 
 def register(mcp: FastMCP):
     @mcp.tool()
-    def screen_region_parser(
+    async def screen_region_parser(
         region: Region,
     ) -> list:
         """解析指定屏幕区域的GUI元素, 返回添加了标注框的图片和标注框索引及其对应框的归一化坐标。"""
-        with Screen() as screen:
-            REGION_START_MAP = {
-                Region.LEFT_UP: (0, 0),
-                Region.LEFT_MID: (0, screen.height // 4),
-                Region.LEFT_DOWN: (0, screen.height // 2),
-                Region.MID_UP: (screen.width // 4, 0),
-                Region.MID_MID: (screen.width // 4, screen.height // 4),
-                Region.MID_DOWN: (screen.width // 4, screen.height // 2),
-                Region.RIGHT_UP: (screen.width // 2, 0),
-                Region.RIGHT_MID: (screen.width // 2, screen.height // 4),
-                Region.RIGHT_DOWN: (screen.width // 2, screen.height // 2),
-            }
-
-            left, top = REGION_START_MAP[region]
-            width = screen.width // 2
-            height = screen.height // 2
-
-            img_bgr = screen.capture_region(left, top, width, height)
-            parsed_result = _OMINI.parse(left, top, img_bgr)
-
-            parsed_img = parsed_result.parsed_img
-            parsed_boxes = parsed_result.boxes
-
-            success, img = cv2.imencode(".png", parsed_img)
-            if not success:
-                raise ValueError("imencode failed")
-
-            img_base64 = base64.b64encode(img.tobytes()).decode("utf-8")
-            boxes_json = json.dumps(parsed_boxes)
-
-            return [
-                TextContent(
-                    type="text",
-                    text="这是解析的屏幕区域GUI元素图, 图中每个解析框的左上角都紧贴着一个解析框索引，分析解析框中的元素是否是要操作的目标，找出要操作的目标框索引: ",
-                ),
-                ImageContent(
-                    type="image",
-                    data=img_base64,
-                    mimeType="image/png",
-                ),
-                TextContent(
-                    type="text",
-                    text="框索引和框中心的归一化坐标对应关系为: ",
-                ),
-                TextContent(
-                    type="text",
-                    text=boxes_json,
-                ),
-            ]
+        with get_profiler().trace("screen_region_parser"):
+            with stage("wait_model"):
+                omini = await _OMINI.wait()
+            return await run_cpu(_parse_region, omini, region)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.stubs import install_mss_stub
+
+# 测试在没有显示器的环境中运行, 截图服务使用mss桩; 需在导入截图模块之前安装
+install_mss_stub()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _cache_dir(tmp_path_factory):
+    """优化模型和融合模型的缓存写到临时目录"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("WINCONTROL_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield
+
+
+@pytest.fixture(scope="session")
+def detector_model(tmp_path_factory) -> str:
+    """与omini.onnx输入输出相同的小检测模型: 每个8x8格子一个20x20的框,
+    置信度取决于格子的平均亮度, 再加上按格子序号递增的微小偏置使置信度互不相同"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    size, stride = 640, 8
+    grid = size // stride
+    anchors = grid * grid
+    ys, xs = np.mgrid[0:grid, 0:grid]
+    consts = {
+        "axes": np.array([1], np.int64),
+        "shape": np.array([0, 1, anchors], np.int64),
+        "half": np.array(0.5, np.float32),
+        "gain": np.array(6.0, np.float32),
+        "ramp": (np.arange(anchors, dtype=np.float32) * 1e-6).reshape(1, 1, -1),
+        "cx": ((xs + 0.5) * stride).reshape(1, 1, -1).astype(np.float32),
+        "cy": ((ys + 0.5) * stride).reshape(1, 1, -1).astype(np.float32),
+        "wh": np.full((1, 1, anchors), 20, np.float32),
+    }
+    nodes = [
+        helper.make_node("ReduceMean", ["images", "axes"], ["gray"], keepdims=1),
+        helper.make_node(
+            "AveragePool",
+            ["gray"],
+            ["pool"],
+            kernel_shape=[stride, stride],
+            strides=[stride, stride],
+        ),
+        helper.make_node("Reshape", ["pool", "shape"], ["flat"]),
+        helper.make_node("Sub", ["flat", "half"], ["diff"]),
+        helper.make_node("Abs", ["diff"], ["contrast"]),
+        helper.make_node("Mul", ["contrast", "gain"], ["logit"]),
+        helper.make_node("Sigmoid", ["logit"], ["prob"]),
+        helper.make_node("Sub", ["prob", "half"], ["base"]),
+        helper.make_node("Add", ["base", "ramp"], ["score"]),
+        helper.make_node("Shape", ["flat"], ["batch_shape"]),
+        *(
+            helper.make_node("Expand", [name, "batch_shape"], [f"{name}_{i}"])
+            for i, name in enumerate(("cx", "cy", "wh", "wh"))
+        ),
+        helper.make_node(
+            "Concat", ["cx_0", "cy_1", "wh_2", "wh_3", "score"], ["output0"], axis=1
+        ),
+    ]
+    inputs = [
+        helper.make_tensor_value_info(
+            "images", TensorProto.FLOAT, ["N", 3, size, size]
+        )
+    ]
+    outputs = [
+        helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["N", 5, anchors])
+    ]
+    initializers = [
+        numpy_helper.from_array(value, name) for name, value in consts.items()
+    ]
+    graph = helper.make_graph(nodes, "detector", inputs, outputs, initializers)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 18)])
+    model.ir_version = 9
+    onnx.checker.check_model(model)
+    path = tmp_path_factory.mktemp("model") / "omini.onnx"
+    onnx.save(model, path)
+    return str(path)
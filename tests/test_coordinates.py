@@ -0,0 +1,40 @@
+"""CoordinateSpace整组换算与原逐点换算的一致性"""
+
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.coord_bench import (
+    GEOMETRIES,
+    legacy_coord_to_screen,
+    legacy_screen_to_coord,
+)
+from wincontrol_server.runtime.runtime import CoordinateSpace
+
+POINTS = 2000
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_to_screen_matches_legacy(geometry):
+    space = CoordinateSpace(*geometry)
+    rng = np.random.default_rng(0)
+    # 包括越界的归一化坐标
+    u = rng.integers(-50, 1100, POINTS)
+    v = rng.integers(-50, space.v_max + 100, POINTS)
+    x, y = space.to_screen(u, v)
+    expected = [legacy_coord_to_screen(geometry, int(a), int(b)) for a, b in zip(u, v)]
+    assert list(zip(x.tolist(), y.tolist())) == expected
+    assert space.point_to_screen(int(u[0]), int(v[0])) == expected[0]
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_to_coord_matches_legacy(geometry):
+    space = CoordinateSpace(*geometry)
+    left, top, width, height = geometry
+    rng = np.random.default_rng(1)
+    # 包括屏幕外的点
+    x = rng.integers(left - 100, left + width + 100, POINTS)
+    y = rng.integers(top - 100, top + height + 100, POINTS)
+    u, v = space.to_coord(x, y)
+    expected = [legacy_screen_to_coord(geometry, int(a), int(b)) for a, b in zip(x, y)]
+    assert list(zip(u.tolist(), v.tolist())) == expected
+    assert space.point_to_coord(int(x[0]), int(y[0])) == expected[0]
@@ -0,0 +1,63 @@
+"""融合了预处理和NMS的模型与classic流水线的解析结果一致"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.synthetic import synthetic_ui
+from wincontrol_server.parser.fused import build_fused_model, ensure_fused_model
+from wincontrol_server.parser.omini import Omini
+
+
+def _assert_same(expected, actual):
+    assert actual.boxes == expected.boxes
+    np.testing.assert_array_equal(actual.parsed_img, expected.parsed_img)
+
+
+@pytest.fixture(scope="module")
+def pipelines(detector_model, tmp_path_factory):
+    classic = Omini(detector_model)
+    conf, iou, _ = classic.settings
+    fused_path = tmp_path_factory.mktemp("fused") / "fused.onnx"
+    build_fused_model(detector_model, str(fused_path), conf, iou)
+    fused = Omini(str(fused_path))
+    assert (classic.pipeline, fused.pipeline) == ("classic", "fused")
+    return classic, fused
+
+
+@pytest.fixture(scope="module")
+def images():
+    return [synthetic_ui(960, 540, 40, seed)[0] for seed in range(3)]
+
+
+def test_parse(pipelines, images):
+    classic, fused = pipelines
+    for img in images:
+        _assert_same(classic.parse(10, 20, img.copy()), fused.parse(10, 20, img.copy()))
+
+
+def test_parse_tiled(pipelines, images):
+    classic, fused = pipelines
+    img = images[0]
+    _assert_same(
+        classic.parse_tiled(0, 0, img.copy(), 0.5),
+        fused.parse_tiled(0, 0, img.copy(), 0.5),
+    )
+
+
+def test_parse_batch(pipelines, images):
+    classic, fused = pipelines
+    regions = [(0, 0, img) for img in images]
+    expected = classic.parse_batch([(x, y, img.copy()) for x, y, img in regions])
+    actual = fused.parse_batch([(x, y, img.copy()) for x, y, img in regions])
+    assert len(actual) == len(expected)
+    for e, a in zip(expected, actual):
+        _assert_same(e, a)
+
+
+def test_fused_model_path_is_cached(detector_model):
+    first = ensure_fused_model(detector_model, 0.05, 0.1)
+    assert first.is_file()
+    assert ensure_fused_model(detector_model, 0.05, 0.1) == first
+    assert Path(first).parent.name == "models"
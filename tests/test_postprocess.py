@@ -0,0 +1,52 @@
+"""NMS后处理与原Omini逐框循环实现的一致性"""
+
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.nms_bench import (
+    legacy_nms,
+    legacy_overlap_nms,
+    quantized,
+    synthetic_candidates,
+)
+from wincontrol_server.parser.postprocess import nms, overlap_nms
+
+IOU = 0.1
+OVERLAP = 0.3
+
+
+def test_nms_tie_keeps_higher_index():
+    """两个置信度相同且重叠的框, 与原实现一样保留序号大的框"""
+    boxes = np.array([[10, 10, 10, 10], [11, 10, 10, 10]], dtype=np.float32)
+    scores = np.array([0.5, 0.5], dtype=np.float32)
+    assert nms(boxes, scores, IOU).tolist() == legacy_nms(boxes, scores, IOU).tolist()
+    assert nms(boxes, scores, IOU).tolist() == [1]
+
+
+def test_empty():
+    empty = np.zeros((0, 4), dtype=np.float32)
+    assert nms(empty, np.zeros(0, dtype=np.float32), IOU).size == 0
+    assert overlap_nms(empty, OVERLAP).size == 0
+
+
+@pytest.mark.parametrize("per_object", [16, 1])
+@pytest.mark.parametrize("n", [1, 30, 1000, 3000])
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("tied", [False, True])
+def test_nms_matches_legacy(per_object, n, seed, tied):
+    boxes, scores = synthetic_candidates(n, seed, per_object=per_object)
+    if tied:
+        scores = quantized(scores)
+    np.testing.assert_array_equal(
+        nms(boxes, scores, IOU), legacy_nms(boxes, scores, IOU)
+    )
+
+
+@pytest.mark.parametrize("per_object", [16, 1])
+@pytest.mark.parametrize("n", [1, 30, 1000, 3000])
+@pytest.mark.parametrize("seed", range(3))
+def test_overlap_nms_matches_legacy(per_object, n, seed):
+    boxes, _ = synthetic_candidates(n, seed, per_object=per_object)
+    np.testing.assert_array_equal(
+        overlap_nms(boxes, OVERLAP), legacy_overlap_nms(boxes, OVERLAP)
+    )
@@ -0,0 +1,31 @@
+"""letterbox预处理与原逐步分配实现的逐像素一致性"""
+
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.preprocess_bench import SIZES, legacy_preprocess
+from wincontrol_server.parser.preprocess import letterbox
+
+INPUT_L = 640
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+def test_letterbox_matches_legacy(width, height):
+    rng = np.random.default_rng(width * height)
+    # 连续调用两次, 检查复用画布时填充区域被正确重置
+    for _ in range(2):
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        expected, ratio, pad = legacy_preprocess(image, INPUT_L)
+        actual, new_ratio, new_pad = letterbox(image, INPUT_L)
+        np.testing.assert_array_equal(actual, expected[0])
+        assert (new_ratio, new_pad) == (ratio, pad)
+
+
+def test_letterbox_after_other_size():
+    """不同尺寸交替调用时结果与单独调用一致"""
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (200, 300, 3), dtype=np.uint8)
+    large = rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    letterbox(large, INPUT_L)
+    actual, _, _ = letterbox(small, INPUT_L)
+    np.testing.assert_array_equal(actual, legacy_preprocess(small, INPUT_L)[0][0])
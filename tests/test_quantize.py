@@ -0,0 +1,76 @@
+"""INT8/FP16模型变体的构建、加载与检测质量检查"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from wincontrol_server.bench.quant_bench import detections, evaluate, matches, verdict
+from wincontrol_server.bench.synthetic import synthetic_ui
+from wincontrol_server.parser.omini import Omini
+from wincontrol_server.parser.quantize import build_variant, variant_path
+
+# 真实模型的检测质量回归需要较长时间, 设置WINCONTROL_TEST_MODEL为模型路径时才运行
+_REAL_MODEL = os.environ.get("WINCONTROL_TEST_MODEL")
+
+
+def test_variant_path():
+    assert variant_path("models/omini.onnx", "fp32").as_posix() == "models/omini.onnx"
+    assert variant_path("models/omini.onnx", "int8").name == "omini.int8.onnx"
+    with pytest.raises(ValueError):
+        variant_path("models/omini.onnx", "int4")
+
+
+def test_matches_one_to_one():
+    expected = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float64)
+    # 两个框都与第一个真实框重叠, 一对一匹配只算一次
+    actual = np.array([[0, 0, 10, 10], [1, 0, 11, 10]], dtype=np.float64)
+    assert matches(expected, actual, 0.5) == 1
+    assert matches(expected, expected, 0.5) == 2
+    assert matches(expected, actual[:0], 0.5) == 0
+
+
+def test_verdict():
+    baseline = {"recall": 1.0, "precision": 1.0, "parse_ms": 10.0}
+    fast = {"recall": 0.99, "precision": 0.98, "parse_ms": 5.0}
+    assert verdict(fast, baseline, 0.95, 0.95) == "ACCEPT"
+    assert verdict({**fast, "recall": 0.9}, baseline, 0.95, 0.95) == "REJECT (quality)"
+    assert (
+        verdict({**fast, "parse_ms": 12.0}, baseline, 0.95, 0.95)
+        == "REJECT (not faster)"
+    )
+
+
+def _build_variants(model: str, tmp_path) -> dict:
+    frames = tmp_path / "calibration"
+    frames.mkdir()
+    cv2.imwrite(str(frames / "0.png"), synthetic_ui(1920, 1080, 100, 1)[0])
+    return {
+        "int8-dynamic": build_variant(model, "int8", str(tmp_path / "dynamic.onnx")),
+        "int8-static": build_variant(
+            model, "int8", str(tmp_path / "static.onnx"), str(frames), 4
+        ),
+        "fp16": build_variant(model, "fp16", str(tmp_path / "fp16.onnx")),
+    }
+
+
+def test_variants_load_and_parse(detector_model, tmp_path):
+    img = synthetic_ui(960, 540, 40, 0)[0]
+    expected = Omini(detector_model).parse(0, 0, img.copy())
+    for name, path in _build_variants(detector_model, tmp_path).items():
+        result = Omini(str(path)).parse(0, 0, img.copy())
+        assert result.boxes, name
+        assert result.parsed_img.shape == expected.parsed_img.shape, name
+
+
+@pytest.mark.skipif(_REAL_MODEL is None, reason="WINCONTROL_TEST_MODEL is not set")
+def test_real_model_quality(tmp_path):
+    pytest.importorskip("onnx")
+    regions = [synthetic_ui(960, 540, 60, seed)[0] for seed in range(4)]
+    reference = Omini(_REAL_MODEL)
+    baseline = [detections(reference, region) for region in regions]
+    for name, path in _build_variants(_REAL_MODEL, tmp_path).items():
+        result = evaluate(Omini(str(path)), baseline, regions, 0.5)
+        assert result["recall"] >= 0.95, (name, result)
+        assert result["precision"] >= 0.95, (name, result)